@@ -1,3 +1,26 @@
 from django.contrib import admin
 
-# Register your models here.
+from api.models import ScheduleJob, LlmResponseCacheEntry, Schedule, Timetable
+
+
+@admin.register(ScheduleJob)
+class ScheduleJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "status", "created_at", "started_at", "finished_at")
+    list_filter = ("status",)
+    exclude = ("pdf_data",)
+
+
+@admin.register(LlmResponseCacheEntry)
+class LlmResponseCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ("key", "model_name", "hits", "created_at", "last_used_at")
+
+
+@admin.register(Timetable)
+class TimetableAdmin(admin.ModelAdmin):
+    list_display = ("id", "pdf_sha256", "created_at", "last_used_at")
+
+
+@admin.register(Schedule)
+class ScheduleAdmin(admin.ModelAdmin):
+    list_display = ("id", "timetable", "mode", "base", "created_at")
+    list_filter = ("mode",)
@@ -0,0 +1,140 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api.models import ScheduleJob
+from api.utils.schedule_pipeline import generate_schedule, MODE_LLM
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.SCHEDULE_JOB_WORKERS, thread_name_prefix="schedule-job"
+            )
+        return _executor
+
+
+def submit_job(pdf_data, user_class, user_tasks, preferences, models_and_tasks_priorities, mode=MODE_LLM):
+    """Persist a queued job and hand it to the in-process worker pool (if enabled)"""
+    job = ScheduleJob.objects.create(
+        pdf_data=pdf_data,
+        user_class=user_class,
+        user_tasks=user_tasks,
+        preferences=preferences,
+        models_and_tasks_priorities=models_and_tasks_priorities,
+        mode=mode,
+    )
+    # With SCHEDULE_JOB_WORKERS = 0 the queue is drained by `manage.py process_schedule_jobs`
+    if settings.SCHEDULE_JOB_WORKERS > 0:
+        _get_executor().submit(_run_in_thread, job.id)
+    logger.info(f"Queued schedule job {job.id}, queue depth {queue_depth()}")
+    return job
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def claim_job(job_id):
+    """Atomically move a job from queued to running, False if another worker got it first"""
+    return ScheduleJob.objects.filter(id=job_id, status=ScheduleJob.STATUS_QUEUED).update(
+        status=ScheduleJob.STATUS_RUNNING, started_at=timezone.now()
+    ) == 1
+
+
+def requeue_stale_jobs(stale_seconds=None):
+    """Queue again the running jobs whose worker died (started over SCHEDULE_JOB_STALE_SECONDS ago)
+
+    Returns the number of jobs put back in the queue.
+    """
+    if stale_seconds is None:
+        stale_seconds = settings.SCHEDULE_JOB_STALE_SECONDS
+    cutoff = timezone.now() - timedelta(seconds=stale_seconds)
+    requeued = ScheduleJob.objects.filter(status=ScheduleJob.STATUS_RUNNING, started_at__lt=cutoff).update(
+        status=ScheduleJob.STATUS_QUEUED, started_at=None
+    )
+    if requeued:
+        logger.warning(f"Requeued {requeued} schedule job(s) left running for over {stale_seconds:.0f}s")
+    return requeued
+
+
+def run_job(job_id):
+    """Run extraction + generation for a queued job and store its result"""
+    if not claim_job(job_id):
+        return
+    job = ScheduleJob.objects.get(id=job_id)
+    try:
+        result = generate_schedule(
+            bytes(job.pdf_data),
+            job.user_class,
+            job.user_tasks,
+            job.preferences,
+            job.models_and_tasks_priorities,
+            job.mode,
+        )
+        if isinstance(result, list):
+            job.status = ScheduleJob.STATUS_DONE
+            job.result = result
+        else:
+            # getResponseFromEndPoint reports upstream failures as an "Error: ..." string
+            job.status = ScheduleJob.STATUS_FAILED
+            job.error = str(result)
+    except Exception as e:
+        logger.exception(f"Schedule job {job.id} failed")
+        job.status = ScheduleJob.STATUS_FAILED
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.pdf_data = None
+    job.save(update_fields=["status", "result", "error", "finished_at", "pdf_data"])
+    logger.info(
+        f"Schedule job {job.id} {job.status}: waited {job.wait_seconds:.2f}s, ran {job.run_seconds:.2f}s"
+    )
+
+
+def queue_depth():
+    return ScheduleJob.objects.filter(status=ScheduleJob.STATUS_QUEUED).count()
+
+
+def _summary(values):
+    if not values:
+        return {"count": 0, "avg": None, "p50": None, "p95": None, "max": None}
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "avg": round(sum(values) / len(values), 3),
+        "p50": round(values[int(0.50 * (len(values) - 1))], 3),
+        "p95": round(values[int(0.95 * (len(values) - 1))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def job_stats(recent=200):
+    """Queue depth plus wait/run time distribution over the most recent finished jobs"""
+    finished = ScheduleJob.objects.filter(
+        status__in=[ScheduleJob.STATUS_DONE, ScheduleJob.STATUS_FAILED]
+    ).order_by("-finished_at").only("created_at", "started_at", "finished_at")[:recent]
+    finished = list(finished)
+    return {
+        "queue_depth": queue_depth(),
+        "running": ScheduleJob.objects.filter(status=ScheduleJob.STATUS_RUNNING).count(),
+        "workers": settings.SCHEDULE_JOB_WORKERS,
+        "wait_seconds": _summary([job.wait_seconds for job in finished]),
+        "run_seconds": _summary([job.run_seconds for job in finished]),
+    }
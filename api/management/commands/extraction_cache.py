@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.utils.extraction_cache import get_extraction_cache
+from api.utils.schedule_pipeline import build_extractor
+
+
+class Command(BaseCommand):
+    help = "Inspect or invalidate the PDF table extraction cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true", help="Drop every cached extraction")
+        parser.add_argument("--invalidate", metavar="PDF", help="Drop the cached extraction of this PDF file")
+
+    def handle(self, *args, **options):
+        cache = get_extraction_cache()
+
+        if options["clear"]:
+            cache.clear()
+            self.stdout.write("Extraction cache cleared")
+        elif options["invalidate"]:
+            try:
+                with open(options["invalidate"], "rb") as f:
+                    pdf_data = f.read()
+            except OSError as e:
+                raise CommandError(str(e))
+            # Same options as the serving path, or the key would not match its entries
+            if cache.invalidate_pdf(pdf_data, build_extractor(pdf_data).cache_options()):
+                self.stdout.write(f"Invalidated {options['invalidate']}")
+            else:
+                self.stdout.write(f"{options['invalidate']} was not cached")
+
+        for name, value in cache.stats().items():
+            self.stdout.write(f"{name}: {value}")
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import requeue_stale_jobs, run_job
+from api.models import ScheduleJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain queued schedule jobs (use with SCHEDULE_JOB_WORKERS=0 or to recover jobs left after a restart); "
+        "running jobs older than --stale-after are queued again first"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+        parser.add_argument("--poll", type=float, default=1.0, help="Seconds between queue polls")
+        parser.add_argument(
+            "--stale-after", type=float, default=None,
+            help="Seconds after which a running job counts as lost (default SCHEDULE_JOB_STALE_SECONDS)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = requeue_stale_jobs(options["stale_after"])
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale job(s)")
+            job_id = (
+                ScheduleJob.objects.filter(status=ScheduleJob.STATUS_QUEUED)
+                .order_by("created_at")
+                .values_list("id", flat=True)
+                .first()
+            )
+            if job_id is None:
+                if options["once"]:
+                    return
+                time.sleep(options["poll"])
+                continue
+            run_job(job_id)
+            self.stdout.write(f"Processed job {job_id}")
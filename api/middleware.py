@@ -0,0 +1,143 @@
+import gzip
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from api.utils import metrics
+
+try:
+    import brotli
+except ImportError:
+    # Optional, responses are only gzipped without it
+    brotli = None
+
+
+class RequestMetricsMiddleware:
+    """Per request timings: a Server-Timing header and the request histograms behind metrics/
+
+    Stages are recorded with metrics.stage() anywhere below the view, a stage entered several
+    times (e.g. "clean" once per table) is reported once with its summed duration; "total" is the
+    whole request as seen by this middleware. Every request is also observed into
+    http_request_seconds{method, route, status}, with the route pattern rather than the path so
+    ids don't multiply the series. Works for sync and async views alike.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        token, stages = metrics.start_request_stages()
+        metrics.adjust_gauge("http_requests_in_flight", 1)
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.adjust_gauge("http_requests_in_flight", -1)
+            metrics.stop_request_stages(token)
+        return finish_request(request, response, stages, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        token, stages = metrics.start_request_stages()
+        metrics.adjust_gauge("http_requests_in_flight", 1)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.adjust_gauge("http_requests_in_flight", -1)
+            metrics.stop_request_stages(token)
+        return finish_request(request, response, stages, time.perf_counter() - start)
+
+
+def finish_request(request, response, stages, total):
+    route = getattr(request.resolver_match, "route", None) or "unmatched"
+    metrics.observe("http_request_seconds", total, labels={
+        "method": request.method, "route": route, "status": response.status_code,
+    })
+    return add_server_timing(response, stages, total)
+
+
+def add_server_timing(response, stages, total):
+    durations = {}
+    for name, seconds in stages:
+        durations[name] = durations.get(name, 0.0) + seconds
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    response["Server-Timing"] = ", ".join(entries)
+    return response
+
+
+def accepted_encodings(header):
+    """Content codings of an Accept-Encoding header with their q value, {"gzip": 1.0, "br": 0.5, ...}"""
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header):
+    """br when brotli is installed and the client takes it, then gzip, None for an identity response"""
+    accepted = accepted_encodings(header)
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    candidates = [(accepted.get(name, accepted.get("*", 0.0)), -rank, name) for rank, name in enumerate(available)]
+    q, _, name = max(candidates)
+    return name if q > 0 else None
+
+
+def compress(content, encoding):
+    if encoding == "br":
+        return brotli.compress(content, quality=settings.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """gzip or brotli response bodies, negotiated with Accept-Encoding
+
+    Like django.middleware.gzip.GZipMiddleware, plus brotli and a configurable size threshold.
+    Streamed responses (the SSE endpoint) are left alone so items still go out as they come.
+    Every body size is observed into response_body_bytes{encoding}.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        size = len(response.content)
+        encoding = None
+        if settings.RESPONSE_COMPRESSION_ENABLED and size >= settings.RESPONSE_COMPRESSION_MIN_BYTES:
+            patch_vary_headers(response, ("Accept-Encoding",))
+            encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is not None:
+            with metrics.stage("compress"):
+                content = compress(response.content, encoding)
+            if len(content) < size:
+                response.content = content
+                response.headers["Content-Length"] = str(len(content))
+                response.headers["Content-Encoding"] = encoding
+                # Same as GZipMiddleware: a strong ETag no longer matches the encoded bytes
+                etag = response.get("ETag")
+                if etag and etag.startswith('"'):
+                    response.headers["ETag"] = "W/" + etag
+            else:
+                encoding = None
+        metrics.observe("response_body_bytes", len(response.content), buckets=metrics.SIZE_BUCKETS,
+                        labels={"encoding": encoding or "identity"})
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:51
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_llmresponsecacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Timetable',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('pdf_sha256', models.CharField(max_length=64, unique=True)),
+                ('tables', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Schedule',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('mode', models.CharField(choices=[('full', 'Full'), ('incremental', 'Incremental')], default='full', max_length=16)),
+                ('user_class', models.TextField(blank=True, null=True)),
+                ('user_tasks', models.TextField(blank=True, null=True)),
+                ('preferences', models.TextField(blank=True, null=True)),
+                ('models_and_tasks_priorities', models.TextField(blank=True, null=True)),
+                ('items', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('base', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='revisions', to='api.schedule')),
+                ('timetable', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='api.timetable')),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_timetable_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedulejob',
+            name='mode',
+            field=models.CharField(default='llm', max_length=16),
+        ),
+    ]
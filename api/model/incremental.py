@@ -0,0 +1,45 @@
+from api.model.local_scheduler import resolveTasks
+
+# Items of these types come from the timetable and stay whatever the tasks do
+FIXED_EVENT_TYPES = {"school", "class"}
+
+
+def taskChanges(baseInputs, inputs):
+    """(tasks added or modified, titles of the removed tasks) between two sets of inputs
+
+    Both sides are resolved with the local scheduler's parsing, so a priority or a preference
+    that moves a task to another window counts as a change of that task.
+    """
+    old = {
+        task["title"].lower(): task
+        for task in resolveTasks(baseInputs.get("userTasks"), baseInputs.get("preferences"), baseInputs.get("modelsAndTasksPriorities"))
+    }
+    new = resolveTasks(inputs.get("userTasks"), inputs.get("preferences"), inputs.get("modelsAndTasksPriorities"))
+    changed = [task for task in new if old.get(task["title"].lower()) != task]
+    names = {task["title"].lower() for task in new}
+    removed = [task["title"] for name, task in old.items() if name not in names]
+    return changed, removed
+
+
+def _belongsTo(item, names):
+    """Item generated for one of the tasks, the model may have worded the title a bit differently"""
+    title = str(item.get("title") or "").strip().lower()
+    return bool(title) and any(
+        name == title or (min(len(name), len(title)) >= 3 and (name in title or title in name)) for name in names
+    )
+
+
+def keptItems(items, dropTitles):
+    """Items of a schedule that survive dropping the sessions of some tasks (and the breaks right after them)"""
+    names = {str(title).strip().lower() for title in dropTitles if str(title).strip()}
+    dropped = set()
+    kept = []
+    for item in items:
+        if item.get("event_type") not in FIXED_EVENT_TYPES and item.get("event_type") != "break" and _belongsTo(item, names):
+            dropped.add((item.get("event_day"), item.get("end_time")))
+        else:
+            kept.append(item)
+    return [
+        item for item in kept
+        if not (item.get("event_type") == "break" and (item.get("event_day"), item.get("start_time")) in dropped)
+    ]
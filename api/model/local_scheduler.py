@@ -0,0 +1,425 @@
+import bisect
+import json
+import math
+import re
+
+from api.utils.table_format import EMPTY_CELL, table_cells
+
+# Deterministic, LLM free scheduler: places the fixed school slots found in the extracted
+# tables, then fills the user tasks by priority inside their preferred time windows.
+# It emits the same item format as getResponseStructure().
+
+WEEK_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+DAY_NAMES = {
+    "monday": "Monday", "mon": "Monday", "lundi": "Monday", "الاثنين": "Monday", "الإثنين": "Monday",
+    "tuesday": "Tuesday", "tue": "Tuesday", "mardi": "Tuesday", "الثلاثاء": "Tuesday",
+    "wednesday": "Wednesday", "wed": "Wednesday", "mercredi": "Wednesday", "الأربعاء": "Wednesday", "الاربعاء": "Wednesday",
+    "thursday": "Thursday", "thu": "Thursday", "jeudi": "Thursday", "الخميس": "Thursday",
+    "friday": "Friday", "fri": "Friday", "vendredi": "Friday", "الجمعة": "Friday",
+    "saturday": "Saturday", "sat": "Saturday", "samedi": "Saturday", "السبت": "Saturday",
+    "sunday": "Sunday", "sun": "Sunday", "dimanche": "Sunday", "الأحد": "Sunday", "الاحد": "Sunday",
+}
+
+# Preferred time windows in minutes since midnight
+TIME_WINDOWS = {
+    "morning": (7 * 60, 12 * 60),
+    "afternoon": (12 * 60, 17 * 60),
+    "evening": (17 * 60, 21 * 60),
+    "night": (20 * 60, 23 * 60 + 30),
+}
+DAY_WINDOW = (7 * 60, 22 * 60)
+
+SCHOOL_START = 8 * 60
+SLOT_MINUTES = 60
+DEFAULT_TASK_MINUTES = 60
+DEFAULT_SESSIONS = 3
+DEFAULT_PRIORITY = 3
+LONG_TASK_MINUTES = 90
+TASK_BREAK_MINUTES = 15
+SCHOOL_BREAK_MINUTES = 30
+# Task fields holding a duration, with the unit of a bare number
+DURATION_FIELDS = (("minutes", 1), ("duration", 1), ("hours", 60))
+
+PRIORITY_COLORS = {1: "#F87171", 2: "#FBBF24", 3: "#10B981", 4: "#60A5FA", 5: "#A78BFA"}
+SCHOOL_COLOR = "#3B82F6"
+BREAK_COLOR = "#9CA3AF"
+
+TIME_RE = re.compile(r"(\d{1,2})\s*[:hH.]\s*(\d{2})?|(\d{1,2})\s*(?=h\b|H\b)")
+# 45 | 45 min | 1.5 hours | 1h30 | 2 h 15 min
+DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)\s*(h|hrs?|hours?|m|mins?|minutes?)?(?:\s*(\d+)\s*(?:m|mins?|minutes?)?)?$")
+RANGE_RE = re.compile(r"(\d{1,2})\s*[:hH.]\s*(\d{2})?\s*[-–à/]+\s*(\d{1,2})\s*[:hH.]?\s*(\d{2})?")
+
+
+class DayIntervals:
+    """Sorted, non-overlapping [start, end) intervals of one day with bisect based lookups"""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def overlaps(self, start, end):
+        i = bisect.bisect_left(self.starts, end)
+        # Only the interval starting right before `end` can overlap, since intervals never overlap
+        return i > 0 and self.ends[i - 1] > start
+
+    def insert(self, start, end):
+        if end <= start or self.overlaps(start, end):
+            return False
+        i = bisect.bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        return True
+
+    def first_gap(self, window_start, window_end, length):
+        """Earliest start >= window_start where `length` minutes fit before window_end"""
+        cursor = window_start
+        i = bisect.bisect_right(self.starts, window_start)
+        if i > 0 and self.ends[i - 1] > cursor:
+            cursor = self.ends[i - 1]
+        while cursor + length <= window_end:
+            if i >= len(self.starts) or self.starts[i] >= cursor + length:
+                return cursor
+            cursor = max(cursor, self.ends[i])
+            i += 1
+        return None
+
+    def busy_minutes(self):
+        return sum(end - start for start, end in zip(self.starts, self.ends))
+
+
+def formatMinutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parseTime(text):
+    match = TIME_RE.search(str(text))
+    if not match:
+        return None
+    if match.group(3) is not None:
+        hours, mins = int(match.group(3)), 0
+    else:
+        hours, mins = int(match.group(1)), int(match.group(2) or 0)
+    if hours > 23 or mins > 59:
+        return None
+    return hours * 60 + mins
+
+
+def parseTimeRange(text):
+    match = RANGE_RE.search(str(text))
+    if not match:
+        return None
+    start = int(match.group(1)) * 60 + int(match.group(2) or 0)
+    end = int(match.group(3)) * 60 + int(match.group(4) or 0)
+    if end <= start or end > 24 * 60:
+        return None
+    return start, end
+
+
+def dayName(text):
+    return DAY_NAMES.get(str(text).strip().lower().rstrip(".:"))
+
+
+def _loads(value):
+    """Form values arrive as strings, decode JSON when it is JSON"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value.strip()
+    return value
+
+
+def _tableGrid(table):
+    headers = list(table.get("headers", []))
+    rows = [[str(cell) for cell in row] for row in table_cells(table)]
+    # pdfplumber/tabula keep the first row as headers, put it back into the grid
+    if headers and headers != list(range(len(headers))):
+        rows.insert(0, [str(h) for h in headers])
+    return rows
+
+
+def _slotTimes(labels):
+    """(start, end) minutes per slot label; unlabeled slots are consecutive hours from SCHOOL_START"""
+    slots = []
+    for i, label in enumerate(labels):
+        slot = parseTimeRange(label)
+        if slot is None:
+            start = parseTime(label)
+            if start is None:
+                start = slots[-1][1] if slots else SCHOOL_START + i * SLOT_MINUTES
+            slot = (start, None)
+        slots.append(slot)
+    # Open ended slots end where the next one starts (or one slot later)
+    resolved = []
+    for i, (start, end) in enumerate(slots):
+        if end is None:
+            next_start = slots[i + 1][0] if i + 1 < len(slots) else None
+            end = next_start if next_start and next_start > start else start + SLOT_MINUTES
+        resolved.append((start, end))
+    return resolved
+
+
+def schoolSlots(table):
+    """(day, start, end, title) for every non-empty cell of a timetable grid"""
+    grid = _tableGrid(table)
+    if not grid:
+        return []
+
+    # Orientation: days across a header row (rows = time slots) or down the first column
+    day_row = next((r for r, row in enumerate(grid) if sum(1 for c in row if dayName(c)) >= 2), None)
+    day_col = None
+    if day_row is None:
+        width = max(len(row) for row in grid)
+        day_col = next(
+            (c for c in range(width) if sum(1 for row in grid if c < len(row) and dayName(row[c])) >= 2), None
+        )
+        if day_col is None:
+            return []
+        grid = [list(column) for column in zip(*[row + [EMPTY_CELL] * (width - len(row)) for row in grid])]
+        day_row = day_col
+
+    header = grid[day_row]
+    days = {c: dayName(cell) for c, cell in enumerate(header) if dayName(cell)}
+    body = grid[day_row + 1:]
+    label_col = 0 if 0 not in days else None
+    labels = [row[label_col] if label_col is not None else "" for row in body]
+    times = _slotTimes(labels)
+
+    slots = []
+    for c, day in days.items():
+        current = None
+        for row, (start, end) in zip(body, times):
+            title = row[c].strip() if c < len(row) else EMPTY_CELL
+            if not title or title == EMPTY_CELL:
+                current = None
+                continue
+            # Merge a class spanning several consecutive slots into one item
+            if current and current[3] == title and current[2] == start:
+                current[2] = end
+                continue
+            current = [day, start, end, title]
+            slots.append(current)
+    return [tuple(slot) for slot in slots]
+
+
+def _pickTables(tableData, userClass):
+    """Tables mentioning the user's class when some do, otherwise every table"""
+    tables = list(tableData or [])
+    if userClass:
+        needle = str(userClass).strip().lower()
+        matching = [t for t in tables if needle and needle in json.dumps(t, default=str, ensure_ascii=False).lower()]
+        if matching:
+            tables = matching
+    return sorted(tables, key=lambda t: -(t.get("accuracy_score") or 0))
+
+
+def parsePriorities(modelsAndTasksPriorities):
+    """{task name (lower case): 1..5} from a JSON object/list or 'math=1, gym: high' text"""
+    value = _loads(modelsAndTasksPriorities)
+    words = {"high": 1, "medium": 2, "low": 3}
+    priorities = {}
+
+    def _level(raw):
+        raw = str(raw).strip().lower()
+        if raw in words:
+            return words[raw]
+        digits = re.search(r"\d", raw)
+        return min(max(int(digits.group()), 1), 5) if digits else DEFAULT_PRIORITY
+
+    if isinstance(value, dict):
+        for name, level in value.items():
+            priorities[str(name).strip().lower()] = _level(level)
+    elif isinstance(value, list):
+        for entry in value:
+            if isinstance(entry, dict):
+                name = entry.get("title") or entry.get("name") or entry.get("task") or entry.get("module")
+                if name:
+                    priorities[str(name).strip().lower()] = _level(entry.get("priority", DEFAULT_PRIORITY))
+    elif isinstance(value, str):
+        for name, level in re.findall(r"([^,;:=\n]+?)\s*[:=]\s*([^,;\n]+)", value):
+            priorities[name.strip().lower()] = _level(level)
+    return priorities
+
+
+def parsePreferences(preferences, taskNames):
+    """{task name (lower case): preferred window name} from JSON or free text"""
+    value = _loads(preferences)
+    found = {}
+    if isinstance(value, dict):
+        for name, pref in value.items():
+            window = next((w for w in TIME_WINDOWS if w in str(pref).lower()), None)
+            if window:
+                found[str(name).strip().lower()] = window
+        return found
+    text = json.dumps(value, ensure_ascii=False).lower() if not isinstance(value, str) else value.lower()
+    # Free text: the window mentioned in the same sentence as the task name
+    for sentence in re.split(r"[.;\n]", text):
+        window = next((w for w in TIME_WINDOWS if w in sentence), None)
+        if not window:
+            continue
+        for name in taskNames:
+            if name in sentence:
+                found.setdefault(name, window)
+    return found
+
+
+def _durationMinutes(value, unitMinutes):
+    """Minutes of a duration (45, "45 min", "1.5h", "1h30"), in units of `unitMinutes` when it has
+    no unit; None when it can't be read"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        minutes = value * unitMinutes
+    else:
+        match = DURATION_RE.match(str(value).strip().lower().replace(",", "."))
+        if not match:
+            return None
+        amount, unit, extra = float(match.group(1)), match.group(2), match.group(3)
+        if unit is None:
+            minutes = amount * unitMinutes
+        elif unit.startswith("h"):
+            minutes = amount * 60 + int(extra or 0)
+        else:
+            minutes = amount
+    return minutes if math.isfinite(minutes) and minutes > 0 else None
+
+
+def parseTasks(userTasks):
+    """[{title, minutes, sessions, event_type, window}] from a JSON list/object or comma separated text"""
+    value = _loads(userTasks)
+    if isinstance(value, dict):
+        value = [dict(entry, title=name) if isinstance(entry, dict) else {"title": name, "hours": entry}
+                 for name, entry in value.items()]
+    if isinstance(value, str):
+        value = [part for part in re.split(r"[,\n;]", value) if part.strip()]
+
+    tasks = []
+    for entry in value or []:
+        if isinstance(entry, str):
+            entry = {"title": entry}
+        if not isinstance(entry, dict):
+            continue
+        title = str(entry.get("title") or entry.get("name") or entry.get("task") or "").strip()
+        if not title:
+            continue
+        # First readable duration; "45 min", "1h30" or "two" are user input too
+        minutes = next(
+            (m for m in (_durationMinutes(entry.get(field), unit) for field, unit in DURATION_FIELDS) if m is not None), None
+        )
+        sessions = entry.get("sessions") or entry.get("timesPerWeek") or entry.get("frequency") or DEFAULT_SESSIONS
+        window = next((w for w in TIME_WINDOWS if w in str(entry.get("preferredTime", "")).lower()), None)
+        tasks.append({
+            "title": title,
+            "minutes": max(15, int(minutes)) if minutes else DEFAULT_TASK_MINUTES,
+            "sessions": max(1, min(7, int(sessions))) if str(sessions).isdigit() else DEFAULT_SESSIONS,
+            "event_type": entry.get("event_type") or entry.get("type") or "study",
+            "priority": entry.get("priority"),
+            "window": window,
+        })
+    return tasks
+
+
+def scheduleItem(title, start, end, event_type, day, priority, color):
+    return {
+        "title": title,
+        "start_time": formatMinutes(start),
+        "end_time": formatMinutes(end),
+        "event_type": event_type,
+        "event_day": day,
+        "priority": str(priority),
+        "color": color,
+        "user_id": None,
+        "module_id": None,
+    }
+
+
+def resolveTasks(userTasks, preferences, modelsAndTasksPriorities):
+    """parseTasks() with each task's priority and preferred window resolved, highest priority first"""
+    tasks = parseTasks(userTasks)
+    priorities = parsePriorities(modelsAndTasksPriorities)
+    windows = parsePreferences(preferences, [task["title"].lower() for task in tasks])
+    for task in tasks:
+        name = task["title"].lower()
+        level = task["priority"] or priorities.get(name, DEFAULT_PRIORITY)
+        task["priority"] = int(level) if str(level).isdigit() else DEFAULT_PRIORITY
+        task["window"] = task["window"] or windows.get(name)
+    tasks.sort(key=lambda task: task["priority"])
+    return tasks
+
+
+def placeTasks(week, tasks):
+    """Schedule items for the resolved tasks, each session on the least loaded day with room in its window
+
+    `week` maps every day to its DayIntervals and is updated with what gets placed.
+    """
+    items = []
+    for task in tasks:
+        window = TIME_WINDOWS.get(task["window"], DAY_WINDOW)
+        length = task["minutes"]
+        needs_break = length >= LONG_TASK_MINUTES
+        used_days = set()
+        for _ in range(task["sessions"]):
+            candidates = sorted(
+                (day for day in WEEK_DAYS if day not in used_days),
+                key=lambda day: (week[day].busy_minutes(), WEEK_DAYS.index(day)),
+            )
+            for day in candidates:
+                start = week[day].first_gap(window[0], window[1], length + (TASK_BREAK_MINUTES if needs_break else 0))
+                if start is None and window != DAY_WINDOW:
+                    # Preferred window is full on this day, fall back to any free time
+                    start = week[day].first_gap(DAY_WINDOW[0], DAY_WINDOW[1], length)
+                if start is None:
+                    continue
+                week[day].insert(start, start + length)
+                items.append(scheduleItem(
+                    task["title"], start, start + length, task["event_type"], day,
+                    task["priority"], PRIORITY_COLORS.get(task["priority"], PRIORITY_COLORS[3]),
+                ))
+                if needs_break and week[day].insert(start + length, start + length + TASK_BREAK_MINUTES):
+                    items.append(scheduleItem(
+                        "Break", start + length, start + length + TASK_BREAK_MINUTES, "break", day, 5, BREAK_COLOR
+                    ))
+                used_days.add(day)
+                break
+    return items
+
+
+def sortItems(items):
+    items.sort(key=lambda item: (WEEK_DAYS.index(item["event_day"]) if item.get("event_day") in WEEK_DAYS else len(WEEK_DAYS),
+                                 str(item.get("start_time"))))
+    return items
+
+
+def generateLocalSchedule(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
+    """Build the weekly schedule without calling the LLM"""
+    week = {day: DayIntervals() for day in WEEK_DAYS}
+    items = []
+
+    # 1. Fixed school slots, first table wins when duplicated tables overlap
+    school_end = {}
+    for table in _pickTables(tableData, userClass):
+        for day, start, end, title in schoolSlots(table):
+            if week[day].insert(start, end):
+                items.append(scheduleItem(title, start, end, "school", day, 1, SCHOOL_COLOR))
+                school_end[day] = max(school_end.get(day, 0), end)
+
+    # 2. A break once school is over
+    for day, end in school_end.items():
+        if week[day].insert(end, end + SCHOOL_BREAK_MINUTES):
+            items.append(scheduleItem("Break", end, end + SCHOOL_BREAK_MINUTES, "break", day, 5, BREAK_COLOR))
+
+    # 3. User tasks by priority
+    items.extend(placeTasks(week, resolveTasks(userTasks, preferences, modelsAndTasksPriorities)))
+    return sortItems(items)
+
+
+def placeLocalTasks(keptItems, tasks):
+    """Items for `tasks` (resolved) placed around already scheduled items, for incremental regeneration"""
+    week = {day: DayIntervals() for day in WEEK_DAYS}
+    for item in keptItems:
+        start, end = parseTime(item.get("start_time")), parseTime(item.get("end_time"))
+        day = item.get("event_day")
+        if day in week and start is not None and end is not None:
+            week[day].insert(start, end)
+    return placeTasks(week, tasks)
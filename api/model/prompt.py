@@ -1,8 +1,86 @@
+import json
+import math
 from api.model.response_structure import getResponseStructure
 from api.model.rules import returnModelRules
+from api.utils.table_format import EMPTY_CELL, table_cells, table_records
 
+# Bump whenever the prompt text, rules or response structure change, cached responses depend on it
+PROMPT_VERSION = "2"
 
-def createSystemPrompt(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
+COMPACT_LEGEND = """Tables are encoded one per block: a "## table" line, an optional "cols:" header line, then one line per row with cells separated by "|".
+    "~" is one 'EMPTY CELL' and "~N" is N consecutive 'EMPTY CELL' slots. A cell starting with "\\" is text: drop the "\\" and read the rest as is (e.g. "\\~3" is the text "~3")."""
+
+
+def _compactCell(value):
+    text = str(value).replace("|", "/").replace("\n", " ").strip()
+    # Keep text that starts like an empty-run marker (or like an escape) apart from the markers
+    return "\\" + text if text.startswith(("~", "\\")) else text
+
+
+def _compactRow(cells):
+    """Join a row with '|', collapsing runs of empty cells (and missing headers) into ~N"""
+    out = []
+    empty_run = 0
+    for cell in cells:
+        if cell is None or cell == EMPTY_CELL:
+            empty_run += 1
+            continue
+        if empty_run:
+            out.append("~" if empty_run == 1 else f"~{empty_run}")
+            empty_run = 0
+        out.append(_compactCell(cell))
+    if empty_run:
+        out.append("~" if empty_run == 1 else f"~{empty_run}")
+    return "|".join(out)
+
+
+def encodeTablesCompact(tableData):
+    """Header row + delimited grid per table instead of the repr of the extractor dicts"""
+    blocks = []
+    for table in tableData or []:
+        headers = list(table.get("headers", []))
+        title = f"## table {table.get('table_id', len(blocks) + 1)}"
+        if table.get("page_number") is not None:
+            title += f" page {table['page_number']}"
+        lines = [title]
+        # Camelot/OCR tables carry positional headers (0..n), they add nothing for the model
+        if headers and headers != list(range(len(headers))):
+            lines.append("cols: " + _compactRow(headers))
+        for row in table_cells(table):
+            lines.append(_compactRow(row))
+        blocks.append("\n".join(lines))
+    return "\n".join(blocks)
+
+
+def encodeTables(tableData, tableEncoding="repr"):
+    if tableEncoding == "compact":
+        return f"\n    {COMPACT_LEGEND}\n{encodeTablesCompact(tableData)}\n   "
+    # The legacy prompt is the repr of the per-row dicts the extractor used to return
+    return [table_records(table) for table in tableData] if tableData else tableData
+
+
+def estimateTokens(text):
+    """Rough token count (~4 characters per token for Gemini/English text)"""
+    return math.ceil(len(text) / 4)
+
+
+def promptSizeReport(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
+    """Prompt size per table encoding so the reduction can be measured per document"""
+    report = {}
+    for encoding in ("repr", "compact"):
+        prompt = createSystemPrompt(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities, encoding)
+        tables = str(encodeTables(tableData, encoding))
+        report[encoding] = {
+            "prompt_chars": len(prompt),
+            "prompt_tokens_estimate": estimateTokens(prompt),
+            "table_chars": len(tables),
+            "table_tokens_estimate": estimateTokens(tables),
+        }
+    report["token_reduction"] = 1 - report["compact"]["prompt_tokens_estimate"] / report["repr"]["prompt_tokens_estimate"]
+    return report
+
+
+def createSystemPrompt(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities, tableEncoding="repr"):
     return f"""
     You are a smart weekly scheduling assistant. Your job is to create a repeatable weekly schedule in JSON format based on user input.
     The user provides:
@@ -17,11 +95,41 @@ def createSystemPrompt(tableData, userClass, userTasks, preferences, modelsAndTa
     
     
     The Data:
-    Their school schedule: {tableData} user will follow classes under {userClass};
+    Their school schedule: {encodeTables(tableData, tableEncoding)} user will follow classes under {userClass};
     Tasks and goals they want to add : {userTasks};
     User Preferences: {preferences};
     Task priority: {modelsAndTasksPriorities}
     
     Your response should be of Output Format (JSON):
     {getResponseStructure()}
-"""
\ No newline at end of file
+"""
+
+def encodeScheduledItems(items):
+    """One "Day HH:MM-HH:MM title" line per item already in the schedule"""
+    return "\n".join(
+        f"{item.get('event_day')} {item.get('start_time')}-{item.get('end_time')} {item.get('title')}"
+        for item in items
+    )
+
+
+def createIncrementalPrompt(keptItems, changedTasks, preferences, modelsAndTasksPriorities):
+    """Ask only for the placement of the changed tasks around the rest of an existing schedule"""
+    return f"""
+    You are a smart weekly scheduling assistant. The user already has a weekly schedule and changed some of their tasks.
+    Place ONLY the tasks listed below into the free time of the existing schedule.
+
+    You must follow this rules:
+    {returnModelRules()}
+    The existing items are fixed: do not move, repeat or return them, and do not overlap them.
+
+
+    The Data:
+    Existing schedule (one item per line, day start-end title):
+    {encodeScheduledItems(keptItems)}
+    Tasks to place (minutes per session, sessions per week, preferred window when known): {json.dumps(changedTasks, ensure_ascii=False)};
+    User Preferences: {preferences};
+    Task priority: {modelsAndTasksPriorities}
+
+    Your response should be of Output Format (JSON), containing only the new items (and their breaks):
+    {getResponseStructure()}
+"""
@@ -1,31 +1,220 @@
-import requests
-from api.model.prompt import createSystemPrompt
-from api.utils.formate_json import extract_json_array_from_response
-from backend.settings import GEMINI_API_KEY 
+import json
+import time
+import httpx
+from asgiref.sync import sync_to_async
+from requests import RequestException
+from api.model.prompt import createIncrementalPrompt, createSystemPrompt, PROMPT_VERSION
+from api.utils import metrics
+from api.utils.formate_json import extract_json_array_from_response, JsonArrayStreamParser
+from api.utils.http_client import AsyncResilientHttpClient, ResilientHttpClient, CircuitOpenError
+from api.utils.response_cache import make_response_cache_key, get_cached_response, cache_response
+from django.conf import settings
+from backend.settings import GEMINI_API_KEY
 
 
-url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
+MODEL_NAME = "gemini-2.0-flash"
+url = f"{settings.GEMINI_BASE_URL}/models/{MODEL_NAME}:generateContent?key={GEMINI_API_KEY}"
+stream_url = f"{settings.GEMINI_BASE_URL}/models/{MODEL_NAME}:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
 
-def getResponseFromEndPoint(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
-    payload = {
+#? one pooled client per process so calls reuse keep-alive connections
+client = ResilientHttpClient(
+    connect_timeout=settings.GEMINI_CONNECT_TIMEOUT,
+    read_timeout=settings.GEMINI_READ_TIMEOUT,
+    max_retries=settings.GEMINI_MAX_RETRIES,
+    backoff_base=settings.GEMINI_BACKOFF_BASE,
+    backoff_max=settings.GEMINI_BACKOFF_MAX,
+    pool_size=settings.GEMINI_POOL_SIZE,
+    breaker_threshold=settings.GEMINI_BREAKER_THRESHOLD,
+    breaker_cooldown=settings.GEMINI_BREAKER_COOLDOWN,
+)
+#? async views await the same upstream without holding a thread, sharing the breaker with the sync client
+async_client = AsyncResilientHttpClient(
+    connect_timeout=settings.GEMINI_CONNECT_TIMEOUT,
+    read_timeout=settings.GEMINI_READ_TIMEOUT,
+    max_retries=settings.GEMINI_MAX_RETRIES,
+    backoff_base=settings.GEMINI_BACKOFF_BASE,
+    backoff_max=settings.GEMINI_BACKOFF_MAX,
+    max_connections=settings.GEMINI_ASYNC_MAX_CONNECTIONS,
+    breaker=client.breaker,
+)
+
+def buildPayload(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
+    with metrics.stage("prompt"):
+        prompt = createSystemPrompt(
+            tableData, userClass, userTasks, preferences, modelsAndTasksPriorities,
+            tableEncoding=settings.PROMPT_TABLE_ENCODING,
+        )
+    metrics.observe("llm_prompt_bytes", len(prompt.encode("utf-8")), buckets=metrics.SIZE_BUCKETS)
+    return {
     "contents": [
         {
         "role":"user",
         "parts": [
             {
-            "text": createSystemPrompt(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities)
+            "text": prompt
             }
         ]
         }
     ]
     }
+
+def parseResponse(response):
+    """Schedule items out of a 200 generateContent response, recording its size and token usage"""
+    metrics.observe("llm_response_bytes", len(response.content), buckets=metrics.SIZE_BUCKETS)
+    with metrics.stage("parse"):
+        body = response.json()
+        items = extract_json_array_from_response(body)
+    observeTokenUsage(body)
+    return items
+
+def observeTokenUsage(body):
+    usage = body.get("usageMetadata") or {}
+    for field, name in (("promptTokenCount", "llm_prompt_tokens"), ("candidatesTokenCount", "llm_response_tokens")):
+        if field in usage:
+            metrics.observe(name, usage[field], buckets=metrics.TOKEN_BUCKETS)
+
+def responseCacheKey(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
+    return make_response_cache_key(
+        MODEL_NAME, f"{PROMPT_VERSION}:{settings.PROMPT_TABLE_ENCODING}",
+        tableData, userClass, userTasks, preferences, modelsAndTasksPriorities,
+    )
+
+def getResponseFromEndPoint(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
+    cache_key = responseCacheKey(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities)
+    return requestItems(cache_key, lambda: buildPayload(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities))
+
+def getIncrementalResponseFromEndPoint(keptItems, userClass, changedTasks, preferences, modelsAndTasksPriorities):
+    """Only the items of the changed tasks, placed around the kept items of an existing schedule"""
+    cache_key = incrementalCacheKey(keptItems, userClass, changedTasks, preferences, modelsAndTasksPriorities)
+    return requestItems(cache_key, lambda: buildIncrementalPayload(keptItems, changedTasks, preferences, modelsAndTasksPriorities))
+
+def incrementalCacheKey(keptItems, userClass, changedTasks, preferences, modelsAndTasksPriorities):
+    return make_response_cache_key(
+        MODEL_NAME, f"{PROMPT_VERSION}:incremental", keptItems, userClass, changedTasks, preferences, modelsAndTasksPriorities,
+    )
+
+def buildIncrementalPayload(keptItems, changedTasks, preferences, modelsAndTasksPriorities):
+    with metrics.stage("prompt"):
+        prompt = createIncrementalPrompt(keptItems, changedTasks, preferences, modelsAndTasksPriorities)
+    metrics.observe("llm_prompt_bytes", len(prompt.encode("utf-8")), buckets=metrics.SIZE_BUCKETS)
+    return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+def requestItems(cache_key, buildPayloadFn):
+    """Cached items for the key, or the items of a Gemini call on buildPayloadFn(); "Error: ..." on failure"""
+    start = time.perf_counter()
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        metrics.observe("llm_cache_hit_seconds", time.perf_counter() - start)
+        return cached
+
+    payload = buildPayloadFn()
+    headers = {"Content-Type": "application/json"}
+
+
+    #? apply actual request
+    try:
+        with metrics.stage("gemini"):
+            response = client.post(url, json=payload, headers=headers)
+    except CircuitOpenError:
+        return "Error: upstream unavailable"
+    except RequestException as e:
+        return f"Error: {e.__class__.__name__}"
+    if response.status_code == 200:
+        formatted_json = parseResponse(response)
+        metrics.observe("llm_total_seconds", time.perf_counter() - start)
+        cache_response(cache_key, MODEL_NAME, formatted_json)
+        return formatted_json
+    else:
+        return f"Error: {response.status_code}"
+
+async def getResponseFromEndPointAsync(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
+    """getResponseFromEndPoint for async views, the Gemini call is awaited on the async client"""
+    cache_key = responseCacheKey(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities)
+    return await requestItemsAsync(
+        cache_key, lambda: buildPayload(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities)
+    )
+
+async def getIncrementalResponseFromEndPointAsync(keptItems, userClass, changedTasks, preferences, modelsAndTasksPriorities):
+    """getIncrementalResponseFromEndPoint for async views"""
+    cache_key = incrementalCacheKey(keptItems, userClass, changedTasks, preferences, modelsAndTasksPriorities)
+    return await requestItemsAsync(
+        cache_key, lambda: buildIncrementalPayload(keptItems, changedTasks, preferences, modelsAndTasksPriorities)
+    )
+
+async def requestItemsAsync(cache_key, buildPayloadFn):
+    """requestItems on the async client"""
+    start = time.perf_counter()
+    cached = await sync_to_async(get_cached_response)(cache_key)
+    if cached is not None:
+        metrics.observe("llm_cache_hit_seconds", time.perf_counter() - start)
+        return cached
+
+    payload = buildPayloadFn()
     headers = {"Content-Type": "application/json"}
-    
-    
+
     #? apply actual request
-    response = requests.post(url, json=payload, headers=headers)
+    try:
+        with metrics.stage("gemini"):
+            response = await async_client.post(url, json=payload, headers=headers)
+    except CircuitOpenError:
+        return "Error: upstream unavailable"
+    except httpx.HTTPError as e:
+        return f"Error: {e.__class__.__name__}"
     if response.status_code == 200:
-        formatted_json = extract_json_array_from_response(response.json())
+        formatted_json = parseResponse(response)
+        metrics.observe("llm_total_seconds", time.perf_counter() - start)
+        await sync_to_async(cache_response)(cache_key, MODEL_NAME, formatted_json)
         return formatted_json
     else:
-        return f"Error: {response.status_code}"
\ No newline at end of file
+        return f"Error: {response.status_code}"
+
+def streamResponseFromEndPoint(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
+    """Yield schedule items one by one as soon as each array element is complete in the streamed output
+
+    Raises RuntimeError if the upstream answers with a non 200 status.
+    """
+    start = time.perf_counter()
+    cache_key = responseCacheKey(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities)
+    cached = get_cached_response(cache_key)
+    if cached is not None:
+        metrics.observe("llm_cache_hit_seconds", time.perf_counter() - start)
+        yield from cached
+        return
+
+    payload = buildPayload(tableData, userClass, userTasks, preferences, modelsAndTasksPriorities)
+    headers = {"Content-Type": "application/json"}
+    parser = JsonArrayStreamParser()
+    items = []
+
+    first_item_at = None
+    responseBytes = 0
+    usage = None
+    with client.post(stream_url, json=payload, headers=headers, stream=True) as response:
+        if response.status_code != 200:
+            raise RuntimeError(f"Error: {response.status_code}")
+
+        #? server-sent events, one `data: {...}` line per generated chunk
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            responseBytes += len(line.encode("utf-8"))
+            chunk = json.loads(line[len("data:"):])
+            usage = chunk.get("usageMetadata") or usage
+            for candidate in chunk.get("candidates", [])[:1]:
+                for part in candidate.get("content", {}).get("parts", []):
+                    for item in parser.feed(part.get("text", "")):
+                        if first_item_at is None:
+                            first_item_at = time.perf_counter()
+                            metrics.observe("llm_time_to_first_item_seconds", first_item_at - start)
+                        items.append(item)
+                        yield item
+
+        #? output cut off mid array (e.g. max tokens), keep the last item if it is usable
+        for item in parser.finish():
+            items.append(item)
+            yield item
+
+    metrics.observe("llm_stream_total_seconds", time.perf_counter() - start)
+    metrics.observe("llm_response_bytes", responseBytes, buckets=metrics.SIZE_BUCKETS)
+    observeTokenUsage({"usageMetadata": usage})
+    cache_response(cache_key, MODEL_NAME, items)
@@ -0,0 +1,266 @@
+import bisect
+import re
+
+from api.model.incremental import FIXED_EVENT_TYPES
+from api.model.local_scheduler import (
+    BREAK_COLOR, DAY_WINDOW, DEFAULT_PRIORITY, DEFAULT_TASK_MINUTES, LONG_TASK_MINUTES, TASK_BREAK_MINUTES, WEEK_DAYS,
+    DayIntervals, dayName, formatMinutes, parseTime, placeLocalTasks, scheduleItem, sortItems,
+)
+
+# Validation and local repair of generated schedules: items are checked per event_day with a
+# sorted interval sweep, and conflicts are fixed in place (shift, shrink, break, move to another
+# day) so that only what cannot be placed locally goes back to the model.
+
+# School items must sit inside this window (returnModelRules), minutes since midnight
+SCHOOL_WINDOW = (8 * 60, 16 * 60)
+# Shortest session a task is shrunk to before it has to move to another day
+MIN_SESSION_MINUTES = 30
+SHRINK_STEP_MINUTES = 15
+# Latest end time an item can have (24:00 is not a valid HH:MM)
+DAY_END = 23 * 60 + 59
+
+CLOCK_RE = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+PM_RE = re.compile(r"p\.?\s?m\b", re.IGNORECASE)
+HOUR_RE = re.compile(r"^(\d{1,2})\s*[ap]\.?\s?m\.?$", re.IGNORECASE)
+
+
+def _clock(value):
+    """(minutes, was it already HH:MM) of a time value, minutes None when it can't be read"""
+    text = str(value if value is not None else "").strip()
+    if CLOCK_RE.match(text):
+        return int(text[:2]) * 60 + int(text[3:]), True
+    minutes = parseTime(text)
+    hour = HOUR_RE.match(text) if minutes is None else None
+    if hour and int(hour.group(1)) <= 12:
+        # "4 PM", "11am"
+        minutes = int(hour.group(1)) % 12 * 60
+    if minutes is not None and PM_RE.search(text) and minutes < 12 * 60:
+        minutes += 12 * 60
+    if minutes is None and text == "24:00":
+        minutes = DAY_END
+    return minutes, False
+
+
+def _isFixed(item):
+    return str(item.get("event_type", "")).lower() in FIXED_EVENT_TYPES
+
+
+def _isBreak(item):
+    return str(item.get("event_type", "")).lower() == "break"
+
+
+def _priority(item):
+    level = str(item.get("priority", "")).strip()
+    return int(level) if level.isdigit() else DEFAULT_PRIORITY
+
+
+def validateSchedule(items):
+    """Problems of a schedule as (index, kind), kind in item, time, day, order, school_window, overlap"""
+    problems = []
+    days = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            problems.append((index, "item"))
+            continue
+        start, start_ok = _clock(item.get("start_time"))
+        end, end_ok = _clock(item.get("end_time"))
+        if not (start_ok and end_ok):
+            problems.append((index, "time"))
+        if item.get("event_day") not in WEEK_DAYS:
+            problems.append((index, "day"))
+        if start is None or end is None:
+            continue
+        if end <= start:
+            problems.append((index, "order"))
+            continue
+        if _isFixed(item) and (start < SCHOOL_WINDOW[0] or end > SCHOOL_WINDOW[1]):
+            problems.append((index, "school_window"))
+        day = dayName(item.get("event_day"))
+        if day:
+            days.setdefault(day, []).append((start, end, index))
+    # Sweep: sorted by start, an item overlaps when it starts before the furthest end seen so far
+    for intervals in days.values():
+        intervals.sort()
+        furthest = None
+        for start, end, index in intervals:
+            if furthest is not None and start < furthest:
+                problems.append((index, "overlap"))
+            furthest = end if furthest is None else max(furthest, end)
+    return problems
+
+
+def _normalize(item, repairs):
+    """Copy of the item with a known day and HH:MM times in order, None when it has to be placed again"""
+    item = dict(item)
+    start, start_ok = _clock(item.get("start_time"))
+    end, end_ok = _clock(item.get("end_time"))
+    day = dayName(item.get("event_day"))
+    if day is None or start is None or start >= DAY_END:
+        return None
+    end = min(end, DAY_END) if end is not None else None
+    if not (start_ok and end_ok):
+        repairs["time"] = repairs.get("time", 0) + 1
+    if day != item.get("event_day"):
+        repairs["day"] = repairs.get("day", 0) + 1
+    if end is not None and end < start:
+        # Start and end swapped
+        start, end = end, start
+        repairs["order"] = repairs.get("order", 0) + 1
+    elif end is None or end == start:
+        end = min(start + DEFAULT_TASK_MINUTES, DAY_END)
+        repairs["order"] = repairs.get("order", 0) + 1
+    if _isFixed(item) and (start < SCHOOL_WINDOW[0] or end > SCHOOL_WINDOW[1]):
+        # Cut what is outside the window, or slide the item inside when little would be left
+        if min(end, SCHOOL_WINDOW[1]) - max(start, SCHOOL_WINDOW[0]) >= MIN_SESSION_MINUTES:
+            start, end = max(start, SCHOOL_WINDOW[0]), min(end, SCHOOL_WINDOW[1])
+        else:
+            length = min(end - start, SCHOOL_WINDOW[1] - SCHOOL_WINDOW[0])
+            start = min(max(start, SCHOOL_WINDOW[0]), SCHOOL_WINDOW[1] - length)
+            end = start + length
+        repairs["school_window"] = repairs.get("school_window", 0) + 1
+    item.update(event_day=day, start_time=formatMinutes(start), end_time=formatMinutes(end))
+    return item, start, end
+
+
+def _placeInDay(week, ends, item, start, end, repairs):
+    """Put a flexible item on its day: as is, shifted later, shifted after a break, or shrunk. The
+    placed items (a break first when one was added), or None when the day has no room"""
+    day = item["event_day"]
+    if week[day].insert(start, end):
+        ends[day][end] = item
+        return [item]
+    if _isBreak(item):
+        return []
+    length = end - start
+    window_end = max(DAY_WINDOW[1], end)
+    while length >= MIN_SESSION_MINUTES:
+        gap = week[day].first_gap(start, window_end, length)
+        if gap is not None:
+            placed = []
+            before = ends[day].get(gap)
+            # Right after a long task: keep a break between the two when it fits
+            if (before is not None and not _isBreak(before) and _minutes(before) >= LONG_TASK_MINUTES
+                    and week[day].first_gap(gap, window_end, length + TASK_BREAK_MINUTES) == gap):
+                placed.append(scheduleItem("Break", gap, gap + TASK_BREAK_MINUTES, "break", day, 5, BREAK_COLOR))
+                week[day].insert(gap, gap + TASK_BREAK_MINUTES)
+                ends[day][gap + TASK_BREAK_MINUTES] = placed[0]
+                repairs["break"] = repairs.get("break", 0) + 1
+                gap += TASK_BREAK_MINUTES
+            week[day].insert(gap, gap + length)
+            kind = "shift" if length == end - start else "shrink"
+            repairs[kind] = repairs.get(kind, 0) + 1
+            placed.append(dict(item, start_time=formatMinutes(gap), end_time=formatMinutes(gap + length)))
+            ends[day][gap + length] = placed[-1]
+            return placed
+        length -= SHRINK_STEP_MINUTES
+    return None
+
+
+def _minutes(item):
+    return parseTime(item["end_time"]) - parseTime(item["start_time"])
+
+
+def itemAsTask(item):
+    """A schedule item as a one session task for placeLocalTasks / the incremental prompt"""
+    start, _ = _clock(item.get("start_time"))
+    end, _ = _clock(item.get("end_time"))
+    minutes = end - start if start is not None and end is not None and end > start else DEFAULT_TASK_MINUTES
+    return {
+        "title": str(item.get("title") or "").strip(),
+        "minutes": max(MIN_SESSION_MINUTES, minutes),
+        "sessions": 1,
+        "event_type": item.get("event_type") or "study",
+        "priority": _priority(item),
+        "window": None,
+    }
+
+
+def repairSchedule(items):
+    """(repaired items, items that could not be placed, repairs done per kind)
+
+    Repeated items are dropped. School items are placed first (kept inside SCHOOL_WINDOW), then the
+    others by priority. A conflicting item is shifted to the next free time of its day, with a
+    break after a long task, then shrunk down to MIN_SESSION_MINUTES; conflicting breaks are
+    dropped. What still does not fit, or has no usable day or start, moves to the free time of
+    another day through the local scheduler, except classes: those are unresolved. Items without
+    a title are dropped. The repaired items always pass validateSchedule, anything that would not
+    is unresolved too.
+    """
+    repairs = {}
+    week = {day: DayIntervals() for day in WEEK_DAYS}
+    ends = {day: {} for day in WEEK_DAYS}
+    normalized, homeless, unresolved = [], [], []
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict) or not str(item.get("title") or "").strip():
+            repairs["dropped"] = repairs.get("dropped", 0) + 1
+            continue
+        result = _normalize(item, repairs)
+        if result is None:
+            homeless.append(item)
+            continue
+        key = (result[0]["title"], result[0]["event_day"], result[1], result[2])
+        if key in seen:
+            repairs["duplicate"] = repairs.get("duplicate", 0) + 1
+            continue
+        seen.add(key)
+        normalized.append(result)
+
+    repaired = []
+    # Shortest first: a class the model stretched over its neighbours is the one that gets cut
+    fixed = sorted((entry for entry in normalized if _isFixed(entry[0])), key=lambda entry: (entry[2] - entry[1], entry[1]))
+    flexible = sorted(
+        (entry for entry in normalized if not _isFixed(entry[0])),
+        key=lambda entry: (_isBreak(entry[0]), _priority(entry[0]), entry[1]),
+    )
+    for item, start, end in fixed:
+        day = item["event_day"]
+        if week[day].insert(start, end):
+            ends[day][end] = item
+            repaired.append(item)
+            continue
+        gap = week[day].first_gap(start, end, MIN_SESSION_MINUTES)
+        if gap is not None:
+            # Overlapping classes: keep the first free part of this one
+            following = bisect.bisect_right(week[day].starts, gap)
+            gap_end = min(end, week[day].starts[following]) if following < len(week[day].starts) else end
+            week[day].insert(gap, gap_end)
+            repairs["shrink"] = repairs.get("shrink", 0) + 1
+            repaired.append(dict(item, start_time=formatMinutes(gap), end_time=formatMinutes(gap_end)))
+        else:
+            # No free time left in its slot, a class can only be put back by the model
+            unresolved.append(item)
+    for item, start, end in flexible:
+        placed = _placeInDay(week, ends, item, start, end, repairs)
+        if placed is None:
+            homeless.append(item)
+        else:
+            if not placed:
+                repairs["dropped"] = repairs.get("dropped", 0) + 1
+            repaired.extend(placed)
+
+    # A break has nothing to move for
+    breaks = sum(1 for item in homeless if _isBreak(item))
+    if breaks:
+        repairs["dropped"] = repairs.get("dropped", 0) + breaks
+    # The local scheduler places in DAY_WINDOW, a class can only be put back by the model
+    unresolved.extend(item for item in homeless if _isFixed(item))
+    homeless = [item for item in homeless if not _isBreak(item) and not _isFixed(item)]
+    if homeless:
+        moved = placeLocalTasks(repaired, [itemAsTask(item) for item in homeless])
+        placed_titles = [item["title"] for item in moved if not _isBreak(item)]
+        for item in homeless:
+            title = str(item.get("title")).strip()
+            if title in placed_titles:
+                placed_titles.remove(title)
+                repairs["move"] = repairs.get("move", 0) + 1
+            else:
+                unresolved.append(item)
+        repaired.extend(moved)
+
+    # Whatever repair missed is left to the model rather than returned as valid
+    invalid = {index for index, _ in validateSchedule(repaired)}
+    if invalid:
+        unresolved.extend(item for index, item in enumerate(repaired) if index in invalid)
+        repaired = [item for index, item in enumerate(repaired) if index not in invalid]
+    return sortItems(repaired), unresolved, repairs
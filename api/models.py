@@ -1,3 +1,116 @@
+import uuid
+
 from django.db import models
 
-# Create your models here.
+
+class ScheduleJob(models.Model):
+    """A schedule generation request processed in the background (async upload mode)"""
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+
+    # Inputs, the PDF is dropped once the job has finished
+    pdf_data = models.BinaryField(null=True)
+    user_class = models.TextField(null=True, blank=True)
+    user_tasks = models.TextField(null=True, blank=True)
+    preferences = models.TextField(null=True, blank=True)
+    models_and_tasks_priorities = models.TextField(null=True, blank=True)
+    # schedule_pipeline mode: "llm", or "local" for the deterministic scheduler
+    mode = models.CharField(max_length=16, default="llm")
+
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+    @property
+    def wait_seconds(self):
+        """Time spent queued before a worker picked the job up"""
+        if not self.started_at:
+            return None
+        return (self.started_at - self.created_at).total_seconds()
+
+    @property
+    def run_seconds(self):
+        """Time spent running extraction + generation"""
+        if not self.started_at or not self.finished_at:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+
+class LlmResponseCacheEntry(models.Model):
+    """Generated schedule for a canonicalized set of prompt inputs, shared by every server process"""
+
+    key = models.CharField(max_length=64, primary_key=True)
+    model_name = models.CharField(max_length=64)
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    hits = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.model_name}, {self.hits} hits)"
+
+
+class Timetable(models.Model):
+    """Tables extracted from an uploaded timetable PDF, so later schedules skip the upload and extraction"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # The same PDF uploaded again refreshes this record instead of adding one
+    pdf_sha256 = models.CharField(max_length=64, unique=True)
+    tables = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.id} ({len(self.tables)} tables)"
+
+
+class Schedule(models.Model):
+    """A generated schedule with the inputs it was generated from"""
+
+    MODE_FULL = "full"
+    MODE_INCREMENTAL = "incremental"
+    MODE_CHOICES = [
+        (MODE_FULL, "Full"),
+        (MODE_INCREMENTAL, "Incremental"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    timetable = models.ForeignKey(Timetable, on_delete=models.CASCADE, related_name="schedules")
+    # Schedule this one was regenerated from
+    base = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL, related_name="revisions")
+    mode = models.CharField(max_length=16, choices=MODE_CHOICES, default=MODE_FULL)
+
+    user_class = models.TextField(null=True, blank=True)
+    user_tasks = models.TextField(null=True, blank=True)
+    preferences = models.TextField(null=True, blank=True)
+    models_and_tasks_priorities = models.TextField(null=True, blank=True)
+
+    items = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self):
+        return f"{self.id} ({self.mode}, {len(self.items)} items)"
@@ -1,3 +1,1121 @@
-from django.test import TestCase
+import ast
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import timedelta
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import mock, skipUnless
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+import httpx
+import requests
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from api import middleware
+from api.jobs import claim_job, job_stats, run_job, submit_job
+from api.middleware import CompressionMiddleware, choose_encoding
+from api.model.incremental import keptItems, taskChanges
+from api.model.local_scheduler import DEFAULT_TASK_MINUTES, generateLocalSchedule, parseTasks, parseTime
+from api.model.prompt import COMPACT_LEGEND, _compactRow, encodeTablesCompact
+from api.model.schedule_repair import SCHOOL_WINDOW, repairSchedule, validateSchedule
+from api.models import LlmResponseCacheEntry, Schedule, ScheduleJob, Timetable
+from api.timetables import generate_and_store, regenerate
+from api.uploads import FORM_FIELDS_ALLOWANCE
+from api.utils import extraction_cache, metrics
+from api.utils.extraction_cache import ExtractionCache
+from api.utils.extraction_backends import load_backend
+from api.utils.formate_data_for_ai import PageTriage, PDFTableExtractor, _ocr_page_worker
+from api.utils.formate_json import REQUIRED_ITEM_FIELDS, JsonArrayStreamParser, extract_json_array_from_response
+from api.utils.http_client import AsyncResilientHttpClient, CircuitOpenError, ResilientHttpClient
+from api.utils.response_cache import cache_response, get_cached_response, make_response_cache_key
+from api.utils.response_format import FORMAT_COMPACT, FORMAT_JSON, FORMAT_LEGACY, SCHEDULE_FIELDS, schedule_data
+from api.utils.schedule_pipeline import MODE_LOCAL, build_extractor, extract_tables, repair_schedule
+from api.utils.table_format import EMPTY_CELL, clean_table, table_records
+from api.utils.tabula_worker import TabulaWorker, TabulaWorkerError
+from benchmarks.extraction_suite import cell_recall, compare, measure
+from benchmarks.synthetic_pdfs import VARIANTS, bordered, multi_page
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers POST /status/<code> with that status, /truncated with a chunked body cut short"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.calls += 1
+        if self.path == "/truncated":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.wfile.write(b"10\r\n{\"candidates\": ")
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        code = int(self.path.rsplit("/", 1)[-1])
+        if self.server.statuses:
+            code = self.server.statuses.pop(0)
+        body = b"{}"
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServerMixin:
+    """A local HTTP server for the upstream clients, started once per test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        cls.server.daemon_threads = True
+        cls.server.calls = 0
+        cls.server.statuses = []
+        # Clients hanging up on /truncated is expected, keep it out of the test output
+        cls.server.handle_error = lambda request, client_address: None
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.calls = 0
+        self.server.statuses = []
+
+    def url(self, path):
+        return f"{self.base_url}{path}"
+
+
+class ResilientHttpClientTests(StandInServerMixin, SimpleTestCase):
+    def http_client(self, **kwargs):
+        options = dict(connect_timeout=1, read_timeout=2, max_retries=1, backoff_base=0.001, backoff_max=0.01,
+                       breaker_threshold=2, breaker_cooldown=0.05)
+        options.update(kwargs)
+        return ResilientHttpClient(**options)
+
+    def open_breaker(self, client):
+        for _ in range(client.breaker.threshold):
+            client.post(self.url("/status/503"), json={})
+        self.assertEqual(client.breaker.state, "open")
+
+    def test_retries_a_5xx_then_succeeds(self):
+        self.server.statuses = [503]
+        client = self.http_client()
+        response = client.post(self.url("/status/200"), json={})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.calls, 2)
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        client = self.http_client(breaker_cooldown=30)
+        self.open_breaker(client)
+        calls = self.server.calls
+        with self.assertRaises(CircuitOpenError):
+            client.post(self.url("/status/200"), json={})
+        self.assertEqual(self.server.calls, calls)
+
+    def test_half_open_trial_success_closes(self):
+        client = self.http_client()
+        self.open_breaker(client)
+        time.sleep(0.06)
+        self.assertEqual(client.breaker.state, "half-open")
+        self.assertEqual(client.post(self.url("/status/200"), json={}).status_code, 200)
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_half_open_trial_failure_reopens(self):
+        client = self.http_client(max_retries=0)
+        self.open_breaker(client)
+        time.sleep(0.06)
+        self.assertEqual(client.post(self.url("/status/503"), json={}).status_code, 503)
+        self.assertEqual(client.breaker.state, "open")
+
+    def test_truncated_body_during_trial_does_not_wedge_the_breaker(self):
+        client = self.http_client(max_retries=0)
+        self.open_breaker(client)
+        time.sleep(0.06)
+        with self.assertRaises(requests.RequestException):
+            client.post(self.url("/truncated"), json={})
+        self.assertEqual(client.breaker.state, "open")
+        time.sleep(0.06)
+        self.assertEqual(client.post(self.url("/status/200"), json={}).status_code, 200)
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_unexpected_error_during_trial_releases_it(self):
+        def fail(response, *args, **kwargs):
+            raise ValueError("hook failed")
+
+        client = self.http_client(max_retries=0)
+        self.open_breaker(client)
+        time.sleep(0.06)
+        with self.assertRaises(ValueError):
+            client.post(self.url("/status/200"), json={}, hooks={"response": fail})
+        self.assertEqual(client.breaker.state, "half-open")
+        self.assertEqual(client.post(self.url("/status/200"), json={}).status_code, 200)
+        self.assertEqual(client.breaker.state, "closed")
+
+
+class AsyncResilientHttpClientTests(StandInServerMixin, SimpleTestCase):
+    def http_client(self, **kwargs):
+        options = dict(connect_timeout=1, read_timeout=2, max_retries=0, backoff_base=0.001, backoff_max=0.01,
+                       breaker_threshold=2, breaker_cooldown=0.05)
+        options.update(kwargs)
+        return AsyncResilientHttpClient(**options)
+
+    async def open_breaker(self, client):
+        for _ in range(client.breaker.threshold):
+            await client.post(self.url("/status/503"), json={})
+        self.assertEqual(client.breaker.state, "open")
+
+    def test_retries_a_5xx_then_succeeds(self):
+        self.server.statuses = [503]
+        client = self.http_client(max_retries=1)
+        response = asyncio.run(client.post(self.url("/status/200"), json={}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.calls, 2)
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_truncated_body_during_trial_does_not_wedge_the_breaker(self):
+        client = self.http_client()
+
+        async def scenario():
+            await self.open_breaker(client)
+            await asyncio.sleep(0.06)
+            with self.assertRaises(httpx.TransportError):
+                await client.post(self.url("/truncated"), json={})
+            self.assertEqual(client.breaker.state, "open")
+            await asyncio.sleep(0.06)
+            self.assertEqual((await client.post(self.url("/status/200"), json={})).status_code, 200)
+
+        asyncio.run(scenario())
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_cancelled_trial_is_released(self):
+        client = self.http_client()
+
+        async def scenario():
+            await self.open_breaker(client)
+            await asyncio.sleep(0.06)
+            trial = asyncio.ensure_future(client.post(self.url("/status/200"), json={}))
+            await asyncio.sleep(0)
+            trial.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await trial
+            self.assertEqual(client.breaker.state, "half-open")
+            self.assertEqual((await client.post(self.url("/status/200"), json={})).status_code, 200)
+
+        asyncio.run(scenario())
+        self.assertEqual(client.breaker.state, "closed")
+
+    def test_clients_are_kept_per_loop_and_closed_with_it(self):
+        client = self.http_client()
+
+        async def call():
+            await client.post(self.url("/status/200"), json={})
+            await client.post(self.url("/status/200"), json={})
+            return list(client._sessions[asyncio.get_running_loop()][0])
+
+        # Every async_to_sync call (a WSGI worker serving an async view) runs on a new loop
+        first = async_to_sync(call)()
+        second = async_to_sync(call)()
+        self.assertTrue(set(map(id, first)).isdisjoint(map(id, second)))
+        self.assertTrue(all(session.is_closed for session in first + second))
+        self.assertEqual(self.server.calls, 4)
+
+
+TIMETABLE = [{
+    "headers": ["Time", "Monday", "Tuesday"],
+    "cells": [["08:00-09:00", "Math", "Physics"], ["09:00-10:00", "Math", "EMPTY CELL"]],
+}]
+
+
+class LocalSchedulerTests(SimpleTestCase):
+    def durations(self, userTasks):
+        return {task["title"]: task["minutes"] for task in parseTasks(userTasks)}
+
+    def test_durations_with_units(self):
+        self.assertEqual(self.durations('{"Gym": "1h"}'), {"Gym": 60})
+        self.assertEqual(self.durations('{"Gym": 2}'), {"Gym": 120})
+        self.assertEqual(self.durations([{"title": "Run", "duration": "45 min"}]), {"Run": 45})
+        self.assertEqual(self.durations([{"title": "Essay", "hours": "1h30"}]), {"Essay": 90})
+        self.assertEqual(self.durations([{"title": "Essay", "hours": "1,5"}]), {"Essay": 90})
+        self.assertEqual(self.durations([{"title": "Read", "minutes": "abc", "hours": 2}]), {"Read": 120})
+
+    def test_unreadable_durations_fall_back_to_the_default(self):
+        for entry in ({"hours": "two"}, {"minutes": "a while"}, {"hours": True}, {"hours": 1e308},
+                      {"minutes": float("nan")}, {"duration": -30}, {"hours": None}):
+            with self.subTest(entry=entry):
+                self.assertEqual(self.durations([dict(entry, title="Task")]), {"Task": DEFAULT_TASK_MINUTES})
+
+    def test_text_and_unusable_entries(self):
+        self.assertEqual([task["title"] for task in parseTasks("Math, Gym;\nReading")], ["Math", "Gym", "Reading"])
+        self.assertEqual(parseTasks([{"title": ""}, 3, None]), [])
+        self.assertEqual(parseTasks('[{"title": "Gym", "sessions": "many"}]')[0]["sessions"], 3)
+
+    def test_schedule_keeps_school_slots_and_places_tasks_without_overlaps(self):
+        tasks = json.dumps([{"title": "Gym", "hours": "2", "sessions": 2, "preferredTime": "evening"},
+                            {"title": "Essay", "duration": "45 min", "sessions": 3}])
+        items = generateLocalSchedule(TIMETABLE, "Class B", tasks, "", '{"gym": 1}')
+
+        school = [(i["event_day"], i["start_time"], i["end_time"], i["title"]) for i in items if i["event_type"] == "school"]
+        self.assertEqual(school, [("Monday", "08:00", "10:00", "Math"), ("Tuesday", "08:00", "09:00", "Physics")])
+        gym = [i for i in items if i["title"] == "Gym"]
+        self.assertEqual(len(gym), 2)
+        self.assertTrue(all(i["start_time"] >= "17:00" and i["priority"] == "1" for i in gym))
+        self.assertEqual(len([i for i in items if i["title"] == "Essay"]), 3)
+
+        by_day = {}
+        for item in items:
+            by_day.setdefault(item["event_day"], []).append((parseTime(item["start_time"]), parseTime(item["end_time"])))
+        for day, intervals in by_day.items():
+            intervals.sort()
+            for (_, end), (start, _) in zip(intervals, intervals[1:]):
+                self.assertLessEqual(end, start, day)
+
+    def test_bad_durations_do_not_break_the_schedule(self):
+        items = generateLocalSchedule(TIMETABLE, "Class B", '{"Gym": "1h", "Piano": "two"}', "", "")
+        self.assertEqual({i["title"] for i in items if i["event_type"] == "study"}, {"Gym", "Piano"})
+
+
+class TimetablePdfMixin:
+    """A synthetic one page timetable PDF (benchmarks.synthetic_pdfs), written once per test class"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.mkdtemp(prefix="api-tests-")
+        cls.pdf_path = os.path.join(cls.tmp, "timetable.pdf")
+        bordered(cls.pdf_path)
+        with open(cls.pdf_path, "rb") as f:
+            cls.pdf_data = f.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+        super().tearDownClass()
+
+
+class OcrPageWorkerTests(TimetablePdfMixin, SimpleTestCase):
+    def test_memory_is_not_traced_by_default(self):
+        result = _ocr_page_worker(self.pdf_path, 1, 72)
+        self.assertIsNone(result.peak_bytes)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_trace_memory_reports_the_peak_and_stops_tracing(self):
+        result = _ocr_page_worker(self.pdf_path, 1, 72, trace_memory=True)
+        self.assertGreater(result.peak_bytes, 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+@override_settings(SCHEDULE_JOB_WORKERS=0, EXTRACTION_CACHE_ENABLED=False, SCHEDULE_LOCAL_FALLBACK=False)
+class ScheduleJobTests(TimetablePdfMixin, TestCase):
+    def test_local_mode_is_kept_for_queued_jobs(self):
+        job = submit_job(self.pdf_data, "Class B", '{"Gym": "1h"}', "", "", mode="local")
+        self.assertEqual(ScheduleJob.objects.get(id=job.id).mode, "local")
+        # No upstream and no fallback here: only the local scheduler can produce a schedule
+        run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScheduleJob.STATUS_DONE, job.error)
+        self.assertTrue(any(item["title"] == "Gym" for item in job.result))
+
+    def test_submit_keeps_the_inputs_and_queues_the_job(self):
+        job = submit_job(self.pdf_data, "Class B", "[]", "mornings", "{}")
+        job = ScheduleJob.objects.get(id=job.id)
+        self.assertEqual(job.status, ScheduleJob.STATUS_QUEUED)
+        self.assertEqual(bytes(job.pdf_data), self.pdf_data)
+        self.assertEqual((job.user_class, job.preferences, job.mode), ("Class B", "mornings", "llm"))
+        self.assertEqual(job_stats()["queue_depth"], 1)
+
+    def test_only_one_worker_claims_a_job(self):
+        job = submit_job(self.pdf_data, "Class B", "[]", "", "", mode="local")
+        self.assertTrue(claim_job(job.id))
+        self.assertFalse(claim_job(job.id))
+        # The losing worker's run_job leaves the job to the winner
+        run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScheduleJob.STATUS_RUNNING)
+        self.assertIsNotNone(job.started_at)
+
+    def test_stale_running_jobs_are_requeued_and_processed(self):
+        stale = submit_job(self.pdf_data, "Class B", '{"Gym": "1h"}', "", "", mode="local")
+        fresh = submit_job(self.pdf_data, "Class B", "[]", "", "", mode="local")
+        claim_job(stale.id)
+        claim_job(fresh.id)
+        ScheduleJob.objects.filter(id=stale.id).update(started_at=timezone.now() - timedelta(hours=1))
+
+        out = StringIO()
+        call_command("process_schedule_jobs", once=True, stale_after=600, stdout=out)
+        self.assertIn("Requeued 1 stale job(s)", out.getvalue())
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, ScheduleJob.STATUS_DONE, stale.error)
+        self.assertEqual(fresh.status, ScheduleJob.STATUS_RUNNING)
+
+    @override_settings(API_SECRET_KEY="test-key")
+    def test_poll_endpoint(self):
+        job = submit_job(self.pdf_data, "Class B", '{"Gym": "1h"}', "", "", mode="local")
+        url = f"/api/jobs/{job.id}/"
+        self.assertEqual(self.client.get(url).status_code, 401)
+        headers = {"x-api-key": "test-key"}
+        self.assertEqual(self.client.get(f"/api/jobs/{uuid.uuid4()}/", headers=headers).status_code, 404)
+
+        body = self.client.get(url, headers=headers).json()
+        self.assertEqual((body["status"], body["waitSeconds"]), (ScheduleJob.STATUS_QUEUED, None))
+        run_job(job.id)
+        body = self.client.get(url + "?responseFormat=json", headers=headers).json()
+        self.assertEqual(body["status"], ScheduleJob.STATUS_DONE)
+        self.assertTrue(any(item["title"] == "Gym" for item in body["Data"]))
+        self.assertGreaterEqual(body["runSeconds"], 0)
+
+        failed = ScheduleJob.objects.create(status=ScheduleJob.STATUS_FAILED, error="Error: upstream down")
+        body = self.client.get(f"/api/jobs/{failed.id}/", headers=headers).json()
+        self.assertEqual((body["status"], body["error"]), (ScheduleJob.STATUS_FAILED, "Error: upstream down"))
+
+    def test_job_stats_percentiles(self):
+        now = timezone.now()
+        for n in range(1, 21):
+            job = ScheduleJob.objects.create(status=ScheduleJob.STATUS_DONE)
+            # Waited n seconds, ran 2n seconds
+            ScheduleJob.objects.filter(id=job.id).update(
+                created_at=now, started_at=now + timedelta(seconds=n), finished_at=now + timedelta(seconds=3 * n)
+            )
+        ScheduleJob.objects.create()
+        stats = job_stats()
+        self.assertEqual((stats["queue_depth"], stats["running"]), (1, 0))
+        self.assertEqual(stats["wait_seconds"], {"count": 20, "avg": 10.5, "p50": 10, "p95": 19, "max": 20})
+        self.assertEqual(stats["run_seconds"], {"count": 20, "avg": 21.0, "p50": 20, "p95": 38, "max": 40})
+        self.assertEqual(job_stats(recent=5)["wait_seconds"]["count"], 5)
+
+
+def item(title, start, end, day="Monday", event_type="study", priority="3"):
+    return {"title": title, "start_time": start, "end_time": end, "event_day": day, "event_type": event_type,
+            "priority": priority, "color": "#000000"}
+
+
+class ScheduleRepairTests(SimpleTestCase):
+    def test_valid_schedule_has_no_problems(self):
+        items = generateLocalSchedule(TIMETABLE, "Class B", '{"Gym": 1, "Essay": 2}', "", "")
+        self.assertEqual(validateSchedule(items), [])
+
+    def test_flawed_schedule_round_trip(self):
+        items = [
+            item("Math", "07:00", "09:00", event_type="school"),
+            item("Essay", "08:30", "10:00"),
+            item("Gym", "4 PM", "5 PM", day="monday"),
+            item("Reading", "19:00", "18:00", day="Tuesday"),
+            item("Reading", "19:00", "18:00", day="Tuesday"),
+        ]
+        kinds = {kind for _, kind in validateSchedule(items)}
+        self.assertEqual(kinds, {"school_window", "overlap", "time", "day", "order"})
+
+        repaired, unresolved, repairs = repairSchedule(items)
+        self.assertEqual(validateSchedule(repaired), [])
+        self.assertEqual(unresolved, [])
+        self.assertEqual(repairs["duplicate"], 1)
+        math = next(i for i in repaired if i["title"] == "Math")
+        self.assertEqual((math["start_time"], math["end_time"]), ("08:00", "09:00"))
+        self.assertEqual([(i["event_day"], i["start_time"], i["end_time"]) for i in repaired if i["title"] == "Reading"],
+                         [("Tuesday", "18:00", "19:00")])
+        self.assertTrue(all(i["event_day"] == "Monday" for i in repaired if i["title"] in ("Essay", "Gym")))
+
+    def test_class_without_a_start_is_unresolved_not_moved_out_of_school_hours(self):
+        items = [item("Math", "", "09:00", event_type="school")]
+        repaired, unresolved, _ = repairSchedule(items)
+        self.assertEqual(repaired, [])
+        self.assertEqual(unresolved, items)
+
+    def test_class_with_no_free_time_left_is_unresolved(self):
+        math = item("Math", "08:00", "10:00", event_type="class")
+        physics = item("Physics", "08:00", "10:00", event_type="class")
+        repaired, unresolved, repairs = repairSchedule([math, physics])
+        self.assertEqual(repaired, [math])
+        self.assertEqual(unresolved, [physics])
+        self.assertNotIn("dropped", repairs)
+
+    def test_random_schedules_are_always_valid_after_repair(self):
+        rng = random.Random(7)
+        times = ["", None, "06:00", "07:00", "8:00", "08:00", "09:30", "12:00", "4 PM", "16:00", "17:00", "21:00",
+                 "23:59", "24:00", "25:00", "soon", 930]
+        days = ["Monday", "monday", "Tue", "Sunday", "Funday", None]
+        types = ["school", "class", "study", "break", "personal", None]
+        for _ in range(500):
+            items = [item(rng.choice(["Math", "Gym", "Break", "Essay", ""]), rng.choice(times), rng.choice(times),
+                          rng.choice(days), rng.choice(types), rng.choice(["1", "3", "x", None]))
+                     for _ in range(rng.randint(1, 25))]
+            repaired, unresolved, _ = repairSchedule(items)
+            self.assertEqual(validateSchedule(repaired), [], items)
+            for fixed in (i for i in repaired if i["event_type"] in ("school", "class")):
+                self.assertGreaterEqual(parseTime(fixed["start_time"]), SCHOOL_WINDOW[0])
+                self.assertLessEqual(parseTime(fixed["end_time"]), SCHOOL_WINDOW[1])
+
+    @override_settings(SCHEDULE_REPAIR_ENABLED=True, SCHEDULE_REPAIR_REPROMPT=False)
+    def test_pipeline_never_returns_an_invalid_schedule(self):
+        unresolved = metrics.counters().get("schedule_items_unresolved", 0)
+        avoided = metrics.counters().get("schedule_retries_avoided", 0)
+        result = repair_schedule([item("Math", "", "09:00", event_type="school"), item("Gym", "17:00", "18:00")],
+                                 "Class B", "", "")
+        self.assertEqual(validateSchedule(result), [])
+        self.assertEqual([i["title"] for i in result], ["Gym"])
+        self.assertEqual(metrics.counters().get("schedule_items_unresolved", 0), unresolved + 1)
+        self.assertEqual(metrics.counters().get("schedule_retries_avoided", 0), avoided)
+
+
+SCHEDULE = [
+    item("Maths", "08:00", "10:00", event_type="class"),
+    item('Essay "draft" \\ notes', "17:00", "18:00", day="Tuesday"),
+    item("Gym {legs}, [upper]", "18:30", "19:30", day="Friday", event_type="personal"),
+]
+
+
+class JsonArrayStreamParserTests(SimpleTestCase):
+    def response_text(self):
+        return ('Here is your schedule [as requested]:\n```json\n'
+                + json.dumps(SCHEDULE, indent=2) + '\n```\nLet me know if you want changes.')
+
+    def parse(self, chunks):
+        parser = JsonArrayStreamParser()
+        items = []
+        for chunk in chunks:
+            items.extend(parser.feed(chunk))
+        return parser, items + parser.finish()
+
+    def test_whole_response_skips_fences_and_prose(self):
+        parser, items = self.parse([self.response_text()])
+        self.assertTrue(parser.done)
+        self.assertEqual(items, SCHEDULE)
+
+    def test_one_character_at_a_time(self):
+        parser, items = self.parse(list(self.response_text()))
+        self.assertTrue(parser.done)
+        self.assertEqual(items, SCHEDULE)
+
+    def test_every_two_chunk_split(self):
+        # Covers splits inside strings, right after a backslash and between the fence and "["
+        text = self.response_text()
+        for cut in range(len(text) + 1):
+            parser, items = self.parse([text[:cut], text[cut:]])
+            self.assertEqual(items, SCHEDULE, f"split at {cut}: {text[cut - 5:cut]!r}|{text[cut:cut + 5]!r}")
+
+    def test_items_are_returned_as_soon_as_they_complete(self):
+        text = self.response_text()
+        first_end = text.index("}") + 1
+        parser = JsonArrayStreamParser()
+        self.assertEqual(parser.feed(text[:first_end - 1]), [])
+        self.assertEqual(parser.feed(text[first_end - 1:first_end]), SCHEDULE[:1])
+
+    def test_truncated_output_keeps_the_complete_items(self):
+        text = json.dumps(SCHEDULE)
+        last = text.rindex("{")
+        for cut in range(last + 1, len(text) - 1):
+            parser, items = self.parse([text[:cut]])
+            self.assertFalse(parser.done)
+            # The cut item only comes back once it still holds every required field
+            self.assertIn(len(items), (2, 3), f"cut at {cut}")
+            self.assertEqual(items[:2], SCHEDULE[:2])
+            if len(items) == 3:
+                self.assertEqual({key: items[2][key] for key in REQUIRED_ITEM_FIELDS},
+                                 {key: SCHEDULE[2][key] for key in REQUIRED_ITEM_FIELDS})
+
+    def test_malformed_item_is_logged_and_skipped(self):
+        text = '[{"title": "Maths", "start_time": 08:00}, ' + json.dumps(SCHEDULE[1]) + ']'
+        with self.assertLogs("api.utils.formate_json", "WARNING"):
+            parser, items = self.parse(list(text))
+        self.assertEqual(items, SCHEDULE[1:2])
+
+    def test_extract_from_response(self):
+        response = {"candidates": [{"content": {"parts": [{"text": self.response_text()}]}}]}
+        self.assertEqual(extract_json_array_from_response(response), SCHEDULE)
+
+    def test_response_without_an_array_is_logged(self):
+        response = {"candidates": [{"content": {"parts": [{"text": "Sorry, I cannot help with that."}]}}]}
+        with self.assertLogs("api.utils.formate_json", "WARNING") as logs:
+            self.assertEqual(extract_json_array_from_response(response), [])
+        self.assertIn("Error extracting JSON array", logs.output[0])
+        with self.assertLogs("api.utils.formate_json", "WARNING"):
+            self.assertEqual(extract_json_array_from_response({}), [])
+
+
+class ExtractionCacheCommandTests(TimetablePdfMixin, SimpleTestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp(prefix="extraction-cache-")
+        self.settings = override_settings(EXTRACTION_CACHE_ENABLED=True, EXTRACTION_CACHE_DIR=self.cache_dir,
+                                          EXTRACTION_TRIAGE=True)
+        self.settings.enable()
+        # The process wide cache is built from the settings on first use
+        extraction_cache._extraction_cache = None
+
+    def tearDown(self):
+        extraction_cache._extraction_cache = None
+        self.settings.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_invalidate_drops_the_entry_the_pipeline_wrote(self):
+        tables = extract_tables(self.pdf_path)
+        self.assertTrue(tables)
+        cache = extraction_cache.get_extraction_cache()
+        key = cache.make_key(self.pdf_data, build_extractor(self.pdf_data).cache_options())
+        self.assertIsNotNone(cache.get(key))
+
+        out = StringIO()
+        call_command("extraction_cache", invalidate=self.pdf_path, stdout=out)
+        self.assertIn("Invalidated", out.getvalue())
+        self.assertIsNone(cache.get(key))
+        self.assertEqual([files for _, _, files in os.walk(self.cache_dir) if files], [])
+
+    def test_settings_that_change_the_output_are_part_of_the_key(self):
+        extract_tables(self.pdf_path)
+        cache = extraction_cache.get_extraction_cache()
+        for name, value in (("OCR_MIN_TEXT_CHARS", 10 ** 6), ("OCR_DPI", 300), ("EXTRACTION_TRIAGE", False)):
+            with self.subTest(name), override_settings(**{name: value}):
+                key = cache.make_key(self.pdf_data, build_extractor(self.pdf_data).cache_options())
+                self.assertIsNone(cache.get(key))
+
+
+class TabulaWorkerTests(SimpleTestCase):
+    def setUp(self):
+        # The read timeout is far below a cold start (spawn, tabula import and JVM)
+        self.worker = TabulaWorker(timeout=0.05, health_timeout=60)
+
+    def tearDown(self):
+        self.worker.close()
+
+    def test_startup_does_not_count_against_the_first_request(self):
+        with self.assertRaises(TabulaWorkerError) as cm:
+            self.worker.read_pdf(os.path.join(tempfile.gettempdir(), "missing.pdf"), pages="all")
+        # Tabula's own error, not a timeout
+        self.assertIn("FileNotFoundError", str(cm.exception))
+        self.assertEqual(self.worker.restarts, 0)
+
+    def test_dead_worker_is_restarted_and_health_checked(self):
+        self.assertTrue(self.worker.healthy())
+        self.worker._process.kill()
+        self.worker._process.join()
+        self.assertTrue(self.worker.healthy())
+        self.assertEqual(self.worker.restarts, 1)
+
+
+class IncrementalTests(SimpleTestCase):
+    def test_task_changes(self):
+        base = {"userTasks": '{"Gym": "1h", "Essay": "2h"}'}
+        changed, removed = taskChanges(base, {"userTasks": '{"Gym": "1h", "Essay": "3h", "Reading": "45 min"}'})
+        self.assertEqual(([task["title"] for task in changed], removed), (["Essay", "Reading"], []))
+        changed, removed = taskChanges(base, {"userTasks": '{"Essay": "2h"}'})
+        self.assertEqual((changed, removed), ([], ["Gym"]))
+        # A new priority moves the task, so it counts as changed
+        changed, _ = taskChanges(base, {**base, "modelsAndTasksPriorities": '{"Gym": 5}'})
+        self.assertEqual([task["title"] for task in changed], ["Gym"])
+
+    def test_kept_items_drop_the_sessions_and_their_breaks(self):
+        items = [
+            item("Math", "08:00", "10:00", event_type="school"),
+            item("Gym session", "17:00", "18:00"),
+            item("Break", "18:00", "18:15", event_type="break"),
+            item("Essay", "18:15", "19:15"),
+            item("Gym", "08:00", "09:00", day="Tuesday", event_type="school"),
+        ]
+        kept = keptItems(items, ["gym"])
+        # The fixed class named like the task stays
+        self.assertEqual([(entry["title"], entry["event_day"]) for entry in kept],
+                         [("Math", "Monday"), ("Essay", "Monday"), ("Gym", "Tuesday")])
+
+
+@override_settings(API_SECRET_KEY="test-key", EXTRACTION_CACHE_ENABLED=False, SCHEDULE_LOCAL_FALLBACK=False,
+                   TIMETABLE_STORE_ENABLED=True)
+class TimetableStoreTests(TimetablePdfMixin, TestCase):
+    TASKS = '{"Gym": "1h", "Essay": "2h"}'
+
+    def setUp(self):
+        self.timetable = Timetable.objects.create(pdf_sha256="0" * 64, tables=TIMETABLE)
+        self.headers = {"x-api-key": "test-key"}
+
+    def inputs(self, **inputs):
+        return {"userClass": "Class B", "userTasks": self.TASKS, "preferences": "", "modelsAndTasksPriorities": "",
+                **inputs}
+
+    def test_regenerate_keeps_the_unchanged_items(self):
+        base_items, base, report = regenerate(self.timetable, self.inputs(), MODE_LOCAL)
+        self.assertEqual(report, {"incremental": False})
+        self.assertEqual(base.mode, Schedule.MODE_FULL)
+
+        items, schedule, report = regenerate(self.timetable, {"userTasks": '{"Gym": "1h", "Essay": "3h"}'},
+                                             MODE_LOCAL, base)
+        self.assertTrue(report["incremental"])
+        self.assertEqual((report["changedTasks"], report["removedTasks"]), (["Essay"], []))
+        self.assertEqual((schedule.mode, schedule.base_id, schedule.user_class),
+                         (Schedule.MODE_INCREMENTAL, base.id, "Class B"))
+        gym = [entry for entry in base_items if entry["title"] == "Gym"]
+        self.assertEqual([entry for entry in items if entry["title"] == "Gym"], gym)
+        self.assertFalse(validateSchedule(items))
+
+    def test_schedules_endpoint(self):
+        url = f"/api/timetables/{self.timetable.id}/schedules/"
+        self.assertEqual(self.client.post(url, {}, content_type="application/json").status_code, 401)
+        missing = f"/api/timetables/{uuid.uuid4()}/schedules/"
+        self.assertEqual(self.client.post(missing, {}, content_type="application/json",
+                                          headers=self.headers).status_code, 404)
+
+        response = self.client.post(url, {**self.inputs(), "mode": "local", "responseFormat": "json"},
+                                    content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["timetableId"], body["regeneration"]), (str(self.timetable.id), {"incremental": False}))
+        base_id = body["scheduleId"]
+
+        other = Timetable.objects.create(pdf_sha256="1" * 64, tables=TIMETABLE)
+        response = self.client.post(f"/api/timetables/{other.id}/schedules/", {"baseScheduleId": base_id},
+                                    content_type="application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+        # Only the changed field is sent, the rest comes from the base schedule
+        response = self.client.post(url, {"baseScheduleId": base_id, "userTasks": '{"Gym": "1h"}', "mode": "local",
+                                          "responseFormat": "json"},
+                                    content_type="application/json", headers=self.headers)
+        body = response.json()
+        self.assertEqual((body["regeneration"]["incremental"], body["regeneration"]["removedTasks"]), (True, ["Essay"]))
+        self.assertFalse(any(entry["title"] == "Essay" for entry in body["Data"]))
+        schedule = Schedule.objects.get(id=body["scheduleId"])
+        self.assertEqual((str(schedule.base_id), schedule.user_class), (base_id, "Class B"))
+
+    @override_settings(TIMETABLE_MAX_SCHEDULES=2)
+    def test_old_schedules_are_pruned(self):
+        schedules = [regenerate(self.timetable, self.inputs(), MODE_LOCAL)[1] for _ in range(3)]
+        self.assertEqual(set(self.timetable.schedules.values_list("id", flat=True)),
+                         {schedule.id for schedule in schedules[1:]})
+
+    @override_settings(TIMETABLE_STORE_MAX_ENTRIES=2, TIMETABLE_STORE_TTL=3600)
+    def test_old_and_least_recently_used_timetables_are_pruned(self):
+        expired = Timetable.objects.create(pdf_sha256="2" * 64, tables=TIMETABLE)
+        Timetable.objects.filter(id=expired.id).update(last_used_at=timezone.now() - timedelta(hours=2))
+        Timetable.objects.filter(id=self.timetable.id).update(last_used_at=timezone.now() - timedelta(minutes=5))
+        recent = Timetable.objects.create(pdf_sha256="3" * 64, tables=TIMETABLE)
+        generate_and_store(self.pdf_path, "Class B", self.TASKS, "", "", MODE_LOCAL)
+        self.assertEqual(Timetable.objects.count(), 2)
+        self.assertFalse(Timetable.objects.filter(id__in=[expired.id, self.timetable.id]).exists())
+        self.assertTrue(Timetable.objects.filter(id=recent.id).exists())
+
+    def test_upload_hashes_the_pdf_once(self):
+        cache_dir = tempfile.mkdtemp(prefix="extraction-cache-")
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        extraction_cache._extraction_cache = None
+        self.addCleanup(setattr, extraction_cache, "_extraction_cache", None)
+        with override_settings(EXTRACTION_CACHE_ENABLED=True, EXTRACTION_CACHE_DIR=cache_dir), \
+                mock.patch.object(ExtractionCache, "pdf_digest", side_effect=ExtractionCache.pdf_digest) as digest:
+            result, ids = generate_and_store(self.pdf_path, "Class B", self.TASKS, "", "", MODE_LOCAL)
+        self.assertEqual(digest.call_count, 1)
+        self.assertIsInstance(result, list)
+        timetable = Timetable.objects.get(id=ids["timetableId"])
+        self.assertEqual(timetable.pdf_sha256, hashlib.sha256(self.pdf_data).hexdigest())
+        self.assertEqual(Schedule.objects.get(id=ids["scheduleId"]).items, result)
+
+
+class CompactTablesTests(SimpleTestCase):
+    def test_empty_runs(self):
+        self.assertEqual(_compactRow(["Mon", EMPTY_CELL, EMPTY_CELL, EMPTY_CELL, "Math", EMPTY_CELL]), "Mon|~3|Math|~")
+
+    def test_cell_text_like_a_marker_is_escaped(self):
+        self.assertEqual(_compactRow(["~", "~3", "\\~", "a|b", "x\ny", EMPTY_CELL]), "\\~|\\~3|\\\\~|a/b|x y|~")
+        self.assertIn('"\\~3" is the text "~3"', COMPACT_LEGEND)
+
+    def test_missing_headers_are_empty_cells(self):
+        table = {"table_id": 1, "page_number": 2, "headers": ["Time", None, None, "Tuesday"],
+                 "data": [{"Time": "8:00", None: "Math", "Tuesday": "~"}]}
+        lines = encodeTablesCompact([table]).splitlines()
+        self.assertEqual(lines[:2], ["## table 1 page 2", "cols: Time|~2|Tuesday"])
+        self.assertNotIn("None", "\n".join(lines))
+
+
+class ScheduleDataTests(SimpleTestCase):
+    ITEMS = [item("Math", "08:00", "10:00", event_type="class"), dict(item("Gym", "17:00", "18:00"), room="B2")]
+
+    def test_json(self):
+        self.assertEqual(schedule_data(self.ITEMS, FORMAT_JSON), {"Data": self.ITEMS})
+
+    def test_compact_round_trips(self):
+        data = schedule_data(self.ITEMS, FORMAT_COMPACT)
+        self.assertEqual(data["fields"][:len(SCHEDULE_FIELDS)], list(SCHEDULE_FIELDS))
+        self.assertEqual(data["fields"][-1], "room")
+        rebuilt = [{key: value for key, value in zip(data["fields"], row) if key in entry}
+                   for row, entry in zip(data["Data"], self.ITEMS)]
+        self.assertEqual(rebuilt, self.ITEMS)
+
+    def test_legacy_is_the_python_text(self):
+        data = schedule_data(self.ITEMS, FORMAT_LEGACY)
+        self.assertEqual(data, {"Data": f" {self.ITEMS}"})
+        self.assertEqual(ast.literal_eval(data["Data"].strip()), self.ITEMS)
+
+    def test_errors(self):
+        self.assertEqual(schedule_data("Error: upstream down", FORMAT_JSON), {"Data": None, "error": "Error: upstream down"})
+        self.assertEqual(schedule_data("Error: upstream down", FORMAT_COMPACT)["Data"], None)
+        self.assertEqual(schedule_data("Error: upstream down", FORMAT_LEGACY), {"Data": " Error: upstream down"})
+
+
+@override_settings(RESPONSE_COMPRESSION_ENABLED=True, RESPONSE_COMPRESSION_MIN_BYTES=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    BODY = json.dumps([item(f"Revision {n}", "17:00", "18:00") for n in range(50)]).encode()
+
+    def respond(self, accept_encoding, response):
+        request = RequestFactory().get("/", headers={"Accept-Encoding": accept_encoding})
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation(self):
+        with mock.patch("api.middleware.brotli", object()):
+            self.assertEqual(choose_encoding("gzip, deflate, br"), "br")
+            self.assertEqual(choose_encoding("br;q=0.5, gzip"), "gzip")
+            self.assertEqual(choose_encoding("br;q=0, *;q=0.1"), "gzip")
+            self.assertEqual(choose_encoding("*"), "br")
+        with mock.patch("api.middleware.brotli", None):
+            self.assertEqual(choose_encoding("br"), None)
+            self.assertEqual(choose_encoding("br, gzip"), "gzip")
+        self.assertIsNone(choose_encoding(""))
+        self.assertIsNone(choose_encoding("identity, gzip;q=0"))
+
+    def test_gzip(self):
+        response = self.respond("gzip", HttpResponse(self.BODY, content_type="application/json"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.content), self.BODY)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+
+    @skipUnless(middleware.brotli, "Brotli is not installed")
+    def test_brotli(self):
+        response = self.respond("gzip, br", HttpResponse(self.BODY, content_type="application/json"))
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(middleware.brotli.decompress(response.content), self.BODY)
+
+    def test_small_bodies_are_sent_as_is(self):
+        response = self.respond("gzip, br", HttpResponse(self.BODY[:1023]))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, self.BODY[:1023])
+
+    def test_streaming_responses_are_left_alone(self):
+        response = self.respond("gzip, br", StreamingHttpResponse(iter([self.BODY]), content_type="text/event-stream"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(response.streaming_content), self.BODY)
+
+
+class ExtractionSuiteTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.mkdtemp(prefix="extraction-suite-")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+        super().tearDownClass()
+
+    def write_variant(self, name):
+        pdf_path = os.path.join(self.tmp, f"{name}.pdf")
+        truth_path = os.path.join(self.tmp, f"{name}.json")
+        truth = VARIANTS[name](pdf_path)
+        with open(truth_path, "w") as f:
+            json.dump(truth, f, ensure_ascii=False)
+        return pdf_path, truth_path, truth
+
+    def test_variants_draw_their_ground_truth(self):
+        for name in VARIANTS:
+            pdf_path, _, truth = self.write_variant(name)
+            with load_backend("pymupdf").pymupdf.open(pdf_path) as doc:
+                text = "".join(page.get_text() for page in doc)
+            self.assertEqual(len(truth), 4 if name == "multi_page" else 1, name)
+            if name == "scanned":
+                self.assertEqual(text.strip(), "")
+            elif name != "arabic":
+                self.assertTrue(all(cell in text for grid in truth for row in grid for cell in row if cell), name)
+
+    def test_cell_recall(self):
+        truth = [[["Time", "Monday"], ["08:00", "Math"], ["09:00", ""]]]
+        table = {"headers": ["Time", "Monday"], "cells": [["08:00", "MATH"], ["09:00", EMPTY_CELL]]}
+        self.assertEqual(cell_recall(truth, [table]), (5, 5))
+        self.assertEqual(cell_recall(truth, [dict(table, cells=[["08:00", EMPTY_CELL]])]), (3, 5))
+        # Right-to-left text extracted in visual order
+        self.assertEqual(cell_recall([[["رياضيات"]]], [{"headers": [], "cells": [["تايضاير"]]}]), (1, 1))
+
+    def test_measure_reads_the_bordered_timetable(self):
+        pdf_path, truth_path, _ = self.write_variant("bordered")
+        row = measure(pdf_path, truth_path, "pdfplumber", 1)
+        self.assertEqual((row["status"], row["tables"], row["recall"]), ("ok", 1, 1.0))
+
+    def test_compare_reports_recall_drops_and_slowdowns(self):
+        baseline = os.path.join(self.tmp, "baseline.json")
+        before = {"variant": "bordered", "status": "ok", "recall": 1.0, "seconds": 0.1}
+        with open(baseline, "w") as f:
+            json.dump({"results": [dict(before, backend=name) for name in ("camelot", "pdfplumber", "tabula")]}, f)
+        results = [
+            dict(before, backend="camelot", recall=0.9),
+            dict(before, backend="pdfplumber", seconds=0.14),
+            {"variant": "bordered", "backend": "tabula", "status": "error", "reason": "crash"},
+        ]
+        out = StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(compare(results, baseline, 1.5), 2)
+            self.assertEqual(compare([dict(before, backend="pdfplumber", seconds=0.16)], baseline, 1.5), 1)
+        self.assertIn("REGRESSION bordered/camelot: recall 100.0% -> 90.0%", out.getvalue())
+        self.assertIn("REGRESSION bordered/tabula: now error", out.getvalue())
+
+
+@override_settings(LLM_CACHE_ENABLED=True, LLM_CACHE_TTL=3600, LLM_CACHE_MAX_ENTRIES=2)
+class ResponseCacheTests(TestCase):
+    SCHEDULE = [item("Gym", "17:00", "18:00")]
+
+    def key(self, tables=TIMETABLE, user_class="Class B", tasks='{"Gym": "1h", "Essay": "2h"}', preferences="",
+            priorities='{"Gym": 2}'):
+        return make_response_cache_key("model", "1", tables, user_class, tasks, preferences, priorities)
+
+    def test_key_ignores_key_order_and_whitespace(self):
+        key = self.key()
+        self.assertEqual(self.key(tasks=' {"Essay":"2h",\n "Gym":"1h"} '), key)
+        self.assertEqual(self.key(user_class="  Class   B "), key)
+        self.assertEqual(self.key(tables=[{name: TIMETABLE[0][name] for name in reversed(list(TIMETABLE[0]))}]), key)
+        self.assertNotEqual(self.key(tasks='{"Gym": "2h", "Essay": "2h"}'), key)
+        self.assertNotEqual(self.key(user_class="Class C"), key)
+        self.assertNotEqual(make_response_cache_key("model", "2", TIMETABLE, "Class B", '{"Gym": "1h", "Essay": "2h"}',
+                                                    "", '{"Gym": 2}'), key)
+
+    def test_hit_and_expiry(self):
+        cache_response("a", "model", self.SCHEDULE)
+        hits = metrics.counters().get("llm_cache_hits", 0)
+        self.assertEqual(get_cached_response("a"), self.SCHEDULE)
+        self.assertEqual(metrics.counters().get("llm_cache_hits", 0), hits + 1)
+        self.assertEqual(LlmResponseCacheEntry.objects.get(key="a").hits, 1)
+
+        LlmResponseCacheEntry.objects.filter(key="a").update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertIsNone(get_cached_response("a"))
+        # Expired entries are dropped on the next write
+        cache_response("b", "model", self.SCHEDULE)
+        self.assertEqual(set(LlmResponseCacheEntry.objects.values_list("key", flat=True)), {"b"})
+
+    def test_least_recently_used_entry_is_evicted_on_write(self):
+        now = timezone.now()
+        for n, key in enumerate(["a", "b"]):
+            cache_response(key, "model", self.SCHEDULE)
+            LlmResponseCacheEntry.objects.filter(key=key).update(last_used_at=now - timedelta(minutes=10 - n))
+        # Reading "a" makes "b" the least recently used
+        get_cached_response("a")
+        cache_response("c", "model", self.SCHEDULE)
+        self.assertEqual(set(LlmResponseCacheEntry.objects.values_list("key", flat=True)), {"a", "c"})
+
+    def test_empty_results_are_not_cached(self):
+        cache_response("a", "model", [])
+        cache_response("b", "model", None)
+        self.assertFalse(LlmResponseCacheEntry.objects.exists())
+
+    @override_settings(LLM_CACHE_ENABLED=False)
+    def test_disabled(self):
+        cache_response("a", "model", self.SCHEDULE)
+        self.assertFalse(LlmResponseCacheEntry.objects.exists())
+        self.assertIsNone(get_cached_response("a"))
+
+
+@override_settings(API_SECRET_KEY="test-key", EXTRACTION_CACHE_ENABLED=False, TIMETABLE_STORE_ENABLED=False,
+                   SCHEDULE_LOCAL_FALLBACK=False)
+class PdfUploadTests(TimetablePdfMixin, SimpleTestCase):
+    def upload(self, content, **fields):
+        data = {"userClass": "Class B", "userTasks": '{"Gym": "1h"}', "mode": "local", "responseFormat": "json",
+                **fields}
+        if content is not None:
+            data["file"] = SimpleUploadedFile("timetable.pdf", content, content_type="application/pdf")
+        return self.client.post("/api/upload/", data, headers={"x-api-key": "test-key"})
+
+    def test_accepted_upload(self):
+        response = self.upload(self.pdf_data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any(entry["title"] == "Gym" for entry in response.json()["Data"]))
+
+    @override_settings(UPLOAD_MAX_BYTES=1000)
+    def test_oversized_content_length_is_refused(self):
+        response = self.upload(b"%PDF-" + b"0" * (FORM_FIELDS_ALLOWANCE + 1000))
+        self.assertEqual(response.status_code, 413)
+
+    @override_settings(UPLOAD_MAX_BYTES=1000)
+    def test_oversized_stream_is_stopped(self):
+        # Within the Content-Length allowance, so only the upload handler sees the file is too large
+        response = self.upload(b"%PDF-" + b"0" * 2000)
+        self.assertEqual(response.status_code, 413)
+        self.assertIn("File too large", response.json()["error"])
+
+    def test_missing_or_non_pdf_file(self):
+        self.assertEqual(self.upload(None).json(), {"error": "No file uploaded"})
+        response = self.upload(b"<html>not a pdf</html>")
+        self.assertEqual((response.status_code, response.json()["error"]), (400, "The uploaded file is not a PDF"))
+        response = self.upload(b"%PDF-1.7 truncated")
+        self.assertEqual((response.status_code, response.json()["error"]), (400, "The uploaded PDF could not be read"))
+
+    @override_settings(UPLOAD_MAX_PAGES=3)
+    def test_page_cap(self):
+        path = os.path.join(self.tmp, "four_pages.pdf")
+        multi_page(path, pages=4)
+        with open(path, "rb") as f:
+            response = self.upload(f.read())
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(response.json()["error"], "The PDF has 4 pages, the limit is 3")
+
+
+@override_settings(API_SECRET_KEY="test-key", EXTRACTION_CACHE_ENABLED=False, BATCH_MAX_PROFILES=3)
+class BatchScheduleTests(TimetablePdfMixin, SimpleTestCase):
+    def batch(self, profiles):
+        data = {"file": SimpleUploadedFile("timetable.pdf", self.pdf_data, content_type="application/pdf"),
+                "mode": "local", "responseFormat": "json"}
+        if profiles is not None:
+            data["profiles"] = profiles if isinstance(profiles, str) else json.dumps(profiles)
+        return self.client.post("/api/upload/batch/", data, headers={"x-api-key": "test-key"})
+
+    def test_identical_profiles_are_generated_once(self):
+        gym = {"userClass": "Class B", "userTasks": {"Gym": "1h"}}
+        response = self.batch([gym, {"userClass": "Class B", "userTasks": {"Essay": "2h"}}, dict(gym)])
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body["throughput"]["schedules"], body["throughput"]["generations"]), (3, 2))
+        results = body["results"]
+        self.assertEqual([entry["index"] for entry in results], [0, 1, 2])
+        self.assertEqual(results[0]["Data"], results[2]["Data"])
+        self.assertTrue(any(entry["title"] == "Essay" for entry in results[1]["Data"]))
+
+    def test_invalid_profiles(self):
+        for profiles in (None, "not json", "{}", "[]", "[1, 2]"):
+            response = self.batch(profiles)
+            self.assertEqual(response.status_code, 400, profiles)
+            self.assertIn("profiles must be", response.json()["error"])
+
+    def test_profile_cap(self):
+        response = self.batch([{"userClass": f"Class {n}"} for n in range(4)])
+        self.assertEqual((response.status_code, response.json()["error"]), (400, "Too many profiles, the limit is 3"))
+
+    def test_a_failed_generation_only_fails_its_entry(self):
+        def generate(tableData, userClass, **inputs):
+            if userClass == "Broken":
+                raise RuntimeError("boom")
+            return generateLocalSchedule(tableData, userClass, **inputs)
+
+        with mock.patch("api.utils.schedule_pipeline.generateLocalSchedule", side_effect=generate), \
+                self.assertLogs("api.utils.schedule_pipeline", "ERROR"):
+            response = self.batch([{"userClass": "Class B"}, {"userClass": "Broken"}])
+        results = response.json()["results"]
+        self.assertIsInstance(results[0]["Data"], list)
+        self.assertEqual(results[1], {"error": "Error: RuntimeError", "index": 1})
+
+
+class RecordingExtractor(PDFTableExtractor):
+    """Keeps a copy of every raw DataFrame the backends hand to the cleaning step"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.frames = []
+
+    def _clean_table(self, df):
+        self.frames.append(df.copy())
+        return super()._clean_table(df)
+
+
+class CleanTableTests(SimpleTestCase):
+    def assertSameAsReference(self, df):
+        reference = PDFTableExtractor._clean_dataframe(None, df.copy())
+        headers, cells = clean_table(df.copy())
+        table = table_records({"headers": headers, "cells": cells})
+        self.assertEqual(table["headers"], reference.columns.tolist())
+        # The prompt holds the repr of these records, so it has to match character for character
+        self.assertEqual(repr(table["data"]), repr(reference.to_dict(orient="records")))
+
+    def test_matches_the_reference_on_the_synthetic_pdfs(self):
+        tmp = tempfile.mkdtemp(prefix="clean-table-")
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        frames = 0
+        for name in ("bordered", "borderless", "multi_page", "arabic"):
+            path = os.path.join(tmp, f"{name}.pdf")
+            VARIANTS[name](path)
+            for backend in ("camelot", "pdfplumber"):
+                extractor = RecordingExtractor(path, backends=[backend])
+                extractor.extract_all_tables()
+                for df in extractor.frames:
+                    with self.subTest(variant=name, backend=backend):
+                        self.assertSameAsReference(df)
+                frames += len(extractor.frames)
+        self.assertGreaterEqual(frames, 8)
+
+    def test_matches_the_reference_on_edge_cases(self):
+        pd = load_backend("pandas").pd
+        # Object columns, as the extractors and the pinned pandas build them
+        self.assertSameAsReference(pd.DataFrame({
+            "Time": [" 08:00 ", None, "10:00", None],
+            "Monday": ["Math", None, "  ", None],
+            "Empty": [None, None, None, None],
+            None: ["", None, "\tLab\n", None],
+        }, dtype=object))
+        self.assertSameAsReference(pd.DataFrame({"a": [None, None]}, dtype=object))
+
+
+class CamelotMissesPage3(PDFTableExtractor):
+    """Camelot finding nothing on page 3, as it does on some real layouts"""
+
+    def _extract_with_camelot(self, pages=None, flavors=None):
+        pages = [page for page in pages if page != 3]
+        if pages:
+            super()._extract_with_camelot(pages=pages, flavors=flavors)
+
+
+class TriageTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.mkdtemp(prefix="triage-")
+        pymupdf = load_backend("pymupdf").pymupdf
+        # Page 1 a ruled timetable, page 2 a scan, page 3 another ruled timetable
+        cls.pdf_path = os.path.join(cls.tmp, "mixed.pdf")
+        with pymupdf.open() as doc:
+            for name in ("bordered", "scanned", "bordered"):
+                path = os.path.join(cls.tmp, f"{name}.pdf")
+                VARIANTS[name](path)
+                with pymupdf.open(path) as part:
+                    doc.insert_pdf(part)
+            doc.save(cls.pdf_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_page_chain(self):
+        extractor = PDFTableExtractor(self.pdf_path, triage=True)
+        a4, a2 = (595, 842), (1191, 1684)
+        self.assertEqual(extractor._page_chain(PageTriage(1, 0, 0, 0, *a4)), ["ocr"])
+        self.assertEqual(extractor._page_chain(PageTriage(1, 500, 10, 10, *a4)), ["camelot", "tabula", "pdfplumber"])
+        # Camelot's lattice flavor rasterizes the page, pdfplumber goes first on large ones
+        self.assertEqual(extractor._page_chain(PageTriage(1, 500, 10, 10, *a2)), ["pdfplumber", "camelot", "tabula"])
+        self.assertEqual(PDFTableExtractor(self.pdf_path, backends=["camelot"])._page_chain(PageTriage(1, 0, 0, 0, *a4)),
+                         [])
+
+    def test_failed_page_falls_through_and_scans_go_to_ocr(self):
+        extractor = CamelotMissesPage3(self.pdf_path, backends=["camelot", "pdfplumber", "ocr"], triage=True)
+        tables = extractor.extract_all_tables()
+        report = {row["page"]: row for row in extractor.page_report}
+        self.assertEqual([row["backend"] for row in report[1]["tried"]], ["camelot"])
+        self.assertEqual(report[1]["handled_by"], "camelot")
+        self.assertEqual([row["backend"] for row in report[2]["tried"]], ["ocr"])
+        self.assertEqual([row["backend"] for row in report[3]["tried"]], ["camelot", "pdfplumber"])
+        self.assertEqual(report[3]["handled_by"], "pdfplumber")
+        self.assertEqual([(table["page_number"], table["extraction_method"]) for table in tables if table["page_number"] != 2],
+                         [(1, "camelot"), (3, "pdfplumber")])
+        self.assertEqual([row["page"] for row in extractor.ocr_report], [2])
@@ -0,0 +1,134 @@
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from api.models import Schedule, Timetable
+from api.utils.extraction_cache import ExtractionCache
+from api.utils import metrics
+from api.utils.schedule_pipeline import (
+    extract_tables, extract_tables_async, generate_from_tables, generate_from_tables_async, regenerate_schedule, MODE_LLM,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def store_timetable(pdf_digest, tables):
+    """Timetable record for this PDF (by ExtractionCache.pdf_digest), refreshed with the latest extracted tables"""
+    timetable, created = Timetable.objects.update_or_create(pdf_sha256=pdf_digest, defaults={"tables": tables})
+    logger.info(f"{'Stored' if created else 'Refreshed'} timetable {timetable.id} ({len(tables)} tables)")
+    return timetable
+
+
+def prune_timetables():
+    """Drop timetables unused for TIMETABLE_STORE_TTL and the least recently used over TIMETABLE_STORE_MAX_ENTRIES
+
+    Their schedules go with them.
+    """
+    Timetable.objects.filter(last_used_at__lt=timezone.now() - timedelta(seconds=settings.TIMETABLE_STORE_TTL)).delete()
+    overflow = Timetable.objects.count() - settings.TIMETABLE_STORE_MAX_ENTRIES
+    if overflow > 0:
+        stale = Timetable.objects.order_by("last_used_at").values_list("id", flat=True)[:overflow]
+        Timetable.objects.filter(id__in=list(stale)).delete()
+
+
+def prune_schedules(timetable):
+    """Keep the TIMETABLE_MAX_SCHEDULES most recent schedules of a timetable"""
+    stale = timetable.schedules.order_by("-created_at").values_list("id", flat=True)[settings.TIMETABLE_MAX_SCHEDULES:]
+    Schedule.objects.filter(id__in=list(stale)).delete()
+
+
+def store_schedule(timetable, inputs, items, mode=Schedule.MODE_FULL, base=None):
+    return Schedule.objects.create(
+        timetable=timetable,
+        base=base,
+        mode=mode,
+        user_class=inputs.get("userClass"),
+        user_tasks=inputs.get("userTasks"),
+        preferences=inputs.get("preferences"),
+        models_and_tasks_priorities=inputs.get("modelsAndTasksPriorities"),
+        items=items,
+    )
+
+
+def schedule_inputs(schedule):
+    return {
+        "userClass": schedule.user_class,
+        "userTasks": schedule.user_tasks,
+        "preferences": schedule.preferences,
+        "modelsAndTasksPriorities": schedule.models_and_tasks_priorities,
+    }
+
+
+def _store(pdf_digest, tables, inputs, result):
+    """Ids to return with the upload response, empty when storing is off or the generation failed"""
+    if not settings.TIMETABLE_STORE_ENABLED or not tables:
+        return {}
+    try:
+        timetable = store_timetable(pdf_digest, tables)
+        ids = {"timetableId": str(timetable.id)}
+        if isinstance(result, list):
+            ids["scheduleId"] = str(store_schedule(timetable, inputs, result).id)
+            prune_schedules(timetable)
+        prune_timetables()
+        return ids
+    except Exception as e:
+        # The schedule is already generated, answer with it even if it could not be kept
+        logger.warning(f"Could not store the timetable: {str(e)}")
+        return {}
+
+
+def generate_and_store(pdf_data, user_class, user_tasks, preferences, models_and_tasks_priorities, mode=MODE_LLM):
+    """generate_schedule, keeping the extracted tables and the schedule; returns (result, ids)"""
+    # Hashed once, for both the extraction cache and the timetable record
+    pdf_digest = ExtractionCache.pdf_digest(pdf_data)
+    with metrics.stage("extract"):
+        tables = extract_tables(pdf_data, pdf_digest)
+    result = generate_from_tables(tables, user_class, user_tasks, preferences, models_and_tasks_priorities, mode)
+    inputs = dict(userClass=user_class, userTasks=user_tasks, preferences=preferences,
+                  modelsAndTasksPriorities=models_and_tasks_priorities)
+    with metrics.stage("store"):
+        return result, _store(pdf_digest, tables, inputs, result)
+
+
+async def generate_and_store_async(pdf_data, user_class, user_tasks, preferences, models_and_tasks_priorities, mode=MODE_LLM):
+    """generate_and_store for async views"""
+    pdf_digest = await sync_to_async(ExtractionCache.pdf_digest, thread_sensitive=False)(pdf_data)
+    tables = await extract_tables_async(pdf_data, pdf_digest)
+    result = await generate_from_tables_async(tables, user_class, user_tasks, preferences, models_and_tasks_priorities, mode)
+    inputs = dict(userClass=user_class, userTasks=user_tasks, preferences=preferences,
+                  modelsAndTasksPriorities=models_and_tasks_priorities)
+    with metrics.stage("store"):
+        return result, await sync_to_async(_store)(pdf_digest, tables, inputs, result)
+
+
+def regenerate(timetable, inputs, mode=MODE_LLM, base=None):
+    """New schedule from a stored timetable, incremental from `base` when given; returns (result, schedule, report)
+
+    Inputs missing from `inputs` are taken from the base schedule, so an edit only sends what changed.
+    """
+    base_inputs = schedule_inputs(base) if base else None
+    if base_inputs:
+        inputs = {name: inputs[name] if inputs.get(name) is not None else base_inputs[name] for name in base_inputs}
+    result, report = regenerate_schedule(
+        timetable.tables,
+        inputs.get("userClass"),
+        inputs.get("userTasks"),
+        inputs.get("preferences"),
+        inputs.get("modelsAndTasksPriorities"),
+        mode,
+        base_items=base.items if base else None,
+        base_inputs=base_inputs,
+    )
+    if not isinstance(result, list):
+        return result, None, report
+    with metrics.stage("store"):
+        timetable.save(update_fields=["last_used_at"])
+        schedule = store_schedule(
+            timetable, inputs, result,
+            mode=Schedule.MODE_INCREMENTAL if report["incremental"] else Schedule.MODE_FULL, base=base,
+        )
+        prune_schedules(timetable)
+    return result, schedule, report
@@ -0,0 +1,79 @@
+import logging
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from rest_framework import status
+
+from api.utils.extraction_backends import load_backend
+
+logger = logging.getLogger(__name__)
+
+# Room left in Content-Length for the multipart boundaries and the other form fields
+FORM_FIELDS_ALLOWANCE = 64 * 1024
+
+
+class UploadRejected(Exception):
+    """The uploaded PDF is missing or over the limits, carries the status to answer with"""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PdfUploadHandler(TemporaryFileUploadHandler):
+    """Write every upload straight to a temp file on disk, whatever its size, and stop past UPLOAD_MAX_BYTES"""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.received = 0
+        self.too_large = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.UPLOAD_MAX_BYTES:
+            self.too_large = True
+            raise StopUpload()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def use_pdf_upload_handler(request):
+    """Swap in PdfUploadHandler, must run before request.data / request.FILES is first read"""
+    handler = PdfUploadHandler()
+    request.upload_handlers = [handler]
+    return handler
+
+
+def uploaded_pdf_path(request, handler):
+    """Path of the uploaded PDF on disk once the size, type and page limits passed
+
+    The file is the upload handler's own temp file (removed by Django at the end of the request),
+    so every extractor reads the same file and the PDF is never copied into memory.
+    """
+    max_bytes = settings.UPLOAD_MAX_BYTES
+    too_large = UploadRejected(f"File too large, the limit is {max_bytes / (1024 * 1024):g} MB",
+                               status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    # Refuse before reading the body when the client announced its size
+    if int(request.META.get("CONTENT_LENGTH") or 0) > max_bytes + FORM_FIELDS_ALLOWANCE:
+        raise too_large
+
+    pdf_file = request.FILES.get("file")
+    if handler.too_large:
+        raise too_large
+    if not pdf_file:
+        raise UploadRejected("No file uploaded")
+
+    path = pdf_file.temporary_file_path()
+    with open(path, "rb") as f:
+        if f.read(5) != b"%PDF-":
+            raise UploadRejected("The uploaded file is not a PDF")
+    try:
+        with load_backend("pymupdf").pymupdf.open(path) as doc:
+            pages = doc.page_count
+    except Exception as e:
+        logger.warning(f"Rejected unreadable PDF upload: {str(e)}")
+        raise UploadRejected("The uploaded PDF could not be read")
+    if pages > settings.UPLOAD_MAX_PAGES:
+        raise UploadRejected(f"The PDF has {pages} pages, the limit is {settings.UPLOAD_MAX_PAGES}",
+                             status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    logger.info(f"Accepted PDF upload: {pdf_file.size} bytes, {pages} pages")
+    return path
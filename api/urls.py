@@ -1,6 +1,18 @@
 from django.urls import path
-from .views import SchedulePDFUploadView
+from django.views.decorators.csrf import csrf_exempt
+from .views import (
+    AsyncSchedulePDFUploadView, BatchScheduleView, MetricsView, SchedulePDFUploadView, ScheduleStreamView, ScheduleJobView,
+    ScheduleJobStatsView, ScheduleView, TimetableScheduleView,
+)
 
 urlpatterns = [
     path('upload/', SchedulePDFUploadView.as_view(), name='upload'),
+    path('upload/async/', csrf_exempt(AsyncSchedulePDFUploadView.as_view()), name='upload-async'),
+    path('upload/batch/', csrf_exempt(BatchScheduleView.as_view()), name='upload-batch'),
+    path('upload/stream/', ScheduleStreamView.as_view(), name='upload-stream'),
+    path('jobs/stats/', ScheduleJobStatsView.as_view(), name='job-stats'),
+    path('jobs/<uuid:job_id>/', ScheduleJobView.as_view(), name='job'),
+    path('timetables/<uuid:timetable_id>/schedules/', TimetableScheduleView.as_view(), name='timetable-schedules'),
+    path('schedules/<uuid:schedule_id>/', ScheduleView.as_view(), name='schedule'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
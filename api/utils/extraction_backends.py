@@ -0,0 +1,76 @@
+import importlib
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+# name -> zero argument loader returning a namespace with the backend's modules/classes.
+# Nothing heavy is imported until a backend is first selected (or preloaded).
+_loaders = {}
+_loaded = {}
+_lock = threading.RLock()
+
+
+def register_backend(name, loader):
+    """Register (or replace) a lazily imported extraction backend"""
+    with _lock:
+        _loaders[name] = loader
+        _loaded.pop(name, None)
+
+
+def load_backend(name):
+    """Import the backend on first use and return its namespace"""
+    with _lock:
+        if name not in _loaded:
+            if name not in _loaders:
+                raise ValueError(f"Unknown extraction backend: {name}")
+            start = time.perf_counter()
+            _loaded[name] = _loaders[name]()
+            logger.info(f"Loaded extraction backend {name} in {time.perf_counter() - start:.2f}s")
+        return _loaded[name]
+
+
+def preload_backends(names=None):
+    """Import backends up front, e.g. in the gunicorn master so forked workers share the pages"""
+    for name in names or list(_loaders):
+        try:
+            load_backend(name)
+        except Exception as e:
+            logger.warning(f"Could not preload extraction backend {name}: {str(e)}")
+
+
+def loaded_backends():
+    with _lock:
+        return sorted(_loaded)
+
+
+def _modules(**names):
+    return lambda: SimpleNamespace(**{alias: importlib.import_module(module) for alias, module in names.items()})
+
+
+def _load_camelot():
+    import camelot
+    from camelot.core import TableList
+    from camelot.handlers import PDFHandler
+    from camelot.parsers import Lattice, Stream
+    from camelot.utils import TemporaryDirectory
+
+    return SimpleNamespace(
+        camelot=camelot,
+        TableList=TableList,
+        PDFHandler=PDFHandler,
+        Lattice=Lattice,
+        Stream=Stream,
+        TemporaryDirectory=TemporaryDirectory,
+    )
+
+
+register_backend("pandas", _modules(pd="pandas", np="numpy"))
+register_backend("camelot", _load_camelot)
+register_backend("tabula", _modules(tabula="tabula"))
+register_backend("pdfplumber", _modules(pdfplumber="pdfplumber"))
+register_backend("pymupdf", _modules(pymupdf="pymupdf"))
+# PyMuPDF rasterizes one page at a time, without the poppler binaries pdf2image shells out to
+register_backend("ocr", _modules(pymupdf="pymupdf", pytesseract="pytesseract", np="numpy", cv2="cv2"))
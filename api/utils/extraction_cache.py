@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """Two tier (memory LRU + disk) cache of PDFTableExtractor results keyed by PDF content"""
+
+    def __init__(self, cache_dir=None, max_disk_bytes=256 * 1024 * 1024, max_memory_items=64):
+        self.cache_dir = str(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_items = max_memory_items
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def pdf_digest(pdf_bytes):
+        """sha256 of the PDF
+
+        pdf_bytes may also be a file path, hashed through a memory map instead of being read into
+        memory; the digest is the same as for the file's bytes.
+        """
+        digest = hashlib.sha256()
+        if isinstance(pdf_bytes, str):
+            with open(pdf_bytes, "rb") as f:
+                if os.fstat(f.fileno()).st_size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        digest.update(mapped)
+        else:
+            digest.update(pdf_bytes)
+        return digest.hexdigest()
+
+    @classmethod
+    def make_key(cls, pdf_bytes, options=None, pdf_digest=None):
+        """Hash the PDF digest together with the extractor version/options
+
+        pdf_digest: pdf_digest(pdf_bytes) when the caller already has it, the PDF is not hashed again
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps(options or {}, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update((pdf_digest or cls.pdf_digest(pdf_bytes)).encode("ascii"))
+        return digest.hexdigest()
+
+    def get_or_extract(self, pdf_bytes, extract, options=None, pdf_digest=None):
+        """Return the cached tables for this PDF or run `extract()` and store its result"""
+        key = self.make_key(pdf_bytes, options, pdf_digest)
+        tables = self.get(key)
+        if tables is not None:
+            return tables
+
+        tables = extract()
+        # Empty results are usually a backend failure (missing Java, bad scan...), don't pin them
+        if tables:
+            self.set(key, tables)
+        return tables
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                logger.info(f"Extraction cache memory hit {key[:12]}")
+                return self._memory[key]
+
+        tables = self._read_disk(key)
+        with self._lock:
+            if tables is None:
+                self.misses += 1
+                logger.info(f"Extraction cache miss {key[:12]}")
+                return None
+            self.disk_hits += 1
+            self._remember(key, tables)
+        logger.info(f"Extraction cache disk hit {key[:12]}")
+        return tables
+
+    def set(self, key, tables):
+        with self._lock:
+            self._remember(key, tables)
+        self._write_disk(key, tables)
+
+    def invalidate(self, key):
+        """Drop a single entry (by key) from both tiers, True when there was one"""
+        with self._lock:
+            found = self._memory.pop(key, None) is not None
+        path = self._path(key)
+        if path and os.path.exists(path):
+            os.remove(path)
+            found = True
+        return found
+
+    def invalidate_pdf(self, pdf_bytes, options=None):
+        return self.invalidate(self.make_key(pdf_bytes, options))
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        for path, _, _ in self._disk_entries():
+            os.remove(path)
+
+    def stats(self):
+        entries = self._disk_entries()
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "disk_items": len(entries),
+                "disk_bytes": sum(size for _, size, _ in entries),
+            }
+
+    def _remember(self, key, tables):
+        self._memory[key] = tables
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl")
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                tables = pickle.load(f)
+            # Touch the entry so eviction (oldest mtime first) behaves like an LRU
+            os.utime(path)
+            return tables
+        except Exception as e:
+            logger.warning(f"Dropping unreadable extraction cache entry {path}: {str(e)}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _write_disk(self, key, tables):
+        path = self._path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._evict_disk()
+        except Exception as e:
+            logger.warning(f"Could not write extraction cache entry {path}: {str(e)}")
+
+    def _disk_entries(self):
+        """List (path, size, mtime) for every entry on disk"""
+        entries = []
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return entries
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def _evict_disk(self):
+        """Remove the least recently used entries until the disk tier fits in max_disk_bytes"""
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+_extraction_cache = None
+
+
+def get_extraction_cache():
+    """Process wide cache configured from Django settings"""
+    global _extraction_cache
+    if _extraction_cache is None:
+        from django.conf import settings
+
+        _extraction_cache = ExtractionCache(
+            cache_dir=settings.EXTRACTION_CACHE_DIR,
+            max_disk_bytes=settings.EXTRACTION_CACHE_MAX_BYTES,
+            max_memory_items=settings.EXTRACTION_CACHE_MEMORY_ITEMS,
+        )
+    return _extraction_cache
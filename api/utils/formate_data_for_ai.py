@@ -1,24 +1,220 @@
 import io
 import os
 import logging
-import pandas as pd
-import camelot
-import tabula
-import pdfplumber
-from pdf2image import convert_from_bytes
-import pytesseract
-import numpy as np
-import cv2
+import multiprocessing
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from api.utils import metrics
+from api.utils.extraction_backends import load_backend
+from api.utils.ocr_grid import line_masks, read_table_grid
+from api.utils.table_format import clean_table
+from api.utils.tabula_worker import get_tabula_worker
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Picklable stand-in for camelot.core.Table carrying only what _extract_with_camelot reads
+CamelotPageTable = namedtuple("CamelotPageTable", ["page", "accuracy", "df"])
+
+# What the triage pass learned about a page (sizes in PDF points, line counts from the vector drawings)
+PageTriage = namedtuple("PageTriage", ["page", "text_chars", "horizontal_lines", "vertical_lines", "width", "height"])
+
+# OCR result of one rasterized page: tables as (x, y, w, h) + rows of cell text, and what the page cost
+OcrPageResult = namedtuple(
+    "OcrPageResult", ["page", "tables", "seconds", "peak_bytes", "cells", "blank_cells", "ocr_calls", "error"]
+)
+
+CAMELOT_FLAVORS = ("lattice", "stream")
+
+_page_pool = None
+_page_pool_workers = 0
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool(workers):
+    """Long-lived process pool so the heavy worker imports are paid once, not per request"""
+    global _page_pool, _page_pool_workers
+    with _page_pool_lock:
+        if _page_pool is None or _page_pool_workers != workers:
+            if _page_pool is not None:
+                _page_pool.shutdown(wait=False)
+            # spawn, not fork: the parent may be a threaded gunicorn worker
+            _page_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _page_pool_workers = workers
+        return _page_pool
+
+
+def _read_camelot_page(handler, page, tempdir, parsers):
+    """Split and lay out one page, then run each Camelot parser (flavor) against that layout"""
+    layout, dimensions, images, _, horizontal_text, vertical_text = handler._save_page(
+        handler.filepath, page, tempdir
+    )
+    page_path = os.path.join(tempdir, f"page-{page}.pdf")
+    results = []
+    for parser in parsers:
+        parser.prepare_page_parse(
+            page_path, layout, dimensions, page, images,
+            horizontal_text, vertical_text, layout_kwargs={}
+        )
+        results.append(parser.extract_tables())
+    return results
+
+
+def _camelot_parsers(cam, flavors):
+    return [cam.Lattice() if flavor == "lattice" else cam.Stream() for flavor in flavors]
+
+
+def _camelot_page_worker(filepath, page, flavors=CAMELOT_FLAVORS):
+    """Process pool entry point: Camelot tables of a single page, one list per flavor"""
+    cam = load_backend("camelot")
+    handler = cam.PDFHandler(filepath, pages=str(page))
+    with cam.TemporaryDirectory() as tempdir:
+        results = _read_camelot_page(handler, page, tempdir, _camelot_parsers(cam, flavors))
+    return [
+        [CamelotPageTable(table.page, table.accuracy, table.df) for table in sorted(tables)]
+        for tables in results
+    ]
+
+
+def _triage_pages(filepath):
+    """Cheap per page look at the vector content: text layer size, ruling lines and page size"""
+    pymupdf = load_backend("pymupdf").pymupdf
+    pages = []
+    with pymupdf.open(filepath) as doc:
+        for page in doc:
+            horizontal = vertical = 0
+            for drawing in page.get_drawings():
+                for item in drawing["items"]:
+                    if item[0] == "l":
+                        start, end = item[1], item[2]
+                        if abs(start.y - end.y) < 1:
+                            horizontal += 1
+                        elif abs(start.x - end.x) < 1:
+                            vertical += 1
+                    elif item[0] == "re":
+                        # Cell borders are often drawn as rectangles
+                        horizontal += 2
+                        vertical += 2
+            pages.append(PageTriage(
+                page.number + 1, len(page.get_text("text").strip()),
+                horizontal, vertical, page.rect.width, page.rect.height
+            ))
+    return pages
+
+
+def _pages_without_text(filepath, min_chars):
+    """1-based numbers of the pages whose text layer is (almost) empty, i.e. scans"""
+    pymupdf = load_backend("pymupdf").pymupdf
+    with pymupdf.open(filepath) as doc:
+        return [page.number + 1 for page in doc if len(page.get_text("text").strip()) < min_chars]
+
+
+def _detect_table_boundaries(horizontal_lines, vertical_lines):
+    """Detect table boundaries in an image from its ruling line masks"""
+    cv2 = load_backend("ocr").cv2
+    table_mask = cv2.add(horizontal_lines, vertical_lines)
+    contours, _ = cv2.findContours(table_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_size = 5000
+    table_contours = [cnt for cnt in contours if cv2.contourArea(cnt) > min_size]
+    table_boundaries = [cv2.boundingRect(cnt) for cnt in table_contours]
+    return table_boundaries
+
+
+def _ocr_table_rows(table_image):
+    """OCR a whole table region, one row per text line, cells split on runs of 2+ spaces
+
+    Used for regions that are not ruled grids (read_table_grid returns None for them).
+    """
+    text = load_backend("ocr").pytesseract.image_to_string(table_image, config='--psm 6')
+    return [re.split(r'\s{2,}', line.strip()) for line in text.splitlines() if line.strip()]
+
+
+def _ocr_page_worker(filepath, page, dpi, trace_memory=False):
+    """Rasterize a single page and OCR its tables (process pool entry point, also used in-process)
+
+    Only this page's bitmap is ever alive, so memory stays flat whatever the page count.
+    trace_memory: measure the page's peak with tracemalloc (slow, for benchmarks/ocr_pages.py),
+    peak_bytes is None otherwise
+    """
+    # Import before tracing starts, a cold worker would otherwise report (and pay for) traced imports
+    ocr = load_backend("ocr")
+    tracing = tracemalloc.is_tracing()
+    if trace_memory:
+        if tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+    start = time.perf_counter()
+    tables, error = [], None
+    counts = {"cells": 0, "blank_cells": 0, "ocr_calls": 0}
+    try:
+        with ocr.pymupdf.open(filepath) as doc:
+            pixmap = doc[page - 1].get_pixmap(dpi=dpi, alpha=False)
+            image = ocr.np.frombuffer(pixmap.samples, dtype=ocr.np.uint8).reshape(pixmap.h, pixmap.w, pixmap.n)
+            del pixmap
+        if image.shape[2] == 1:
+            image = ocr.cv2.cvtColor(image, ocr.cv2.COLOR_GRAY2RGB)
+        gray, thresh, horizontal_lines, vertical_lines = line_masks(image)
+        for x, y, w, h in _detect_table_boundaries(horizontal_lines, vertical_lines):
+            # Ruled tables are read cell by cell, anything else as one text block
+            rows, stats = read_table_grid(gray, thresh, horizontal_lines, vertical_lines, (x, y, w, h))
+            if rows is None:
+                rows = _ocr_table_rows(image[y:y+h, x:x+w])
+                stats = {"ocr_calls": 1}
+            for name, value in stats.items():
+                counts[name] += value
+            if rows:
+                tables.append(((x, y, w, h), rows))
+    except Exception as e:
+        error = f"{e.__class__.__name__}: {str(e)}"
+    seconds = time.perf_counter() - start
+    peak_bytes = None
+    if trace_memory:
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        if not tracing:
+            tracemalloc.stop()
+    return OcrPageResult(page, tables, seconds, peak_bytes, error=error, **counts)
+
+
 class PDFTableExtractor:
     """Extract tables from PDFs (both text-based tables and image-based tables)"""
+
+    # Bump whenever a change alters the extracted output so cached results are not reused
+    VERSION = "5"
+
+    # Fallback chain: each backend only runs when the previous ones found no table.
+    # "ocr" comes last and only rasterizes the pages without a text layer.
+    DEFAULT_BACKENDS = ("camelot", "tabula", "pdfplumber", "ocr")
+
+    # Triage: a page with at least this many horizontal and vertical ruling lines holds a ruled table
+    RULED_MIN_LINES = 2
+    # Pages larger than A3 (in square points) skip Camelot, whose lattice flavor rasterizes the whole page
+    LARGE_PAGE_AREA = 842 * 1191
     
-    def __init__(self, file):
-        """Initialize the PDF table extractor with a PDF file or file-like object"""
+    def __init__(self, file, shared_layout=True, workers=1, parallel_min_pages=4, backends=None,
+                 persistent_tabula=False, tabula_timeout=60, ocr_dpi=200, ocr_min_text_chars=20,
+                 triage=False, ocr_trace_memory=False):
+        """Initialize the PDF table extractor with a PDF file or file-like object
+
+        shared_layout: lay out every page once and run both Camelot flavors against it
+        instead of calling camelot.read_pdf once per flavor
+        workers: number of processes used to extract pages in parallel (1 keeps it in-process)
+        parallel_min_pages: documents with fewer pages stay on the single-process path
+        backends: extraction chain (names from the backend registry), DEFAULT_BACKENDS when None
+        persistent_tabula: run Tabula in the long-lived worker process instead of spawning java per call
+        tabula_timeout: seconds before a Tabula call in the worker is abandoned and the worker restarted
+        ocr_dpi: resolution the scanned pages are rasterized at for OCR
+        ocr_min_text_chars: pages with fewer characters in their text layer are treated as scans
+        ocr_trace_memory: record the peak traced memory of each OCR page in self.ocr_report (slow)
+        triage: pick the backend per page from a quick look at its content, and only fall back
+        for the pages that yielded nothing, instead of re-running the whole document per backend
+        """
         if isinstance(file, bytes):
             # If the file is in bytes, we can handle it directly
             self.file = io.BytesIO(file)
@@ -31,59 +227,177 @@ class PDFTableExtractor:
         else:
             raise ValueError("Invalid file provided. Please provide a file or file-like object.")
         
+        self.shared_layout = shared_layout
+        self.workers = workers
+        self.parallel_min_pages = parallel_min_pages
+        self.backends = tuple(backends or self.DEFAULT_BACKENDS)
+        self.persistent_tabula = persistent_tabula
+        self.tabula_timeout = tabula_timeout
+        self.ocr_dpi = ocr_dpi
+        self.ocr_min_text_chars = ocr_min_text_chars
+        self.ocr_trace_memory = ocr_trace_memory
+        self.triage = triage
+        self.ocr_report = []
+        self.page_report = []
         self.extracted_data = []
         self.tables_count = 0
 
+    def cache_options(self):
+        """Everything besides the PDF bytes that affects the extracted output"""
+        return {
+            "version": self.VERSION,
+            "backends": list(self.backends),
+            "ocr_dpi": self.ocr_dpi,
+            "ocr_min_text_chars": self.ocr_min_text_chars,
+            "triage": self.triage,
+        }
+
     def extract_all_tables(self):
         """Extract all tables from the PDF using multiple methods"""
         logger.info(f"Starting extraction of tables from the provided file")
         
-        # Try different extraction methods in order of preference
-        self._extract_with_camelot()  # Best for text-based tables
-        
-        # If no tables were found with Camelot, try other methods
-        if self.tables_count == 0:
-            self._extract_with_tabula()
-        
-        # # If still no tables, or additional tables might be in images, extract from images
-        # self._extract_from_images()
-        
-        # Use pdfplumber as last resort for simple tables
-        if self.tables_count == 0:
-            self._extract_with_pdfplumber()
+        if self.triage:
+            self._extract_triaged()
+        else:
+            # Try the extraction methods in order of preference (Camelot is best for text-based tables),
+            # the next one only runs if nothing was found yet. Backends are imported on first use.
+            methods = self._methods()
+            for name in self.backends:
+                if self.tables_count > 0:
+                    break
+                with metrics.stage(name):
+                    methods[name]()
         
         logger.info(f"Extracted {self.tables_count} tables in total")
         return self.extracted_data
     
-    def _extract_with_camelot(self):
-        """Extract tables using Camelot library (good for text-based tables)"""
+    def _methods(self):
+        return {
+            "camelot": self._extract_with_camelot,
+            "tabula": self._extract_with_tabula,
+            "pdfplumber": self._extract_with_pdfplumber,
+            "ocr": self._extract_from_images,
+        }
+    
+    def _page_chain(self, page):
+        """Backends to try on a triaged page, best guess first, then the rest of the configured chain"""
+        if page.text_chars < self.ocr_min_text_chars:
+            # Nothing for the text based extractors to read
+            return ["ocr"] if "ocr" in self.backends else []
+        chain = [name for name in self.backends if name != "ocr"]
+        if page.width * page.height > self.LARGE_PAGE_AREA and "pdfplumber" in chain:
+            chain.remove("pdfplumber")
+            chain.insert(0, "pdfplumber")
+        return chain
+    
+    def _is_ruled(self, page):
+        return page.horizontal_lines >= self.RULED_MIN_LINES and page.vertical_lines >= self.RULED_MIN_LINES
+    
+    def _extract_triaged(self):
+        """Run each page through its own backend chain, falling back only for the pages that failed
+
+        A page counts as failed when it yielded no table and either looks like it holds one (ruling
+        lines) or the document has no table at all yet; a text page without rules that yields nothing
+        is taken as a page without a table. Per page outcome is kept in self.page_report.
+        """
+        methods = self._methods()
+        filepath, is_temp = self._file_path_for_workers()
+        # Backends run several times on page subsets, let all of them re-open the same file by path
+        file, self.file = self.file, filepath
         try:
-            logger.info("Attempting table extraction with Camelot")
-            # Try with lattice method first (for tables with borders)
-            tables_lattice = camelot.read_pdf(self.file, pages='all', flavor='lattice')
+            start = time.perf_counter()
+            with metrics.stage("triage"):
+                triage = {page.page: page for page in _triage_pages(filepath)}
+            logger.info(f"Triaged {len(triage)} pages in {time.perf_counter() - start:.2f}s")
+            chains = {number: self._page_chain(page) for number, page in triage.items()}
+            tried = {number: [] for number in triage}
+            handled = {}
             
-            # Then try with stream method (for tables without clear borders)
-            tables_stream = camelot.read_pdf(self.file, pages='all', flavor='stream')
+            while True:
+                # Group the pending pages by the next backend of their chain
+                rounds = {}
+                for number, chain in chains.items():
+                    if chain and number not in handled:
+                        rounds.setdefault(chain.pop(0), []).append(number)
+                if not rounds:
+                    break
+                for name in [name for name in self.backends if name in rounds]:
+                    pages = rounds[name]
+                    before = len(self.extracted_data)
+                    start = time.perf_counter()
+                    with metrics.stage(name):
+                        if name == "camelot":
+                            flavors = {n: ("lattice",) if self._is_ruled(triage[n]) else ("stream",) for n in pages}
+                            methods[name](pages=pages, flavors=flavors)
+                        else:
+                            methods[name](pages=pages)
+                    elapsed = time.perf_counter() - start
+                    found = {table.get("page_number") for table in self.extracted_data[before:]}
+                    for number in pages:
+                        tried[number].append({"backend": name, "seconds": round(elapsed / len(pages), 3)})
+                        if number in found:
+                            handled[number] = name
+                # Stop the chain of the pages that are not expected to hold a table
+                for number, chain in chains.items():
+                    if number not in handled and self.tables_count > 0 and not self._is_ruled(triage[number]):
+                        chain.clear()
+        finally:
+            self.file = file
+            if is_temp:
+                os.remove(filepath)
+        
+        self.extracted_data.sort(key=lambda table: table.get("page_number") or 0)
+        for number, page in triage.items():
+            self.page_report.append({
+                "page": number,
+                "text_chars": page.text_chars,
+                "ruling_lines": page.horizontal_lines + page.vertical_lines,
+                "handled_by": handled.get(number),
+                "tried": tried[number],
+            })
+            logger.info(f"Page {number}: handled by {handled.get(number)}, tried {[t['backend'] for t in tried[number]]}")
+    
+    def _next_table_number(self, method):
+        """Table numbers continue across calls, a backend can run again on fallback pages"""
+        return sum(1 for table in self.extracted_data if table["extraction_method"] == method) + 1
+    
+    def _extract_with_camelot(self, pages=None, flavors=None):
+        """Extract tables using Camelot library (good for text-based tables)
+
+        pages: page numbers to read (all pages when None)
+        flavors: page number -> Camelot flavors to run on it (lattice and stream when None)
+        """
+        try:
+            logger.info("Attempting table extraction with Camelot")
+            camelot = load_backend("camelot").camelot
+            if self.shared_layout:
+                tables_lattice, tables_stream = self._read_camelot_shared_layout(pages, flavors)
+            else:
+                # Try with lattice method first (for tables with borders)
+                tables_lattice = self._read_camelot_flavor(camelot, 'lattice', pages, flavors)
+                
+                # Then try with stream method (for tables without clear borders)
+                tables_stream = self._read_camelot_flavor(camelot, 'stream', pages, flavors)
             
             camelot_tables = list(tables_lattice) + list(tables_stream)
             
             # Filter out low-accuracy tables
             camelot_tables = [table for table in camelot_tables if table.accuracy > 80]
             
+            first = self._next_table_number("camelot")
             for i, table in enumerate(camelot_tables):
-                df = table.df
                 # Clean data
-                df = self._clean_dataframe(df)
+                headers, cells = self._clean_table(table.df)
                 
-                if not df.empty:
+                if cells:
                     table_data = {
-                        "table_id": f"camelot_table_{i+1}",
+                        "table_id": f"camelot_table_{first + i}",
                         "page_number": table.page,
                         "extraction_method": "camelot",
                         "accuracy_score": table.accuracy,
-                        "data": df.to_dict(orient='records'),
-                        "headers": df.columns.tolist(),
-                        "shape": df.shape
+                        "cells": cells,
+                        "headers": headers,
+                        "shape": (len(cells), len(headers))
                     }
                     self.extracted_data.append(table_data)
                     self.tables_count += 1
@@ -92,23 +406,98 @@ class PDFTableExtractor:
         except Exception as e:
             logger.warning(f"Camelot extraction failed: {str(e)}")
     
-    def _extract_with_tabula(self):
-        """Extract tables using Tabula library"""
+    def _read_camelot_flavor(self, camelot, flavor, pages, flavors):
+        """camelot.read_pdf of one flavor over the pages that should get it"""
+        if pages is None:
+            return camelot.read_pdf(self.file, pages='all', flavor=flavor)
+        pages = [page for page in pages if flavor in (flavors or {}).get(page, CAMELOT_FLAVORS)]
+        if not pages:
+            return []
+        return camelot.read_pdf(self.file, pages=",".join(map(str, pages)), flavor=flavor)
+    
+    def _read_camelot_shared_layout(self, pages=None, flavors=None):
+        """Run the lattice and stream parsers against a single pdfminer layout per page
+
+        Mirrors camelot.read_pdf (PDFHandler.parse) but splits and lays out each page once
+        for both flavors, returning the same (lattice, stream) table lists. `pages` and
+        `flavors` narrow it down to some pages and, per page, to some flavors.
+        """
+        cam = load_backend("camelot")
+        handler = cam.PDFHandler(self.file, pages=",".join(map(str, pages)) if pages else 'all')
+        flavors = {page: (flavors or {}).get(page, CAMELOT_FLAVORS) for page in handler.pages}
+        if self.workers > 1 and len(handler.pages) >= self.parallel_min_pages:
+            try:
+                return self._read_camelot_parallel(handler.pages, flavors)
+            except Exception as e:
+                logger.warning(f"Parallel extraction failed, retrying in-process: {str(e)}")
+        
+        parsers = dict(zip(CAMELOT_FLAVORS, _camelot_parsers(cam, CAMELOT_FLAVORS)))
+        tables = {flavor: [] for flavor in CAMELOT_FLAVORS}
+        
+        with cam.TemporaryDirectory() as tempdir:
+            for page in handler.pages:
+                page_parsers = [parsers[flavor] for flavor in flavors[page]]
+                for flavor, found in zip(flavors[page], _read_camelot_page(handler, page, tempdir, page_parsers)):
+                    tables[flavor].extend(found)
+        
+        return cam.TableList(sorted(tables["lattice"])), cam.TableList(sorted(tables["stream"]))
+    
+    def _read_camelot_parallel(self, pages, flavors):
+        """Fan the pages out to the process pool and merge the results back in page order
+
+        Each page yields its tables already in Camelot order, so concatenating per page keeps
+        the same ordering (and therefore the same table_ids) as the single-process path.
+        """
+        logger.info(f"Extracting {len(pages)} pages with {self.workers} worker processes")
+        filepath, is_temp = self._file_path_for_workers()
+        try:
+            pool = _get_page_pool(self.workers)
+            futures = [pool.submit(_camelot_page_worker, filepath, page, flavors[page]) for page in pages]
+            tables = {flavor: [] for flavor in CAMELOT_FLAVORS}
+            for page, future in zip(pages, futures):
+                for flavor, found in zip(flavors[page], future.result()):
+                    tables[flavor].extend(found)
+        finally:
+            if is_temp:
+                os.remove(filepath)
+        return tables["lattice"], tables["stream"]
+    
+    def _file_path_for_workers(self):
+        """Worker processes re-open the PDF by path, spill in-memory files to a temp .pdf"""
+        if isinstance(self.file, str):
+            return self.file, False
+        self.file.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(self.file.read())
+        self.file.seek(0)
+        return f.name, True
+    
+    def _extract_with_tabula(self, pages=None):
+        """Extract tables using Tabula library
+
+        pages: page numbers to read (all pages in one call when None, otherwise one call per page
+        so the tables can be attributed to their page)
+        """
         try:
             logger.info("Attempting table extraction with Tabula")
-            tabula_tables = tabula.read_pdf(self.file, pages='all', multiple_tables=True)
+            if pages is None:
+                tabula_tables = [(None, df) for df in self._read_tabula('all')]
+            else:
+                tabula_tables = [(page, df) for page in pages for df in self._read_tabula(page)]
             
-            for i, df in enumerate(tabula_tables):
+            first = self._next_table_number("tabula")
+            for i, (page, df) in enumerate(tabula_tables):
                 # Clean data
-                df = self._clean_dataframe(df)
+                headers, cells = self._clean_table(df)
                 
-                if not df.empty:
+                if cells:
                     table_data = {
-                        "table_id": f"tabula_table_{i+1}",
+                        "table_id": f"tabula_table_{first + i}",
+                        **({"page_number": page} if page is not None else {}),
                         "extraction_method": "tabula",
-                        "data": df.to_dict(orient='records'),
-                        "headers": df.columns.tolist(),
-                        "shape": df.shape
+                        "cells": cells,
+                        "headers": headers,
+                        "shape": (len(cells), len(headers))
                     }
                     self.extracted_data.append(table_data)
                     self.tables_count += 1
@@ -117,14 +506,33 @@ class PDFTableExtractor:
         except Exception as e:
             logger.warning(f"Tabula extraction failed: {str(e)}")
     
-    def _extract_with_pdfplumber(self):
-        """Extract tables using pdfplumber library"""
+    def _read_tabula(self, pages):
+        if not self.persistent_tabula:
+            tabula = load_backend("tabula").tabula
+            return tabula.read_pdf(self.file, pages=pages, multiple_tables=True)
+        return self._read_tabula_persistent(pages)
+    
+    def _read_tabula_persistent(self, pages='all'):
+        """tabula.read_pdf through the long-lived worker (warm JVM) instead of a fresh java process"""
+        filepath, is_temp = self._file_path_for_workers()
+        try:
+            return get_tabula_worker(self.tabula_timeout).read_pdf(filepath, pages=pages, multiple_tables=True)
+        finally:
+            if is_temp:
+                os.remove(filepath)
+    
+    def _extract_with_pdfplumber(self, pages=None):
+        """Extract tables using pdfplumber library (from the given page numbers, all when None)"""
         try:
             logger.info("Attempting table extraction with pdfplumber")
+            pdfplumber = load_backend("pdfplumber").pdfplumber
+            pd = load_backend("pandas").pd
             table_count = 0
             
             with pdfplumber.open(self.file) as pdf:
                 for page_num, page in enumerate(pdf.pages):
+                    if pages is not None and page_num + 1 not in pages:
+                        continue
                     tables = page.extract_tables()
                     
                     for i, table_data in enumerate(tables):
@@ -139,16 +547,16 @@ class PDFTableExtractor:
                                 headers = [f"Column_{i}" for i in range(len(table_data[0]))]
                             
                             df = pd.DataFrame(data, columns=headers)
-                            df = self._clean_dataframe(df)
+                            headers, cells = self._clean_table(df)
                             
-                            if not df.empty:
+                            if cells:
                                 table_data = {
                                     "table_id": f"pdfplumber_table_p{page_num+1}_{i+1}",
                                     "page_number": page_num + 1,
                                     "extraction_method": "pdfplumber",
-                                    "data": df.to_dict(orient='records'),
-                                    "headers": df.columns.tolist(),
-                                    "shape": df.shape
+                                    "cells": cells,
+                                    "headers": headers,
+                                    "shape": (len(cells), len(headers))
                                 }
                                 self.extracted_data.append(table_data)
                                 table_count += 1
@@ -158,37 +566,55 @@ class PDFTableExtractor:
         except Exception as e:
             logger.warning(f"PDFPlumber extraction failed: {str(e)}")
     
-    def _extract_from_images(self):
-        """Extract tables from PDF pages by converting to images and using OCR"""
+    def _extract_from_images(self, pages=None):
+        """Extract tables from the scanned pages (no text layer) by rasterizing them and using OCR
+
+        pages: page numbers to OCR, the pages without a text layer are looked up when None
+
+        Pages are rasterized one at a time (in the worker pool when there are several), and the
+        time of each page (and its peak traced memory with ocr_trace_memory) is kept in self.ocr_report.
+        """
         try:
             logger.info("Attempting table extraction from PDF images")
-            # Convert PDF to images
-            pdf_data = self.file.read()
-            images = convert_from_bytes(pdf_data)
+            pd = load_backend("pandas").pd
+            filepath, is_temp = self._file_path_for_workers()
+            try:
+                if pages is None:
+                    pages = _pages_without_text(filepath, self.ocr_min_text_chars)
+                logger.info(f"{len(pages)} page(s) without a text layer to OCR at {self.ocr_dpi} dpi")
+                results = self._ocr_pages(filepath, pages)
+            finally:
+                if is_temp:
+                    os.remove(filepath)
             
-            for page_num, image in enumerate(images):
-                # Process each page as an image
-                image_np = np.array(image)
+            for result in results:
+                peak_mib = None if result.peak_bytes is None else round(result.peak_bytes / 2**20, 1)
+                self.ocr_report.append({
+                    "page": result.page,
+                    "seconds": round(result.seconds, 3),
+                    "peak_mib": peak_mib,
+                    "tables": len(result.tables),
+                    "cells": result.cells,
+                    "blank_cells": result.blank_cells,
+                    "ocr_calls": result.ocr_calls,
+                    "error": result.error,
+                })
+                if result.error:
+                    logger.warning(f"OCR failed on page {result.page}: {result.error}")
+                peak = "" if peak_mib is None else f", peak {peak_mib:.1f} MiB"
+                logger.info(f"OCR page {result.page}: {result.seconds:.2f}s{peak}")
                 
-                # Detect table boundaries
-                tables_coordinates = self._detect_table_boundaries(image_np)
-                
-                for i, coords in enumerate(tables_coordinates):
-                    # Extract the table region
-                    x, y, w, h = coords
-                    table_image = image_np[y:y+h, x:x+w]
-                    
-                    # Extract text from the table image using OCR
-                    df = self._extract_table_with_ocr(table_image)
+                for i, ((x, y, w, h), rows) in enumerate(result.tables):
+                    headers, cells = self._clean_table(pd.DataFrame(rows))
                     
-                    if df is not None and not df.empty:
+                    if cells:
                         table_data = {
-                            "table_id": f"image_table_p{page_num+1}_{i+1}",
-                            "page_number": page_num + 1,
+                            "table_id": f"image_table_p{result.page}_{i+1}",
+                            "page_number": result.page,
                             "extraction_method": "image_ocr",
-                            "data": df.to_dict(orient='records'),
-                            "headers": df.columns.tolist(),
-                            "shape": df.shape,
+                            "cells": cells,
+                            "headers": headers,
+                            "shape": (len(cells), len(headers)),
                             "coordinates": {"x": x, "y": y, "width": w, "height": h}
                         }
                         self.extracted_data.append(table_data)
@@ -198,37 +624,27 @@ class PDFTableExtractor:
         except Exception as e:
             logger.warning(f"Image-based extraction failed: {str(e)}")
     
-    def _detect_table_boundaries(self, image):
-        """Detect table boundaries in an image using OpenCV"""
-        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
-        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-        cv2.THRESH_BINARY_INV, 11, 2)
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 1))
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 25))
-        horizontal_lines = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, horizontal_kernel, iterations=2)
-        vertical_lines = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, vertical_kernel, iterations=2)
-        table_mask = cv2.add(horizontal_lines, vertical_lines)
-        contours, _ = cv2.findContours(table_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        min_size = 5000
-        table_contours = [cnt for cnt in contours if cv2.contourArea(cnt) > min_size]
-        table_boundaries = [cv2.boundingRect(cnt) for cnt in table_contours]
-        return table_boundaries
-    
-    def _extract_table_with_ocr(self, table_image):
-        """Extract table data from an image using OCR"""
-        text = pytesseract.image_to_string(table_image, config='--psm 6')
-        lines = text.splitlines()
-        table_data = []
-        
-        for line in lines:
-            columns = line.split(r'\s{2,}', line.strip())  # Split by multiple spaces
-            table_data.append(columns)
-        
-        df = pd.DataFrame(table_data)
-        return df if not df.empty else None
+    def _ocr_pages(self, filepath, pages):
+        """OCR the given pages, in parallel when there is more than one and workers allow it"""
+        if self.workers > 1 and len(pages) > 1:
+            try:
+                pool = _get_page_pool(self.workers)
+                futures = [pool.submit(_ocr_page_worker, filepath, page, self.ocr_dpi, self.ocr_trace_memory) for page in pages]
+                return [future.result() for future in futures]
+            except Exception as e:
+                logger.warning(f"Parallel OCR failed, retrying in-process: {str(e)}")
+        return [_ocr_page_worker(filepath, page, self.ocr_dpi, self.ocr_trace_memory) for page in pages]
+    
+    def _clean_table(self, df):
+        """table_format.clean_table, timed as the "clean" stage"""
+        with metrics.stage("clean"):
+            return clean_table(df)
     
     def _clean_dataframe(self, df):
-        """Clean up extracted dataframe (e.g., remove empty rows or columns and mark empty cells)"""
+        """Clean up extracted dataframe (e.g., remove empty rows or columns and mark empty cells)
+
+        Reference implementation of table_format.clean_table, kept for benchmarks/table_cleaning.py
+        """
         
         # Drop rows and columns that are completely empty
         df = df.dropna(how="all", axis=0)  # Drop fully empty rows
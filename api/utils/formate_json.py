@@ -1,22 +1,190 @@
 import json
+import logging
 import re
 
+logger = logging.getLogger(__name__)
+
+# A truncated trailing item is only kept when it still carries these fields
+REQUIRED_ITEM_FIELDS = ("title", "start_time", "end_time", "event_day")
+
 def extract_json_array_from_response(response: dict) -> list:
     try:
         # Step 1: Extract the raw markdown content
-        raw_text = response["candidates"][0]["content"]["parts"][0]["text"]
+        raw_text = "".join(
+            part.get("text", "") for part in response["candidates"][0]["content"]["parts"]
+        )
 
-        # Step 2: Match JSON array block inside ```json ... ```
-        match = re.search(r'```json\s*(\[\s*{.*?}\s*\])\s*```', raw_text, re.DOTALL)
-        if not match:
+        # Step 2: Scan the text for the schedule array (code fences and prose around it are skipped)
+        parser = JsonArrayStreamParser()
+        items = parser.feed(raw_text)
+        items.extend(parser.finish())
+        if not items and not parser.done:
             raise ValueError("JSON array block not found in the response.")
+        return items
 
-        json_str = match.group(1)
+    except Exception as e:
+        logger.warning("Error extracting JSON array: %s", e)
+        return []
 
-        # Step 3: Clean and parse the JSON array
-        cleaned = re.sub(r'[\x00-\x1f\x7f]', '', json_str)  # Remove unwanted control characters
-        return json.loads(cleaned)
 
-    except Exception as e:
-        print("Error extracting JSON array:", str(e))
+def extract_json_array_with_regex(raw_text: str) -> list:
+    """Previous whole-text implementation, kept as the baseline for benchmarks/json_parser.py"""
+    match = re.search(r'```json\s*(\[\s*{.*?}\s*\])\s*```', raw_text, re.DOTALL)
+    if not match:
         return []
+    cleaned = re.sub(r'[\x00-\x1f\x7f]', '', match.group(1))
+    return json.loads(cleaned)
+
+
+# Characters that can change the scanner state, outside and inside a string
+_STRUCTURAL = re.compile(r'["{}\[\],]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+# strict=False accepts raw control characters inside strings
+_DECODER = json.JSONDecoder(strict=False)
+
+
+class JsonArrayStreamParser:
+    """Pull complete objects out of a JSON array whose text arrives in chunks
+
+    feed() returns the array elements completed by that chunk, so callers can relay
+    schedule items while the model is still generating the rest of the array.
+    Text before the array (prose, a ```json fence, "[" used in a sentence) and after it
+    is ignored. finish() recovers the last item when the output was cut off.
+    """
+
+    def __init__(self):
+        self._in_array = False
+        self._array_pending = False  # saw "[", waiting to see whether an object or "]" follows
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item = []
+        self._item_len = 0
+        self._cuts = []  # item lengths right before each top level "," of the current object
+        self.done = False
+
+    def feed(self, text):
+        items = []
+        pos = 0
+        end = len(text)
+        while pos < end and not self.done:
+            if self._depth == 0:
+                pos = self._scan_between_items(text, pos)
+                if self._depth == 1 and text.find("}", pos) != -1:
+                    # Fast path: the whole object is already in this chunk, let the C decoder take it
+                    try:
+                        item, item_end = _DECODER.raw_decode(text, pos - 1)
+                    except ValueError:
+                        continue
+                    if isinstance(item, dict):
+                        items.append(item)
+                        self._depth = 0
+                        self._item, self._item_len, self._cuts = [], 0, []
+                        pos = item_end
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                    self._append(text[pos])
+                    pos += 1
+                    continue
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    self._append(text[pos:])
+                    break
+                self._append(text[pos:match.end()])
+                pos = match.end()
+                if match.group() == "\\":
+                    self._escaped = True
+                else:
+                    self._in_string = False
+                continue
+
+            match = _STRUCTURAL.search(text, pos)
+            if match is None:
+                self._append(text[pos:])
+                break
+            ch = match.group()
+            if ch == ",":
+                if self._depth == 1:
+                    self._cuts.append(self._item_len + match.start() - pos)
+                self._append(text[pos:match.end()])
+                pos = match.end()
+                continue
+            self._append(text[pos:match.end()])
+            pos = match.end()
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._parse_item("".join(self._item))
+                    if item is not None:
+                        items.append(item)
+                    self._item, self._item_len, self._cuts = [], 0, []
+        return items
+
+    def _scan_between_items(self, text, pos):
+        """Outside any object: look for the array start, the next object or the array end"""
+        end = len(text)
+        while pos < end:
+            ch = text[pos]
+            pos += 1
+            if ch.isspace():
+                continue
+            if self._array_pending:
+                self._array_pending = False
+                if ch == "{":
+                    self._in_array = True
+                elif ch == "]":
+                    self._in_array = True
+                    self.done = True
+                    return pos
+                else:
+                    # "[" was prose, not the array
+                    if ch == "[":
+                        self._array_pending = True
+                    continue
+            elif not self._in_array:
+                if ch == "[":
+                    self._array_pending = True
+                continue
+            elif ch == "]":
+                self.done = True
+                return pos
+            elif ch != "{":
+                continue
+            self._depth = 1
+            self._item, self._item_len, self._cuts = ["{"], 1, []
+            return pos
+        return pos
+
+    def _append(self, chunk):
+        if chunk:
+            self._item.append(chunk)
+            self._item_len += len(chunk)
+
+    def finish(self):
+        """Recover the trailing item of a truncated array, dropping its unfinished field"""
+        if self.done or self._depth == 0 or not self._cuts:
+            return []
+        raw = "".join(self._item)
+        for cut in reversed(self._cuts):
+            item = self._parse_item(raw[:cut] + "}", quiet=True)
+            if isinstance(item, dict):
+                if all(field in item for field in REQUIRED_ITEM_FIELDS):
+                    return [item]
+                break
+        return []
+
+    @staticmethod
+    def _parse_item(raw, quiet=False):
+        try:
+            return _DECODER.decode(raw)
+        except ValueError as e:
+            if not quiet:
+                logger.warning("Skipping malformed schedule item: %s", e)
+            return None
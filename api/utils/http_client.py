@@ -0,0 +1,249 @@
+import asyncio
+import itertools
+import logging
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# httpcore scans every pooled connection for every queued request, which gets quadratic with a few
+# hundred open connections; the async client splits its connections over pools of at most this size
+ASYNC_POOL_SHARD_SIZE = 32
+
+
+def backoff_delay(attempt, base, cap, retry_after=None):
+    """Full jitter exponential backoff, honouring a numeric Retry-After when it is larger"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, min(float(retry_after), cap))
+    return delay
+
+
+class CircuitOpenError(Exception):
+    """Raised without touching the network while the upstream is considered down"""
+
+
+class CircuitBreaker:
+    """Open after `threshold` consecutive failures, let one trial call through after `cooldown` seconds"""
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self._state()
+            if state == "open" or (state == "half-open" and self._trial_in_flight):
+                raise CircuitOpenError("Upstream circuit is open, failing fast")
+            if state == "half-open":
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.threshold:
+                logger.warning(f"Opening upstream circuit after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """End a half-open trial that ended neither way (e.g. cancelled), the next call becomes the trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class ResilientHttpClient:
+    """Shared keep-alive session with timeouts, jittered retries on 429/5xx and a circuit breaker"""
+
+    def __init__(self, connect_timeout=5.0, read_timeout=60.0, max_retries=2, backoff_base=0.5,
+                 backoff_max=8.0, pool_size=10, breaker_threshold=5, breaker_cooldown=30.0):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, url, **kwargs):
+        """POST with retries, returns the last response (which may still be an error status)
+
+        Raises CircuitOpenError when failing fast, or the last requests exception when every
+        attempt failed at the connection level.
+        """
+        self.breaker.before_call()
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self._post_with_retries(url, **kwargs)
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Not the upstream's fault, but a half-open trial must not stay in flight forever
+            self.breaker.release_trial()
+            raise
+        if response.status_code in RETRY_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def _post_with_retries(self, url, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"Upstream request failed ({e.__class__.__name__}), retrying")
+                self._sleep(attempt)
+                attempt += 1
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return response
+
+            logger.warning(f"Upstream answered {response.status_code}, retrying")
+            retry_after = response.headers.get("Retry-After")
+            response.close()
+            self._sleep(attempt, retry_after)
+            attempt += 1
+
+    def _sleep(self, attempt, retry_after=None):
+        time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after))
+
+
+async def _close_on_shutdown(sessions):
+    try:
+        yield
+    finally:
+        for session in sessions:
+            await session.aclose()
+
+
+class AsyncResilientHttpClient:
+    """ResilientHttpClient for async views: same timeouts, retries and circuit breaker on an httpx.AsyncClient
+
+    Waiting on the upstream (or on a backoff) yields to the event loop instead of holding a thread.
+    Pass the sync client's breaker to share the upstream's health between both clients.
+    """
+
+    def __init__(self, connect_timeout=5.0, read_timeout=60.0, max_retries=2, backoff_base=0.5,
+                 backoff_max=8.0, max_connections=100, breaker_threshold=5, breaker_cooldown=30.0, breaker=None):
+        # No pool timeout: past max_connections requests queue for a connection instead of failing
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=None)
+        self.shards = max(1, -(-max_connections // ASYNC_POOL_SHARD_SIZE))
+        per_shard = -(-max_connections // self.shards)
+        self.limits = httpx.Limits(max_connections=per_shard, max_keepalive_connections=per_shard)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(breaker_threshold, breaker_cooldown)
+        # event loop -> its AsyncClients, whose connections can only be used from that loop
+        self._sessions = weakref.WeakKeyDictionary()
+        self._sessions_lock = threading.Lock()
+        self._next_session = itertools.count()
+
+    async def _get_session(self):
+        """Next AsyncClient of the running loop, round robin over the shards
+
+        Under an ASGI server that is the worker's loop for its whole life; under WSGI every
+        async view runs on a fresh loop (async_to_sync), whose clients are closed as it shuts down.
+        """
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            entry = self._sessions.get(loop)
+            created = entry is None
+            if created:
+                sessions = [httpx.AsyncClient(timeout=self.timeout, limits=self.limits) for _ in range(self.shards)]
+                entry = self._sessions[loop] = (sessions, _close_on_shutdown(sessions))
+        if created:
+            # Started here, the generator is finalized by loop.shutdown_asyncgens() (asyncio.run,
+            # uvicorn), which runs its finally on the still running loop
+            await entry[1].__anext__()
+        return entry[0][next(self._next_session) % self.shards]
+
+    async def aclose(self):
+        """Close the running loop's clients now"""
+        with self._sessions_lock:
+            entry = self._sessions.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+
+    async def post(self, url, **kwargs):
+        """POST with retries, returns the last response (which may still be an error status)
+
+        Raises CircuitOpenError when failing fast, or the last httpx exception when every
+        attempt failed at the connection level.
+        """
+        self.breaker.before_call()
+        try:
+            response = await self._post_with_retries(url, **kwargs)
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled, or not the upstream's fault: don't leave the shared breaker's trial in flight
+            self.breaker.release_trial()
+            raise
+        if response.status_code in RETRY_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    async def _post_with_retries(self, url, **kwargs):
+        session = await self._get_session()
+        attempt = 0
+        while True:
+            try:
+                response = await session.post(url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                logger.warning(f"Upstream request failed ({e.__class__.__name__}), retrying")
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                attempt += 1
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return response
+
+            logger.warning(f"Upstream answered {response.status_code}, retrying")
+            retry_after = response.headers.get("Retry-After")
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after))
+            attempt += 1
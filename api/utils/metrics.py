@@ -0,0 +1,207 @@
+import bisect
+import contextvars
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) shared by every latency histogram
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, float("inf"))
+# Prompt / response sizes in bytes, 256 B to 4 MiB
+SIZE_BUCKETS = tuple(256 * 4 ** i for i in range(8)) + (float("inf"),)
+# Token counts reported by the model
+TOKEN_BUCKETS = tuple(64 * 4 ** i for i in range(7)) + (float("inf"),)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus style) that is safe to update from several threads"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[min(index, len(self.counts) - 1)] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        """Bucket upper bound containing the q-th observation"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            target = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if seen >= target:
+                    return bound
+            return self.buckets[-1]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count, 4) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+_histograms = {}
+_counters = {}
+_gauges = {}
+_registry_lock = threading.Lock()
+# (name, seconds) of the stages the current request went through, None outside of a request
+_request_stages = contextvars.ContextVar("request_stages", default=None)
+_process_start = time.time()
+
+
+def _key(name, labels):
+    """Registry key: the metric name, plus its labels rendered the Prometheus way"""
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def histogram(name, buckets=DEFAULT_BUCKETS, labels=None):
+    key = _key(name, labels)
+    with _registry_lock:
+        if key not in _histograms:
+            _histograms[key] = Histogram(buckets)
+        return _histograms[key]
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, labels=None):
+    histogram(name, buckets, labels).observe(value)
+
+
+def increment(name, amount=1, labels=None):
+    key = _key(name, labels)
+    with _registry_lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def adjust_gauge(name, amount):
+    with _registry_lock:
+        _gauges[name] = _gauges.get(name, 0) + amount
+
+
+def counters():
+    with _registry_lock:
+        return dict(_counters)
+
+
+def snapshot():
+    with _registry_lock:
+        histograms = dict(_histograms)
+    summary = {key: histograms[key].summary() for key in sorted(histograms)}
+    summary.update(counters())
+    return summary
+
+
+def process_metrics():
+    """Resource gauges of this process (Prometheus process_* names), read at scrape time"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    values = {
+        "process_cpu_seconds_total": usage.ru_utime + usage.ru_stime,
+        "process_start_time_seconds": _process_start,
+        "process_threads": threading.active_count(),
+        # ru_maxrss is KiB on Linux
+        "process_max_resident_memory_bytes": usage.ru_maxrss * 1024,
+    }
+    try:
+        with open("/proc/self/statm") as f:
+            values["process_resident_memory_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        values["process_open_fds"] = len(os.listdir("/proc/self/fd"))
+    except OSError:
+        pass
+    return values
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(prefix="studyai_"):
+    """Every metric of this process in the Prometheus text exposition format (version 0.0.4)
+
+    Each server process keeps its own registry, so with several workers a scrape sees one of them.
+    """
+    with _registry_lock:
+        histograms = dict(_histograms)
+        counter_values = dict(_counters)
+        gauges = dict(_gauges)
+    # Series of one metric have to be listed together
+    by_name = lambda key: (key.partition("{")[0], key)
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for key in sorted(histograms, key=by_name):
+        h = histograms[key]
+        with h._lock:
+            counts, count, total = list(h.counts), h.count, h.sum
+        name, _, labels = key.partition("{")
+        name = prefix + name
+        declare(name, "histogram")
+        # labels keeps its closing brace, the bucket bound goes in front of it
+        bucket_labels = "{" + (labels[:-1] + "," if labels else "")
+        cumulative = 0
+        for bound, bucket_count in zip(h.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{bucket_labels}le="{_number(bound)}"}} {cumulative}')
+        lines.append(f"{name}_sum{'{' + labels if labels else ''} {_number(total)}")
+        lines.append(f"{name}_count{'{' + labels if labels else ''} {count}")
+    for key in sorted(counter_values, key=by_name):
+        name, _, labels = key.partition("{")
+        name = prefix + name + "_total"
+        declare(name, "counter")
+        lines.append(f"{name}{'{' + labels if labels else ''} {_number(counter_values[key])}")
+    for name in sorted(gauges):
+        declare(prefix + name, "gauge")
+        lines.append(f"{prefix}{name} {_number(gauges[name])}")
+    for name, value in process_metrics().items():
+        declare(name, "counter" if name.endswith("_total") else "gauge")
+        lines.append(f"{name} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def start_request_stages():
+    """Collect the stages of the current request, returns (token for stop_request_stages, the stage list)"""
+    stages = []
+    return _request_stages.set(stages), stages
+
+
+def stop_request_stages(token):
+    _request_stages.reset(token)
+
+
+@contextmanager
+def stage(name):
+    """Time one pipeline stage (or a step inside one) into the stage_seconds{stage=name} histogram,
+    and into the request's stages"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe("stage_seconds", elapsed, labels={"stage": name})
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((name, elapsed))
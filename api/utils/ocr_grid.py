@@ -0,0 +1,148 @@
+import bisect
+
+from api.utils.extraction_backends import load_backend
+
+# A row (column) of the line mask is a ruling line when at least this share of the table width (height) is ink
+LINE_COVERAGE = 0.5
+# Ruling lines closer than this (pixels) to each other are the same line
+MIN_CELL_SIZE = 8
+# Pixels trimmed from each side of a cell so its borders are neither counted as ink nor OCRed
+CELL_MARGIN = 3
+# Cells with a smaller share of ink pixels are blank and never reach Tesseract
+BLANK_CELL_DENSITY = 0.005
+# Cells stacked into one image per Tesseract call, and the white gap between them
+BATCH_SIZE = 40
+BATCH_GAP = 20
+
+
+def line_masks(image):
+    """Grayscale page, its binarized ink and the horizontal / vertical ruling line masks"""
+    cv2 = load_backend("ocr").cv2
+    gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+    cv2.THRESH_BINARY_INV, 11, 2)
+    horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 1))
+    vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 25))
+    horizontal_lines = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, horizontal_kernel, iterations=2)
+    vertical_lines = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, vertical_kernel, iterations=2)
+    return gray, thresh, horizontal_lines, vertical_lines
+
+
+def _line_positions(mask, axis, length):
+    """Centers of the ruling lines in a mask region, from its projection profile along `axis`"""
+    np = load_backend("ocr").np
+    is_line = np.count_nonzero(mask, axis=axis) >= length * LINE_COVERAGE
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], is_line.view(np.int8), [0]))))
+    positions = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        center = (start + end - 1) // 2
+        if positions and center - positions[-1] < MIN_CELL_SIZE:
+            continue
+        positions.append(int(center))
+    # A table without an outer border still has its outermost row / column
+    if not positions or positions[0] >= MIN_CELL_SIZE:
+        positions.insert(0, 0)
+    if mask.shape[1 - axis] - 1 - positions[-1] >= MIN_CELL_SIZE:
+        positions.append(mask.shape[1 - axis] - 1)
+    return positions
+
+
+def grid_cells(horizontal_lines, vertical_lines, box):
+    """Cell rectangles of a ruled table, as rows of (x0, y0, x1, y1, span) in page coordinates
+
+    Neighbouring cells of a row are merged when the vertical line between them is missing there
+    (a class spanning several slots): the merged cell is kept once, with the number of columns it covers.
+    Returns None when the region lacks inner ruling lines in either direction, i.e. it is not a grid.
+    """
+    x, y, w, h = box
+    horizontal = horizontal_lines[y:y+h, x:x+w]
+    vertical = vertical_lines[y:y+h, x:x+w]
+    ys = _line_positions(horizontal, 1, w)
+    xs = _line_positions(vertical, 0, h)
+    if len(ys) < 3 or len(xs) < 3:
+        return None
+
+    rows = []
+    for top, bottom in zip(ys, ys[1:]):
+        band = vertical[top + CELL_MARGIN:bottom - CELL_MARGIN]
+        row = []
+        for left, right in zip(xs, xs[1:]):
+            if row and band.size:
+                # Is there a ruling line between this cell and the previous one, on this row?
+                strip = band[:, max(left - 2, 0):left + 3]
+                if strip.size and (strip.max(axis=1) > 0).mean() < LINE_COVERAGE:
+                    x0, y0, _, y1, span = row[-1]
+                    row[-1] = (x0, y0, x + right, y1, span + 1)
+                    continue
+            row.append((x + left, y + top, x + right, y + bottom, 1))
+        rows.append(row)
+    return rows
+
+
+def ocr_cells(gray, rects):
+    """Text of each rectangle, stacking the crops into tall images so Tesseract runs once per batch"""
+    ocr = load_backend("ocr")
+    np, pytesseract = ocr.np, ocr.pytesseract
+    texts = []
+    for start in range(0, len(rects), BATCH_SIZE):
+        crops = [gray[y0:y1, x0:x1] for x0, y0, x1, y1 in rects[start:start + BATCH_SIZE]]
+        width = max(crop.shape[1] for crop in crops) + 2 * BATCH_GAP
+        height = sum(crop.shape[0] + BATCH_GAP for crop in crops) + BATCH_GAP
+        canvas = np.full((height, width), 255, dtype=np.uint8)
+        tops = []
+        top = BATCH_GAP
+        for crop in crops:
+            canvas[top:top + crop.shape[0], BATCH_GAP:BATCH_GAP + crop.shape[1]] = crop
+            tops.append(top)
+            top += crop.shape[0] + BATCH_GAP
+
+        data = pytesseract.image_to_data(canvas, config='--psm 6', output_type=pytesseract.Output.DICT)
+        words = [[] for _ in crops]
+        for text, word_top, word_height in zip(data["text"], data["top"], data["height"]):
+            if text.strip():
+                # The word belongs to the crop its vertical center falls in
+                index = bisect.bisect_right(tops, word_top + word_height / 2) - 1
+                if 0 <= index < len(crops):
+                    words[index].append(text.strip())
+        texts.extend(" ".join(cell_words) for cell_words in words)
+    return texts
+
+
+def read_table_grid(gray, thresh, horizontal_lines, vertical_lines, box):
+    """Rows of cell text for a ruled table region, or None when it is not a grid
+
+    Returns (rows, stats) where stats counts the cells, the blank ones that were skipped and the
+    Tesseract calls. A merged cell's text is repeated in every column it spans.
+    """
+    np = load_backend("ocr").np
+    grid = grid_cells(horizontal_lines, vertical_lines, box)
+    if grid is None:
+        return None, None
+
+    cells, rects = [], []
+    for row in grid:
+        for x0, y0, x1, y1, span in row:
+            inner = (x0 + CELL_MARGIN, y0 + CELL_MARGIN, x1 - CELL_MARGIN, y1 - CELL_MARGIN)
+            ink = thresh[inner[1]:inner[3], inner[0]:inner[2]]
+            if ink.size and np.count_nonzero(ink) / ink.size >= BLANK_CELL_DENSITY:
+                cells.append(len(rects))
+                rects.append(inner)
+            else:
+                cells.append(None)
+    texts = ocr_cells(gray, rects) if rects else []
+
+    rows, index = [], 0
+    for row in grid:
+        values = []
+        for *_, span in row:
+            text = "" if cells[index] is None else texts[cells[index]]
+            values.extend([text] * span)
+            index += 1
+        rows.append(values)
+
+    stats = {
+        "cells": len(cells),
+        "blank_cells": len(cells) - len(rects),
+        "ocr_calls": -(-len(rects) // BATCH_SIZE),
+    }
+    return rows, stats
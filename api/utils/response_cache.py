@@ -0,0 +1,77 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import LlmResponseCacheEntry
+from api.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _canonical(value):
+    """Stable text for a form value: JSON is re-dumped with sorted keys, plain strings are trimmed"""
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            value = json.loads(text)
+        except ValueError:
+            return " ".join(text.split())
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False)
+
+
+def make_response_cache_key(model_name, prompt_version, tableData, userClass, userTasks, preferences, modelsAndTasksPriorities):
+    parts = [model_name, prompt_version, tableData, userClass, userTasks, preferences, modelsAndTasksPriorities]
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(_canonical(part).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def get_cached_response(key):
+    """Cached schedule for this key, or None when missing/expired (or the cache is unavailable)"""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    try:
+        entry = LlmResponseCacheEntry.objects.filter(key=key).first()
+        if entry is None or entry.created_at < timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL):
+            metrics.increment("llm_cache_misses")
+            logger.info(f"LLM cache miss {key[:12]}")
+            return None
+        LlmResponseCacheEntry.objects.filter(key=key).update(last_used_at=timezone.now(), hits=F("hits") + 1)
+    except Exception as e:
+        logger.warning(f"LLM cache lookup failed: {str(e)}")
+        return None
+    metrics.increment("llm_cache_hits")
+    logger.info(f"LLM cache hit {key[:12]}")
+    return entry.response
+
+
+def cache_response(key, model_name, response):
+    """Store a generated schedule and evict expired and least recently used entries"""
+    if not settings.LLM_CACHE_ENABLED or not response:
+        return
+    try:
+        now = timezone.now()
+        LlmResponseCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={"model_name": model_name, "response": response, "created_at": now, "last_used_at": now, "hits": 0},
+        )
+        evict_responses()
+    except Exception as e:
+        logger.warning(f"LLM cache store failed: {str(e)}")
+
+
+def evict_responses():
+    LlmResponseCacheEntry.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=settings.LLM_CACHE_TTL)
+    ).delete()
+    overflow = LlmResponseCacheEntry.objects.count() - settings.LLM_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        stale = LlmResponseCacheEntry.objects.order_by("last_used_at").values_list("key", flat=True)[:overflow]
+        LlmResponseCacheEntry.objects.filter(key__in=list(stale)).delete()
@@ -0,0 +1,43 @@
+from django.conf import settings
+
+FORMAT_JSON = "json"
+FORMAT_COMPACT = "compact"
+FORMAT_LEGACY = "legacy"
+FORMATS = (FORMAT_JSON, FORMAT_COMPACT, FORMAT_LEGACY)
+
+# Column order of the compact form, keys an item has beyond these are appended
+SCHEDULE_FIELDS = ("title", "start_time", "end_time", "event_type", "event_day", "priority", "color", "user_id", "module_id")
+
+
+def response_format(request, data=None):
+    """The responseFormat asked for (query string, then the form/JSON body), SCHEDULE_RESPONSE_FORMAT otherwise"""
+    value = request.GET.get("responseFormat")
+    if value is None and data is not None:
+        value = data.get("responseFormat")
+    value = str(value or settings.SCHEDULE_RESPONSE_FORMAT).strip().lower()
+    return value if value in FORMATS else settings.SCHEDULE_RESPONSE_FORMAT
+
+
+def compact_items(items):
+    """(fields, one row per item): the keys are sent once instead of once per item"""
+    fields = list(SCHEDULE_FIELDS)
+    for item in items:
+        fields.extend(key for key in item if key not in fields)
+    return fields, [[item.get(field) for field in fields] for item in items]
+
+
+def schedule_data(result, fmt):
+    """Response fields for a generated schedule (a list of items, or an "Error: ..." string)
+
+    json: Data is the array of items. compact: Data is one array per item, in the order of
+    `fields`. legacy: Data is the list as the Python text it used to be, " [{'title': ...}]".
+    A failed generation has Data null and the message in error, except in legacy.
+    """
+    if fmt == FORMAT_LEGACY:
+        return {"Data": f" {result}"}
+    if not isinstance(result, list):
+        return {"Data": None, "error": str(result)}
+    if fmt == FORMAT_COMPACT and all(isinstance(item, dict) for item in result):
+        fields, rows = compact_items(result)
+        return {"Data": rows, "fields": fields}
+    return {"Data": result}
@@ -0,0 +1,383 @@
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+
+from api.model.incremental import keptItems, taskChanges
+from api.model.local_scheduler import generateLocalSchedule, placeLocalTasks, sortItems
+from api.model.response_model import (
+    getIncrementalResponseFromEndPoint, getIncrementalResponseFromEndPointAsync, getResponseFromEndPoint,
+    getResponseFromEndPointAsync, streamResponseFromEndPoint,
+)
+from api.model.schedule_repair import itemAsTask, repairSchedule, validateSchedule
+from api.utils.extraction_cache import get_extraction_cache
+from api.utils import metrics
+from api.utils.formate_data_for_ai import PDFTableExtractor
+
+logger = logging.getLogger(__name__)
+
+MODE_LLM = "llm"
+MODE_LOCAL = "local"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """Bounded pool for the CPU-bound steps of async requests, past ASYNC_EXTRACTION_THREADS they queue"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_EXTRACTION_THREADS, thread_name_prefix="async-extraction"
+            )
+        return _executor
+
+
+def _run_in_executor(fn, *args, **kwargs):
+    """fn on the bounded executor, in a copy of the caller's context so its stages land on the request"""
+    call = partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return asyncio.get_running_loop().run_in_executor(_get_executor(), call)
+
+
+def build_extractor(pdf_data):
+    """PDFTableExtractor configured from the settings; its cache_options() are the extraction cache's key"""
+    return PDFTableExtractor(
+        pdf_data,
+        workers=settings.EXTRACTION_WORKERS,
+        parallel_min_pages=settings.EXTRACTION_PARALLEL_MIN_PAGES,
+        backends=settings.EXTRACTION_BACKENDS,
+        persistent_tabula=settings.TABULA_PERSISTENT,
+        tabula_timeout=settings.TABULA_TIMEOUT,
+        ocr_dpi=settings.OCR_DPI,
+        ocr_min_text_chars=settings.OCR_MIN_TEXT_CHARS,
+        triage=settings.EXTRACTION_TRIAGE,
+        ocr_trace_memory=settings.OCR_TRACE_MEMORY,
+    )
+
+
+def extract_tables(pdf_data, pdf_digest=None):
+    """Extract the timetable tables from the PDF (bytes or a file path), going through the extraction cache
+
+    pdf_digest: ExtractionCache.pdf_digest(pdf_data) when the caller already computed it
+    """
+    extractor = build_extractor(pdf_data)
+    if settings.EXTRACTION_CACHE_ENABLED:
+        return get_extraction_cache().get_or_extract(
+            pdf_data, extractor.extract_all_tables, extractor.cache_options(), pdf_digest
+        )
+    return extractor.extract_all_tables()
+
+
+def generate_schedule(pdf_data, user_class, user_tasks, preferences, models_and_tasks_priorities, mode=MODE_LLM):
+    """Full upload pipeline: PDF extraction followed by the schedule generation
+
+    mode="local" skips the LLM and uses the deterministic scheduler. In LLM mode the local
+    scheduler is also the fallback when the upstream fails (error, timeout, open circuit).
+    """
+    with metrics.stage("extract"):
+        tables = extract_tables(pdf_data)
+    return generate_from_tables(tables, user_class, user_tasks, preferences, models_and_tasks_priorities, mode)
+
+
+def generate_from_tables(tables, user_class, user_tasks, preferences, models_and_tasks_priorities, mode=MODE_LLM):
+    """The generation half of generate_schedule, for tables extracted earlier"""
+    inputs = dict(
+        tableData = tables,
+        userClass = user_class,
+        userTasks = user_tasks,
+        preferences = preferences,
+        modelsAndTasksPriorities = models_and_tasks_priorities,
+    )
+    if mode == MODE_LOCAL:
+        with metrics.stage("local"):
+            return generateLocalSchedule(**inputs)
+
+    with metrics.stage("llm"):
+        result = getResponseFromEndPoint(**inputs)
+    if isinstance(result, list):
+        return repair_schedule(result, user_class, preferences, models_and_tasks_priorities)
+    if not settings.SCHEDULE_LOCAL_FALLBACK:
+        return result
+    logger.warning(f"Upstream generation failed ({result}), falling back to the local scheduler")
+    metrics.increment("local_fallbacks")
+    with metrics.stage("fallback"):
+        return generateLocalSchedule(**inputs)
+
+
+def regenerate_schedule(tables, user_class, user_tasks, preferences, models_and_tasks_priorities, mode=MODE_LLM,
+                        base_items=None, base_inputs=None):
+    """A new schedule from stored tables, placing only what changed since a base schedule
+
+    base_inputs holds the userClass, userTasks, preferences and modelsAndTasksPriorities the
+    base_items were generated from. Tasks are compared once their priority and preferred window
+    are resolved: the sessions of changed and removed tasks are dropped, the school slots and
+    every other item are kept, and only the changed tasks are placed around them (by the LLM, or
+    the local scheduler in local mode and as fallback). Without a base, or when the class
+    changed, the whole schedule is generated from the tables. Returns (result, report).
+    """
+    if base_items is None or base_inputs is None or base_inputs.get("userClass") != user_class:
+        result = generate_from_tables(tables, user_class, user_tasks, preferences, models_and_tasks_priorities, mode)
+        return result, {"incremental": False}
+
+    changed, removed = taskChanges(
+        base_inputs, dict(userTasks=user_tasks, preferences=preferences, modelsAndTasksPriorities=models_and_tasks_priorities)
+    )
+    kept = keptItems(base_items, [task["title"] for task in changed] + removed)
+    report = {
+        "incremental": True,
+        "changedTasks": [task["title"] for task in changed],
+        "removedTasks": removed,
+        "keptItems": len(kept),
+    }
+    metrics.increment("incremental_regenerations")
+    metrics.increment("incremental_kept_items", len(kept))
+    if not changed:
+        report["newItems"] = 0
+        return sortItems(kept), report
+
+    if mode == MODE_LOCAL:
+        with metrics.stage("local"):
+            new_items = placeLocalTasks(kept, changed)
+    else:
+        with metrics.stage("llm"):
+            new_items = getIncrementalResponseFromEndPoint(kept, user_class, changed, preferences, models_and_tasks_priorities)
+        if not isinstance(new_items, list):
+            if not settings.SCHEDULE_LOCAL_FALLBACK:
+                return new_items, report
+            logger.warning(f"Upstream placement failed ({new_items}), falling back to the local scheduler")
+            metrics.increment("local_fallbacks")
+            with metrics.stage("fallback"):
+                new_items = placeLocalTasks(kept, changed)
+        else:
+            report["newItems"] = len(new_items)
+            # The model placed these around the kept items, check them together
+            return sortItems(repair_schedule(kept + new_items, user_class, preferences, models_and_tasks_priorities)), report
+    report["newItems"] = len(new_items)
+    return sortItems(kept + new_items), report
+
+
+def _check_schedule(items):
+    """(repaired items, unresolved items) when the schedule has problems, None when it is valid"""
+    with metrics.stage("repair"):
+        problems = validateSchedule(items)
+        if not problems:
+            metrics.increment("schedules_valid")
+            return None
+        repaired, unresolved, repairs = repairSchedule(items)
+    for kind, count in repairs.items():
+        metrics.increment("schedule_repairs", count, labels={"kind": kind})
+    logger.info(f"Repaired {len(problems)} schedule problems locally ({repairs}), {len(unresolved)} items left")
+    if not unresolved:
+        metrics.increment("schedule_retries_avoided")
+    return repaired, unresolved
+
+
+def _merge_placed(repaired, unresolved, placed):
+    """Repaired schedule with the items the re-prompt placed, what still conflicts is dropped"""
+    if not isinstance(placed, list):
+        logger.warning(f"Re-prompt failed ({placed}), dropping {len(unresolved)} unplaced items")
+        metrics.increment("schedule_items_unresolved", len(unresolved))
+        return repaired
+    with metrics.stage("repair"):
+        merged, still, _ = repairSchedule(repaired + placed)
+    # Items the model left out count as unresolved too
+    missing = len(still) + max(0, len(unresolved) - len(placed))
+    if missing:
+        metrics.increment("schedule_items_unresolved", missing)
+    return merged
+
+
+def _reprompt(unresolved):
+    """Whether the unresolved items go back to the model, counted when they do"""
+    if not settings.SCHEDULE_REPAIR_REPROMPT:
+        metrics.increment("schedule_items_unresolved", len(unresolved))
+        return False
+    metrics.increment("schedule_reprompts")
+    return True
+
+
+def repair_schedule(items, user_class, preferences, models_and_tasks_priorities):
+    """Generated items checked and fixed locally, see schedule_repair.repairSchedule
+
+    Only the items local repair could not place are sent back to the model (the incremental
+    prompt, around the repaired schedule), so a flawed answer costs a small call instead of a
+    whole new generation.
+    """
+    if not settings.SCHEDULE_REPAIR_ENABLED:
+        return items
+    checked = _check_schedule(items)
+    if checked is None:
+        return items
+    repaired, unresolved = checked
+    if not unresolved or not _reprompt(unresolved):
+        return repaired
+    with metrics.stage("reprompt"):
+        placed = getIncrementalResponseFromEndPoint(
+            repaired, user_class, [itemAsTask(item) for item in unresolved], preferences, models_and_tasks_priorities
+        )
+    return _merge_placed(repaired, unresolved, placed)
+
+
+async def repair_schedule_async(items, user_class, preferences, models_and_tasks_priorities):
+    """repair_schedule for async views, the re-prompt is awaited"""
+    if not settings.SCHEDULE_REPAIR_ENABLED:
+        return items
+    checked = _check_schedule(items)
+    if checked is None:
+        return items
+    repaired, unresolved = checked
+    if not unresolved or not _reprompt(unresolved):
+        return repaired
+    with metrics.stage("reprompt"):
+        placed = await getIncrementalResponseFromEndPointAsync(
+            repaired, user_class, [itemAsTask(item) for item in unresolved], preferences, models_and_tasks_priorities
+        )
+    return _merge_placed(repaired, unresolved, placed)
+
+
+async def extract_tables_async(pdf_data, pdf_digest=None):
+    """extract_tables on the bounded executor"""
+    with metrics.stage("extract"):
+        return await _run_in_executor(extract_tables, pdf_data, pdf_digest)
+
+
+async def generate_schedule_async(pdf_data, user_class, user_tasks, preferences, models_and_tasks_priorities, mode=MODE_LLM):
+    """generate_schedule for async views
+
+    Extraction and the local scheduler run on the bounded executor (multi-page PDFs still fan out
+    to the extractor's process pool from there) and the Gemini call is awaited, so the event loop
+    keeps serving other requests during both.
+    """
+    tables = await extract_tables_async(pdf_data)
+    return await generate_from_tables_async(tables, user_class, user_tasks, preferences, models_and_tasks_priorities, mode)
+
+
+async def generate_from_tables_async(tables, user_class, user_tasks, preferences, models_and_tasks_priorities, mode=MODE_LLM):
+    inputs = dict(
+        tableData = tables,
+        userClass = user_class,
+        userTasks = user_tasks,
+        preferences = preferences,
+        modelsAndTasksPriorities = models_and_tasks_priorities,
+    )
+    return await _generate_from_tables_async(inputs, mode)
+
+
+async def _generate_from_tables_async(inputs, mode):
+    if mode == MODE_LOCAL:
+        with metrics.stage("local"):
+            return await _run_in_executor(generateLocalSchedule, **inputs)
+
+    with metrics.stage("llm"):
+        result = await getResponseFromEndPointAsync(**inputs)
+    if isinstance(result, list):
+        return await repair_schedule_async(
+            result, inputs["userClass"], inputs["preferences"], inputs["modelsAndTasksPriorities"]
+        )
+    if not settings.SCHEDULE_LOCAL_FALLBACK:
+        return result
+    logger.warning(f"Upstream generation failed ({result}), falling back to the local scheduler")
+    metrics.increment("local_fallbacks")
+    with metrics.stage("fallback"):
+        return await _run_in_executor(generateLocalSchedule, **inputs)
+
+
+def form_text(value):
+    """Fields sent as JSON arrive parsed, give them to the prompt as the JSON text upload/ gets"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+async def generate_batch_schedules_async(pdf_data, profiles, mode=MODE_LLM):
+    """One schedule per profile (userClass, userTasks, preferences, modelsAndTasksPriorities) from one timetable
+
+    The PDF is extracted once, then the generations run concurrently, at most BATCH_CONCURRENCY
+    at a time. Identical profiles are generated once. A failed generation only fails its own
+    entry. Returns (results in profile order, throughput report).
+    """
+    start = time.perf_counter()
+    tables = await extract_tables_async(pdf_data)
+    extracted_at = time.perf_counter()
+
+    semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+    generations = {}
+    per_profile = []
+
+    async def generate(inputs):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                return {"Data": await _generate_from_tables_async(inputs, mode),
+                        "seconds": round(time.perf_counter() - started, 3)}
+            except Exception as e:
+                logger.exception(f"Batch generation failed for class {inputs['userClass']}")
+                return {"error": f"Error: {e.__class__.__name__}"}
+
+    for profile in profiles:
+        inputs = dict(
+            tableData = tables,
+            userClass = form_text(profile.get('userClass')),
+            userTasks = form_text(profile.get('userTasks')),
+            preferences = form_text(profile.get('preferences')),
+            modelsAndTasksPriorities = form_text(profile.get('modelsAndTasksPriorities')),
+        )
+        key = json.dumps([inputs[name] for name in sorted(inputs) if name != "tableData"])
+        if key not in generations:
+            generations[key] = asyncio.ensure_future(generate(inputs))
+        per_profile.append(generations[key])
+
+    await asyncio.gather(*generations.values())
+    results = [dict(generation.result(), index=index) for index, generation in enumerate(per_profile)]
+
+    elapsed = time.perf_counter() - start
+    metrics.observe("batch_seconds", elapsed)
+    metrics.increment("batch_schedules", len(results))
+    report = {
+        "schedules": len(results),
+        "generations": len(generations),
+        "extractionSeconds": round(extracted_at - start, 3),
+        "totalSeconds": round(elapsed, 3),
+        "schedulesPerMinute": round(len(results) * 60 / elapsed, 1) if elapsed else None,
+    }
+    logger.info(f"Batch of {len(results)} schedules ({len(generations)} generations) in {elapsed:.2f}s, "
+                f"{report['schedulesPerMinute']} schedules/min")
+    return results, report
+
+
+def stream_schedule(pdf_data, user_class, user_tasks, preferences, models_and_tasks_priorities, mode=MODE_LLM):
+    """Like generate_schedule but yields the schedule items as the model produces them"""
+    with metrics.stage("extract"):
+        tables = extract_tables(pdf_data)
+    inputs = dict(
+        tableData = tables,
+        userClass = user_class,
+        userTasks = user_tasks,
+        preferences = preferences,
+        modelsAndTasksPriorities = models_and_tasks_priorities,
+    )
+    if mode == MODE_LOCAL:
+        return iter(generateLocalSchedule(**inputs))
+    return _stream_with_fallback(inputs)
+
+
+def _stream_with_fallback(inputs):
+    started = False
+    try:
+        for item in streamResponseFromEndPoint(**inputs):
+            started = True
+            yield item
+    except Exception as e:
+        # Once items went out the client already has a partial LLM schedule, don't mix in another one
+        if started or not settings.SCHEDULE_LOCAL_FALLBACK:
+            raise
+        logger.warning(f"Upstream stream failed ({str(e)}), falling back to the local scheduler")
+        metrics.increment("local_fallbacks")
+        yield from generateLocalSchedule(**inputs)
@@ -0,0 +1,57 @@
+from api.utils.extraction_backends import load_backend
+
+EMPTY_CELL = "EMPTY CELL"
+
+
+def clean_table(df):
+    """Clean an extracted DataFrame in one pass over the whole grid and return it in columnar form
+
+    Same rules as PDFTableExtractor._clean_dataframe (drop fully empty rows/columns, strip text
+    cells, blank or missing cells become EMPTY CELL) but vectorized, and without building the
+    list of per-row dicts: returns (headers, cells) where cells is a list of rows.
+    """
+    backend = load_backend("pandas")
+    pd, np = backend.pd, backend.np
+    values = df.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    keep_rows = ~missing.all(axis=1)
+    keep_cols = ~missing.all(axis=0)
+    values = values[keep_rows][:, keep_cols]
+    missing = missing[keep_rows][:, keep_cols]
+    headers = df.columns[keep_cols].tolist()
+    if not values.size:
+        return headers, []
+
+    is_text = np.array([
+        pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype) for dtype in df.dtypes
+    ], dtype=bool)[keep_cols]
+    if is_text.any():
+        text = values[:, is_text]
+        # One .str pass over every text cell instead of an apply per column plus a regex replace
+        stripped = pd.Series(text.ravel(), dtype=object).str.strip().to_numpy(dtype=object, copy=True)
+        stripped[pd.isna(stripped) | (stripped == "")] = EMPTY_CELL
+        values[:, is_text] = stripped.reshape(text.shape)
+    if not is_text.all():
+        values[:, ~is_text] = np.where(missing[:, ~is_text], EMPTY_CELL, values[:, ~is_text])
+    return headers, values.tolist()
+
+
+def table_cells(table):
+    """Rows of cells of an extracted table (columnar "cells", or the older per-row "data" dicts)"""
+    if "cells" in table:
+        return table["cells"]
+    headers = list(table.get("headers", []))
+    return [[record.get(h, EMPTY_CELL) for h in headers] for record in table.get("data", [])]
+
+
+def table_records(table):
+    """The table as the extractor used to return it, with "data" as one dict per row"""
+    if "cells" not in table:
+        return table
+    record = {}
+    for key, value in table.items():
+        if key == "cells":
+            record["data"] = [dict(zip(table["headers"], row)) for row in value]
+        else:
+            record[key] = value
+    return record
@@ -0,0 +1,142 @@
+import logging
+import multiprocessing
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TabulaWorkerError(Exception):
+    """The Tabula worker timed out, crashed or could not be started"""
+
+
+def _serve(conn):
+    """Child process loop: keep one JVM (jpype, through tabula-py) alive and answer read requests"""
+    import tabula
+
+    try:
+        # Start the JVM now instead of on the first request (without jpype tabula-py logs it
+        # and falls back to one java subprocess per call, which still works)
+        from tabula.backend import TabulaVm
+        TabulaVm(java_options=[], silent=True)
+    except Exception as e:
+        logger.warning(f"Could not warm up the JVM in the Tabula worker: {e.__class__.__name__}: {str(e)}")
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        command = message[0]
+        if command == "ping":
+            conn.send(("pong", None))
+        elif command == "read":
+            _, path, options = message
+            try:
+                conn.send(("ok", tabula.read_pdf(path, **options)))
+            except Exception as e:
+                conn.send(("error", f"{e.__class__.__name__}: {str(e)}"))
+        elif command == "stop":
+            return
+
+
+class TabulaWorker:
+    """Long-lived subprocess running Tabula with a warm JVM, restarted on crash or timeout
+
+    Requests are serialized (one JVM, one document at a time); a request exceeding
+    `timeout` seconds kills the worker, which is transparently restarted on the next call.
+    """
+
+    def __init__(self, timeout=60.0, health_timeout=5.0):
+        self.timeout = timeout
+        self.health_timeout = health_timeout
+        self.restarts = 0
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        parent_conn, child_conn = multiprocessing.Pipe()
+        # spawn, not fork: the parent may be a threaded gunicorn worker
+        process = multiprocessing.get_context("spawn").Process(
+            target=_serve, args=(child_conn,), name="tabula-worker", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self._process, self._conn = process, parent_conn
+        logger.info(f"Started Tabula worker pid {process.pid}")
+
+    def _stop(self):
+        if self._process is None:
+            return
+        try:
+            self._conn.send(("stop",))
+        except (OSError, ValueError):
+            pass
+        self._process.join(1)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+        self._process, self._conn = None, None
+
+    def _restart(self, reason):
+        """Stop the worker, the next call starts (and health checks) a new one"""
+        logger.warning(f"Restarting Tabula worker: {reason}")
+        self._stop()
+        self.restarts += 1
+
+    def _exchange(self, message, timeout):
+        self._conn.send(message)
+        if not self._conn.poll(timeout):
+            self._restart(f"no answer within {timeout}s")
+            raise TabulaWorkerError(f"Tabula did not answer within {timeout}s")
+        try:
+            return self._conn.recv()
+        except EOFError:
+            self._restart("worker process crashed")
+            raise TabulaWorkerError("Tabula worker crashed")
+
+    def _call(self, message, timeout):
+        if self._process is not None and not self._process.is_alive():
+            self._restart("worker process died")
+        if self._process is None:
+            self._start()
+            # Health check: wait for the JVM here so its startup does not count against the request's timeout
+            self._exchange(("ping",), max(self.health_timeout, self.timeout))
+        return self._exchange(message, timeout)
+
+    def healthy(self):
+        """Ping the worker (starting it if needed), restarting it when it does not answer"""
+        with self._lock:
+            try:
+                return self._call(("ping",), self.health_timeout)[0] == "pong"
+            except (TabulaWorkerError, OSError):
+                return False
+
+    def read_pdf(self, path, **options):
+        """tabula.read_pdf in the worker, returns the list of DataFrames"""
+        with self._lock:
+            start = time.perf_counter()
+            status, payload = self._call(("read", path, options), self.timeout)
+            logger.info(f"Tabula worker answered in {time.perf_counter() - start:.2f}s")
+        if status != "ok":
+            raise TabulaWorkerError(payload)
+        return payload
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+_tabula_worker = None
+_tabula_worker_lock = threading.Lock()
+
+
+def get_tabula_worker(timeout=60.0):
+    """Process wide worker, started lazily on the first Tabula extraction"""
+    global _tabula_worker
+    with _tabula_worker_lock:
+        if _tabula_worker is None:
+            _tabula_worker = TabulaWorker(timeout=timeout)
+        return _tabula_worker
@@ -1,12 +1,27 @@
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework import status
 from django.conf import settings
 from rest_framework.permissions import AllowAny
-from api.model.response_model import getResponseFromEndPoint
-from api.utils.formate_data_for_ai import PDFTableExtractor
+from api.jobs import submit_job, job_stats
+from api.models import Schedule, ScheduleJob, Timetable
+from api.timetables import generate_and_store, generate_and_store_async, regenerate, schedule_inputs
+from api.uploads import UploadRejected, uploaded_pdf_path, use_pdf_upload_handler
+from api.utils import metrics
+from api.utils.response_format import response_format, schedule_data
+from api.utils.schedule_pipeline import form_text, generate_batch_schedules_async, stream_schedule, MODE_LLM
+
+
+def is_authorized(request):
+    return request.headers.get("x-api-key") == settings.API_SECRET_KEY
+
 
 class SchedulePDFUploadView(APIView):
     parser_classes = [MultiPartParser]
@@ -20,30 +35,270 @@ class SchedulePDFUploadView(APIView):
         return response
     def post(self, request):
         # API key check
-        api_key = request.headers.get("x-api-key")
-        if api_key != settings.API_SECRET_KEY:
+        if not is_authorized(request):
             return Response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        # PDF file check
-        pdf_file = request.FILES.get("file")
-        if not pdf_file:
-            return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
+        # PDF file check (streamed to disk, size and page limits)
+        handler = use_pdf_upload_handler(request)
+        try:
+            with metrics.stage("upload"):
+                pdf_path = uploaded_pdf_path(request, handler)
+        except UploadRejected as e:
+            return Response({"error": str(e)}, status=e.status_code)
 
-        # get all user data 
-        pdf_data = pdf_file.read()
+        # get all user data
         user_class = request.data.get('userClass')
         user_tasks = request.data.get('userTasks')
         preferences = request.data.get('preferences')
         models_and_tasks_priorities = request.data.get('modelsAndTasksPriorities')
-        
-        extractor = PDFTableExtractor(pdf_data)
-        tables = extractor.extract_all_tables()        
-        finalRes = getResponseFromEndPoint(
-            tableData = tables,
-            userClass = user_class,
-            userTasks = user_tasks,
-            preferences = preferences,
-            modelsAndTasksPriorities = models_and_tasks_priorities,
+        mode = request.data.get('mode', MODE_LLM)
+
+        #? async mode: queue the work and let the client poll jobs/<id>/
+        if str(request.data.get('async', '')).lower() in ('1', 'true'):
+            # The job outlives the request (and its temp file), so it keeps its own copy
+            with open(pdf_path, "rb") as f:
+                pdf_data = f.read()
+            job = submit_job(pdf_data, user_class, user_tasks, preferences, models_and_tasks_priorities, mode)
+            return Response({"jobId": str(job.id), "status": job.status}, status=status.HTTP_202_ACCEPTED)
+
+        finalRes, stored = generate_and_store(pdf_path, user_class, user_tasks, preferences, models_and_tasks_priorities, mode)
+        # Data is a JSON array of items; responseFormat=compact for rows, =legacy for the old string
+        return Response({**schedule_data(finalRes, response_format(request, request.data)), **stored})
+
+
+class AsyncSchedulePDFUploadView(View):
+    """upload/ as a native async view, meant to be served by an ASGI server (backend.asgi)
+
+    Same form fields and response as SchedulePDFUploadView, without the job queue flag. While a
+    request waits on Gemini it holds no thread, so one worker can keep hundreds in flight;
+    extraction runs on the bounded ASYNC_EXTRACTION_THREADS pool.
+    """
+
+    async def options(self, request, *args, **kwargs):
+        response = HttpResponse()
+        response["Access-Control-Allow-Origin"] = "https://www.studai.site"
+        response["Access-Control-Allow-Methods"] = "POST, OPTIONS"
+        response["Access-Control-Allow-Headers"] = "Content-Type, x-api-key"
+        return response
+
+    async def post(self, request):
+        if not is_authorized(request):
+            return json_response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        # Parsing the multipart body writes the upload to disk, keep it off the event loop
+        handler = use_pdf_upload_handler(request)
+        try:
+            with metrics.stage("upload"):
+                pdf_path = await sync_to_async(uploaded_pdf_path, thread_sensitive=False)(request, handler)
+        except UploadRejected as e:
+            return json_response({"error": str(e)}, status=e.status_code)
+
+        finalRes, stored = await generate_and_store_async(
+            pdf_path,
+            request.POST.get('userClass'),
+            request.POST.get('userTasks'),
+            request.POST.get('preferences'),
+            request.POST.get('modelsAndTasksPriorities'),
+            request.POST.get('mode', MODE_LLM),
+        )
+        return json_response({**schedule_data(finalRes, response_format(request, request.POST)), **stored})
+
+
+class BatchScheduleView(View):
+    """One timetable PDF, many students: `profiles` is a JSON list of objects with the upload/
+    fields (userClass, userTasks, preferences, modelsAndTasksPriorities)
+
+    The PDF is extracted once and the schedules are generated concurrently (BATCH_CONCURRENCY at
+    a time). Answers with one entry per profile, in order, plus the batch throughput.
+    """
+
+    async def post(self, request):
+        if not is_authorized(request):
+            return json_response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        handler = use_pdf_upload_handler(request)
+        try:
+            with metrics.stage("upload"):
+                pdf_path = await sync_to_async(uploaded_pdf_path, thread_sensitive=False)(request, handler)
+        except UploadRejected as e:
+            return json_response({"error": str(e)}, status=e.status_code)
+
+        try:
+            profiles = json.loads(request.POST.get('profiles') or "")
+        except ValueError:
+            return json_response({"error": "profiles must be a JSON list"}, status=status.HTTP_400_BAD_REQUEST)
+        if not isinstance(profiles, list) or not profiles or not all(isinstance(p, dict) for p in profiles):
+            return json_response({"error": "profiles must be a non empty list of objects"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(profiles) > settings.BATCH_MAX_PROFILES:
+            return json_response({"error": f"Too many profiles, the limit is {settings.BATCH_MAX_PROFILES}"},
+                                 status=status.HTTP_400_BAD_REQUEST)
+
+        results, throughput = await generate_batch_schedules_async(
+            pdf_path, profiles, request.POST.get('mode', MODE_LLM)
         )
-        return Response({"Data": f" {finalRes}"})
+        fmt = response_format(request, request.POST)
+        results = [{**entry, **schedule_data(entry["Data"], fmt)} if "Data" in entry else entry for entry in results]
+        return json_response({"results": results, "throughput": throughput})
+
+
+def json_response(data, status=200):
+    """JSON encoded the way DRF's renderer does it, so both upload views answer byte for byte alike"""
+    return JsonResponse(data, status=status, json_dumps_params={"ensure_ascii": False, "separators": (",", ":")})
+
+
+def server_sent_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class ScheduleStreamView(APIView):
+    """Same inputs as upload/, answers with a text/event-stream of schedule items"""
+    parser_classes = [MultiPartParser]
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        if not is_authorized(request):
+            return Response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
 
+        handler = use_pdf_upload_handler(request)
+        try:
+            with metrics.stage("upload"):
+                pdf_path = uploaded_pdf_path(request, handler)
+        except UploadRejected as e:
+            return Response({"error": str(e)}, status=e.status_code)
+
+        # Extraction runs here, before the response starts, while the uploaded file still exists
+        items = stream_schedule(
+            pdf_path,
+            request.data.get('userClass'),
+            request.data.get('userTasks'),
+            request.data.get('preferences'),
+            request.data.get('modelsAndTasksPriorities'),
+            request.data.get('mode', MODE_LLM),
+        )
+        response = StreamingHttpResponse(self.events(items), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # keep nginx style proxies from buffering the stream
+        return response
+
+    @staticmethod
+    def events(items):
+        start = time.perf_counter()
+        time_to_first_item = None
+        count = 0
+        try:
+            for item in items:
+                if time_to_first_item is None:
+                    time_to_first_item = time.perf_counter() - start
+                count += 1
+                yield server_sent_event("item", item)
+        except Exception as e:
+            yield server_sent_event("error", {"error": str(e)})
+            return
+        yield server_sent_event("done", {
+            "items": count,
+            "timeToFirstItem": time_to_first_item,
+            "totalLatency": time.perf_counter() - start,
+        })
+
+
+class ScheduleJobView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, job_id):
+        if not is_authorized(request):
+            return Response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        job = ScheduleJob.objects.filter(id=job_id).defer("pdf_data").first()
+        if job is None:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        body = {
+            "jobId": str(job.id),
+            "status": job.status,
+            "waitSeconds": job.wait_seconds,
+            "runSeconds": job.run_seconds,
+        }
+        if job.status == ScheduleJob.STATUS_DONE:
+            # Same shape as the synchronous upload response
+            body.update(schedule_data(job.result, response_format(request)))
+        elif job.status == ScheduleJob.STATUS_FAILED:
+            body["error"] = job.error
+        return Response(body)
+
+
+class TimetableScheduleView(APIView):
+    """A new schedule for a stored timetable, without uploading the PDF again
+
+    Takes the upload/ fields (JSON or form) plus an optional baseScheduleId: then only the tasks
+    that changed since that schedule are placed, everything else is kept, and fields left out
+    are taken from it.
+    """
+    parser_classes = [JSONParser, FormParser, MultiPartParser]
+    permission_classes = [AllowAny]
+
+    def post(self, request, timetable_id):
+        if not is_authorized(request):
+            return Response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        timetable = Timetable.objects.filter(id=timetable_id).first()
+        if timetable is None:
+            return Response({"error": "Timetable not found"}, status=status.HTTP_404_NOT_FOUND)
+        base = None
+        if request.data.get('baseScheduleId'):
+            base = Schedule.objects.filter(id=request.data['baseScheduleId'], timetable=timetable).first()
+            if base is None:
+                return Response({"error": "Base schedule not found for this timetable"}, status=status.HTTP_404_NOT_FOUND)
+
+        inputs = {
+            name: form_text(request.data.get(name))
+            for name in ('userClass', 'userTasks', 'preferences', 'modelsAndTasksPriorities')
+        }
+        finalRes, schedule, report = regenerate(timetable, inputs, request.data.get('mode', MODE_LLM), base)
+        body = {
+            **schedule_data(finalRes, response_format(request, request.data)),
+            "timetableId": str(timetable.id),
+            "regeneration": report,
+        }
+        if schedule is not None:
+            body["scheduleId"] = str(schedule.id)
+        return Response(body)
+
+
+class ScheduleView(APIView):
+    """A stored schedule with the inputs it was generated from"""
+    permission_classes = [AllowAny]
+
+    def get(self, request, schedule_id):
+        if not is_authorized(request):
+            return Response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        schedule = Schedule.objects.filter(id=schedule_id).first()
+        if schedule is None:
+            return Response({"error": "Schedule not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            "scheduleId": str(schedule.id),
+            "timetableId": str(schedule.timetable_id),
+            "baseScheduleId": str(schedule.base_id) if schedule.base_id else None,
+            "mode": schedule.mode,
+            "createdAt": schedule.created_at,
+            **schedule_inputs(schedule),
+            **schedule_data(schedule.items, response_format(request)),
+        })
+
+
+class MetricsView(View):
+    """Histograms, counters and process resources of this server process, for Prometheus to scrape"""
+
+    def get(self, request):
+        if not (settings.METRICS_PUBLIC or is_authorized(request)):
+            return json_response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+        return HttpResponse(metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ScheduleJobStatsView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        if not is_authorized(request):
+            return Response({"error": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(job_stats())
@@ -22,6 +22,100 @@ load_dotenv()
 API_SECRET_KEY = os.getenv("API_SECRET_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 HOST_NAME = os.getenv("HOST_NAME")
+
+# Uploads are streamed to a temp file on disk (never held in memory) and rejected past these limits
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 20 * 1024 * 1024))
+UPLOAD_MAX_PAGES = int(os.getenv("UPLOAD_MAX_PAGES", 40))
+FILE_UPLOAD_TEMP_DIR = os.getenv("FILE_UPLOAD_TEMP_DIR")
+
+# PDF table extraction cache (in-process LRU + on-disk tier keyed by the PDF content hash)
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", str(BASE_DIR / ".cache" / "extraction"))
+EXTRACTION_CACHE_MAX_BYTES = int(os.getenv("EXTRACTION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+EXTRACTION_CACHE_MEMORY_ITEMS = int(os.getenv("EXTRACTION_CACHE_MEMORY_ITEMS", 64))
+
+# Page-parallel extraction: worker processes, and the page count below which extraction stays in-process.
+# Every gunicorn worker spawns its own pool of EXTRACTION_WORKERS processes, so keep
+# EXTRACTION_WORKERS x gunicorn workers within the CPU count (1 keeps extraction in-process)
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", 1))
+EXTRACTION_PARALLEL_MIN_PAGES = int(os.getenv("EXTRACTION_PARALLEL_MIN_PAGES", 4))
+
+# Extractor fallback chain, and the backends the gunicorn master imports before forking workers
+EXTRACTION_BACKENDS = os.getenv("EXTRACTION_BACKENDS", "camelot,tabula,pdfplumber,ocr").split(",")
+EXTRACTION_PRELOAD_BACKENDS = [name for name in os.getenv("EXTRACTION_PRELOAD_BACKENDS", "camelot").split(",") if name]
+# Choose the backend per page (text layer, ruling lines, page size) and fall back only for the pages that failed
+EXTRACTION_TRIAGE = os.getenv("EXTRACTION_TRIAGE", "true").lower() == "true"
+
+# Keep Tabula's JVM alive in a worker subprocess (health checked, restarted after a timeout or crash)
+TABULA_PERSISTENT = os.getenv("TABULA_PERSISTENT", "true").lower() == "true"
+TABULA_TIMEOUT = float(os.getenv("TABULA_TIMEOUT", 60))
+
+# OCR of scanned pages: only pages with fewer text-layer characters than OCR_MIN_TEXT_CHARS are rasterized
+OCR_DPI = int(os.getenv("OCR_DPI", 200))
+OCR_MIN_TEXT_CHARS = int(os.getenv("OCR_MIN_TEXT_CHARS", 20))
+# Peak memory per OCR page with tracemalloc, slows every allocation: for profiling only
+OCR_TRACE_MEMORY = os.getenv("OCR_TRACE_MEMORY", "false").lower() == "true"
+
+# Async upload view: threads running extraction (and the local scheduler) off the event loop, per server process
+ASYNC_EXTRACTION_THREADS = int(os.getenv("ASYNC_EXTRACTION_THREADS", 4))
+# Batch endpoint: profiles accepted per request, and generations running at once for one batch
+BATCH_MAX_PROFILES = int(os.getenv("BATCH_MAX_PROFILES", 100))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+
+# Async upload jobs: background threads per server process (0 = only `manage.py process_schedule_jobs`)
+SCHEDULE_JOB_WORKERS = int(os.getenv("SCHEDULE_JOB_WORKERS", 2))
+# Running jobs started longer ago than this are taken as lost with their worker and queued again
+SCHEDULE_JOB_STALE_SECONDS = float(os.getenv("SCHEDULE_JOB_STALE_SECONDS", 900))
+
+# Gemini HTTP client: pooled keep-alive session, timeouts, retries with jittered backoff, circuit breaker
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta").rstrip("/")
+GEMINI_CONNECT_TIMEOUT = float(os.getenv("GEMINI_CONNECT_TIMEOUT", 5))
+GEMINI_READ_TIMEOUT = float(os.getenv("GEMINI_READ_TIMEOUT", 60))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 2))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", 0.5))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", 8))
+GEMINI_POOL_SIZE = int(os.getenv("GEMINI_POOL_SIZE", 10))
+# Connections of the async client, i.e. Gemini calls in flight per ASGI worker (more wait for a free one)
+GEMINI_ASYNC_MAX_CONNECTIONS = int(os.getenv("GEMINI_ASYNC_MAX_CONNECTIONS", 200))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", 5))
+GEMINI_BREAKER_COOLDOWN = float(os.getenv("GEMINI_BREAKER_COOLDOWN", 30))
+
+# How extracted tables are written into the prompt: "compact" (delimited grid) or "repr" (legacy dict repr)
+PROMPT_TABLE_ENCODING = os.getenv("PROMPT_TABLE_ENCODING", "compact")
+
+# Generated schedule cache shared across server processes (SQLite), keyed on the canonicalized inputs
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+
+# Answer with the deterministic local scheduler when the Gemini call fails
+SCHEDULE_LOCAL_FALLBACK = os.getenv("SCHEDULE_LOCAL_FALLBACK", "true").lower() == "true"
+
+# Check generated schedules (times, days, overlaps, school window) and fix them locally,
+# re-prompting Gemini only for the items that could not be placed
+SCHEDULE_REPAIR_ENABLED = os.getenv("SCHEDULE_REPAIR_ENABLED", "true").lower() == "true"
+SCHEDULE_REPAIR_REPROMPT = os.getenv("SCHEDULE_REPAIR_REPROMPT", "true").lower() == "true"
+
+# Keep the extracted tables and the generated schedules of uploads, so edits regenerate from timetables/<id>/
+TIMETABLE_STORE_ENABLED = os.getenv("TIMETABLE_STORE_ENABLED", "true").lower() == "true"
+# Pruned on every store: timetables unused for TIMETABLE_STORE_TTL seconds (with their schedules), the least
+# recently used over TIMETABLE_STORE_MAX_ENTRIES, and schedules past the newest TIMETABLE_MAX_SCHEDULES per timetable
+TIMETABLE_STORE_TTL = int(os.getenv("TIMETABLE_STORE_TTL", 30 * 24 * 3600))
+TIMETABLE_STORE_MAX_ENTRIES = int(os.getenv("TIMETABLE_STORE_MAX_ENTRIES", 5000))
+TIMETABLE_MAX_SCHEDULES = int(os.getenv("TIMETABLE_MAX_SCHEDULES", 20))
+
+# Shape of the schedule in responses: json (array of items), compact (array of arrays, see
+# response_format.SCHEDULE_FIELDS) or legacy (the old " [{...}]" string); clients pick with responseFormat
+SCHEDULE_RESPONSE_FORMAT = os.getenv("SCHEDULE_RESPONSE_FORMAT", "json").lower()
+
+# Response compression, negotiated with Accept-Encoding: brotli when the Brotli package is installed, else gzip
+RESPONSE_COMPRESSION_ENABLED = os.getenv("RESPONSE_COMPRESSION_ENABLED", "true").lower() == "true"
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", 6))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", 5))
+
+# Prometheus metrics/ endpoint: scraped with the x-api-key header unless made public
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() == "true"
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -49,6 +143,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
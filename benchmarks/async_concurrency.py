@@ -0,0 +1,180 @@
+"""Requests one server worker keeps in flight while Gemini is slow: sync WSGI worker vs the async view.
+
+A fake Gemini endpoint is started in this process; it answers every generateContent call after
+--latency seconds and records how many calls it is serving at once. Each server is then started
+with a single worker (gunicorn sync, gunicorn gthread, uvicorn), warmed up with one upload so the
+PDF extraction is cached, and hit with --concurrency simultaneous uploads. "peak in flight" is the
+highest number of upstream calls the worker had open at the same time, i.e. its concurrency.
+
+Usage:
+    python -m benchmarks.async_concurrency path/to/timetable.pdf [--concurrency 64] [--latency 0.5]
+        [--threads 8] [--modes sync,threads,async]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+ITEMS = [
+    {"title": "Math Class", "start_time": "08:00", "end_time": "10:00", "event_type": "class",
+     "event_day": "Monday", "priority": "3", "color": "#60A5FA", "user_id": None, "module_id": None},
+    {"title": "Study Physics", "start_time": "17:00", "end_time": "18:30", "event_type": "study",
+     "event_day": "Monday", "priority": "4", "color": "#F87171", "user_id": None, "module_id": None},
+]
+
+
+class FakeGemini(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.5
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            time.sleep(cls.latency)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+        text = "```json\n" + json.dumps(ITEMS) + "\n```"
+        body = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def multipart_body(pdf_path):
+    boundary = uuid.uuid4().hex
+    fields = {"userClass": "A", "userTasks": "[]", "preferences": "{}", "modelsAndTasksPriorities": "{}"}
+    body = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    )
+    with open(pdf_path, "rb") as f:
+        body += (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="timetable.pdf"\r\n'
+                 f'Content-Type: application/pdf\r\n\r\n').encode() + f.read() + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def server_command(mode, port, threads):
+    bind = f"127.0.0.1:{port}"
+    if mode == "async":
+        return [sys.executable, "-m", "uvicorn", "backend.asgi:application", "--port", str(port),
+                "--workers", "1", "--log-level", "warning"], "/api/upload/async/"
+    worker_threads = threads if mode == "threads" else 1
+    return [sys.executable, "-m", "gunicorn", "backend.wsgi:application", "--bind", bind, "--workers", "1",
+            "--threads", str(worker_threads), "--timeout", "600"], "/api/upload/"
+
+
+def cpu_seconds(pid):
+    """User + system CPU of the server and its direct children (the gunicorn worker)"""
+    total = 0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(entry) == pid or int(fields[1]) == pid:
+            total += int(fields[11]) + int(fields[12])
+    return total / os.sysconf("SC_CLK_TCK")
+
+
+def post(url, body, content_type):
+    start = time.perf_counter()
+    try:
+        code = requests.post(url, data=body, headers={"Content-Type": content_type, "x-api-key": "benchmark"},
+                             timeout=600).status_code
+    except requests.RequestException as e:
+        code = e.__class__.__name__
+    return code, time.perf_counter() - start
+
+
+def run(mode, args, upstream_port, body, content_type):
+    cache_dir = tempfile.mkdtemp(prefix="async-benchmark-")
+    env = dict(
+        os.environ, SECRET_KEY="benchmark", API_SECRET_KEY="benchmark", PYTHONWARNINGS="ignore",
+        GEMINI_BASE_URL=f"http://127.0.0.1:{upstream_port}/v1beta", GEMINI_MAX_RETRIES="0",
+        LLM_CACHE_ENABLED="false", EXTRACTION_CACHE_DIR=cache_dir, EXTRACTION_WORKERS="1",
+        EXTRACTION_PRELOAD_BACKENDS="", SCHEDULE_JOB_WORKERS="0",
+    )
+    command, path = server_command(mode, args.port, args.threads)
+    server = subprocess.Popen(command, cwd=args.root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{args.port}{path}"
+    try:
+        for _ in range(150):
+            try:
+                requests.get(f"http://127.0.0.1:{args.port}/", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        post(url, body, content_type)
+        FakeGemini.peak = 0
+        cpu = cpu_seconds(server.pid)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(lambda _: post(url, body, content_type), range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        cpu = cpu_seconds(server.pid) - cpu
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    latencies = sorted(seconds for _, seconds in results)
+    codes = sorted({str(code) for code, _ in results})
+    print(f"{mode:8s} {elapsed:7.1f}s  {args.concurrency / elapsed:7.1f} req/s  peak in flight {FakeGemini.peak:4d}  "
+          f"p50 {statistics.median(latencies):6.2f}s  p95 {latencies[int(0.95 * (len(latencies) - 1))]:6.2f}s  "
+          f"server CPU {cpu * 1000 / args.concurrency:5.1f} ms/req  status {', '.join(codes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds the fake Gemini takes per call")
+    parser.add_argument("--threads", type=int, default=8, help="threads of the gthread worker")
+    parser.add_argument("--modes", default="sync,threads,async")
+    parser.add_argument("--root", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    FakeGemini.latency = args.latency
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), FakeGemini)
+    upstream.daemon_threads = True
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    body, content_type = multipart_body(args.pdf)
+
+    print(f"{args.concurrency} concurrent uploads, Gemini latency {args.latency}s, one worker each")
+    try:
+        for mode in args.modes.split(","):
+            run(mode, args, upstream.server_port, body, content_type)
+    finally:
+        upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Schedules per minute for a whole class: one upload/ per student vs a single upload/batch/ call.
+
+Starts uvicorn (one worker, extraction cache off so every upload/ extracts the PDF like a cold
+request would) against the fake Gemini of benchmarks.async_concurrency, answering after --latency
+seconds. The per-student path posts the PDF once per student, one after the other; the batch path
+posts it once with every profile. Each student gets different tasks so no generation is shared.
+
+Usage:
+    python -m benchmarks.batch_throughput path/to/timetable.pdf [--students 30] [--latency 2]
+        [--fanout 8] [--backends camelot]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer
+
+import requests
+
+from benchmarks.async_concurrency import FakeGemini
+
+
+def profile(student):
+    return {
+        "userClass": "A",
+        "userTasks": json.dumps([{"title": f"Project {student}", "hours": 2 + student % 3}]),
+        "preferences": "{}",
+        "modelsAndTasksPriorities": "{}",
+    }
+
+
+def multipart(fields, pdf_bytes):
+    boundary = uuid.uuid4().hex
+    body = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    )
+    body += (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="timetable.pdf"\r\n'
+             f'Content-Type: application/pdf\r\n\r\n').encode() + pdf_bytes + f'\r\n--{boundary}--\r\n'.encode()
+    return body, {"Content-Type": f"multipart/form-data; boundary={boundary}", "x-api-key": "benchmark"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=2.0, help="seconds the fake Gemini takes per call")
+    parser.add_argument("--fanout", type=int, default=8, help="BATCH_CONCURRENCY of the server")
+    parser.add_argument("--backends", default="camelot", help="EXTRACTION_BACKENDS of the server")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    FakeGemini.latency = args.latency
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), FakeGemini)
+    upstream.daemon_threads = True
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cache_dir = tempfile.mkdtemp(prefix="batch-benchmark-")
+    env = dict(
+        os.environ, SECRET_KEY="benchmark", API_SECRET_KEY="benchmark", PYTHONWARNINGS="ignore",
+        GEMINI_BASE_URL=f"http://127.0.0.1:{upstream.server_port}/v1beta", GEMINI_MAX_RETRIES="0",
+        LLM_CACHE_ENABLED="false", EXTRACTION_CACHE_ENABLED="false", EXTRACTION_CACHE_DIR=cache_dir,
+        EXTRACTION_BACKENDS=args.backends, EXTRACTION_WORKERS="1", BATCH_CONCURRENCY=str(args.fanout),
+        BATCH_MAX_PROFILES=str(max(100, args.students)), SCHEDULE_JOB_WORKERS="0",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.asgi:application", "--port", str(args.port), "--log-level", "warning"],
+        cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{args.port}/api"
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+    profiles = [profile(student) for student in range(args.students)]
+    try:
+        for _ in range(150):
+            try:
+                requests.get(base, timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        # Warm up: imports and the extraction backends
+        body, headers = multipart(profiles[0], pdf_bytes)
+        requests.post(f"{base}/upload/async/", data=body, headers=headers)
+
+        start = time.perf_counter()
+        for p in profiles:
+            body, headers = multipart(p, pdf_bytes)
+            requests.post(f"{base}/upload/async/", data=body, headers=headers).raise_for_status()
+        sequential = time.perf_counter() - start
+
+        body, headers = multipart({"profiles": json.dumps(profiles)}, pdf_bytes)
+        start = time.perf_counter()
+        response = requests.post(f"{base}/upload/batch/", data=body, headers=headers)
+        batch = time.perf_counter() - start
+        response.raise_for_status()
+        answer = response.json()
+    finally:
+        server.terminate()
+        server.wait()
+        upstream.shutdown()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    failed = sum(1 for r in answer["results"] if "error" in r)
+    print(f"{args.students} students, Gemini latency {args.latency}s, batch fan-out {args.fanout}")
+    print(f"  one upload/ each: {sequential:7.1f}s  {args.students * 60 / sequential:7.1f} schedules/min")
+    print(f"  upload/batch/:    {batch:7.1f}s  {args.students * 60 / batch:7.1f} schedules/min "
+          f"({sequential / batch:.1f}x), {failed} failed")
+    print(f"  server report: {json.dumps(answer['throughput'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare Camelot extraction with one layout pass per flavor vs a shared per-page layout.
+
+Usage:
+    python -m benchmarks.camelot_shared_layout path/to/timetable.pdf [--repeat 3]
+"""
+import argparse
+import logging
+import time
+
+from pypdf import PdfReader
+
+from api.utils.formate_data_for_ai import PDFTableExtractor
+
+
+def time_camelot(pdf_data, shared_layout, repeat):
+    best = None
+    tables = None
+    for _ in range(repeat):
+        extractor = PDFTableExtractor(pdf_data, shared_layout=shared_layout)
+        start = time.perf_counter()
+        extractor._extract_with_camelot()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        tables = extractor.extracted_data
+    return best, tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    with open(args.pdf, "rb") as f:
+        pdf_data = f.read()
+    pages = len(PdfReader(args.pdf).pages)
+
+    before, tables_before = time_camelot(pdf_data, shared_layout=False, repeat=args.repeat)
+    after, tables_after = time_camelot(pdf_data, shared_layout=True, repeat=args.repeat)
+
+    print(f"pages: {pages}")
+    print(f"read_pdf per flavor: {before * 1000:.1f} ms total, {before * 1000 / pages:.1f} ms/page")
+    print(f"shared layout:       {after * 1000:.1f} ms total, {after * 1000 / pages:.1f} ms/page")
+    print(f"speedup: {before / after:.2f}x")
+    print(f"identical tables: {tables_before == tables_after}")
+
+
+if __name__ == "__main__":
+    main()
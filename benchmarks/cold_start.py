@@ -0,0 +1,54 @@
+"""Measure cold start cost (import time and peak RSS) of a fresh server process.
+
+"lazy" is what a worker pays now: Django setup plus the URLconf, extraction backends untouched.
+"eager" additionally imports every backend of the default chain plus OCR, which is what
+importing api.utils.formate_data_for_ai used to cost at URL-load time.
+
+Usage:
+    python -m benchmarks.cold_start [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROBE = """
+import json, os, resource, sys, time
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+start = time.perf_counter()
+import django
+django.setup()
+import api.urls
+if sys.argv[1] == "eager":
+    from api.utils.extraction_backends import preload_backends
+    preload_backends(["pandas", "camelot", "tabula", "pdfplumber", "ocr"])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def run(mode):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE, mode],
+        cwd=root, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for mode in ("eager", "lazy"):
+        runs = [run(mode) for _ in range(args.repeat)]
+        seconds = min(r["seconds"] for r in runs)
+        rss = min(r["max_rss_mb"] for r in runs)
+        print(f"{mode:6} import {seconds * 1000:7.0f} ms   peak RSS {rss:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
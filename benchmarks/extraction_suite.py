@@ -0,0 +1,226 @@
+"""Extraction regression suite: every backend against synthetic timetables with known content.
+
+The PDFs come from benchmarks.synthetic_pdfs (bordered, borderless, multi-page, Arabic, scanned).
+Each (variant, backend) pair runs in a fresh process: one untimed warm-up extraction, then
+--repeat timed ones. Reported per pair:
+
+  seconds       best and median wall time of one extraction
+  peak_rss_mib  resident memory growth over the process after its warm-up (Linux)
+  tables        tables returned vs tables drawn
+  recall        share of the drawn non-empty cells found among the extracted cells, compared
+                after Unicode NFKC folding (Arabic presentation forms), case folding and with
+                whitespace removed; right-to-left text in visual order also matches
+
+Backends are the single-backend chains ("camelot" runs only _extract_with_camelot, "ocr" only
+the image OCR, ...) plus "chain", the default triaged pipeline. Backends whose dependency is
+missing here (java for tabula, the tesseract binary for OCR) are reported as unavailable.
+
+--output writes the results as JSON for regression tracking; --baseline compares against such
+a file and exits with status 1 when recall dropped or an extraction got more than --slowdown
+times slower.
+
+Usage:
+    python -m benchmarks.extraction_suite [--variants bordered,arabic] [--backends camelot,pdfplumber]
+        [--repeat 3] [--output results.json] [--baseline previous.json] [--slowdown 1.5]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks.synthetic_pdfs import VARIANTS
+
+BACKENDS = ("camelot", "tabula", "pdfplumber", "ocr", "chain")
+# Binaries a backend shells out to, besides its Python packages
+REQUIRED_BINARIES = {"tabula": "java", "ocr": "tesseract"}
+
+
+def normalize(text):
+    return "".join(unicodedata.normalize("NFKC", str(text)).casefold().split())
+
+
+def cell_recall(truth, tables):
+    """(found, expected) non-empty ground truth cells, matched as a multiset against the extracted cells"""
+    from api.utils.table_format import EMPTY_CELL, table_cells
+
+    expected = Counter(normalize(cell) for grid in truth for row in grid for cell in row if cell)
+    extracted = Counter()
+    for table in tables:
+        for row in [table.get("headers", [])] + table_cells(table):
+            for cell in row:
+                key = normalize(cell)
+                if not key or cell == EMPTY_CELL:
+                    continue
+                # Visual order (right-to-left text written reversed) counts as the same cell; reversed
+                # before folding so ligatures like lam-alef keep their letter order
+                reversed_key = normalize(str(cell)[::-1])
+                extracted[reversed_key if key not in expected and reversed_key in expected else key] += 1
+    return sum((expected & extracted).values()), sum(expected.values())
+
+
+def _status(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def _reset_peak_rss():
+    """Reset VmHWM to the current RSS, False where the kernel does not allow it"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def measure(pdf_path, truth_path, backend, repeat):
+    """Runs in the child process, returns the result row (without variant / backend)"""
+    from api.utils.formate_data_for_ai import PDFTableExtractor
+
+    def extract():
+        if backend == "chain":
+            extractor = PDFTableExtractor(pdf_path, triage=True)
+        else:
+            extractor = PDFTableExtractor(pdf_path, backends=[backend])
+        return extractor.extract_all_tables()
+
+    with open(truth_path) as f:
+        truth = json.load(f)
+    extract()
+    can_reset = _reset_peak_rss()
+    baseline = _status("VmRSS")
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tables = extract()
+        times.append(time.perf_counter() - start)
+    peak = _status("VmHWM")
+    found, expected = cell_recall(truth, tables)
+    return {
+        "status": "ok",
+        "seconds": round(min(times), 4),
+        "seconds_median": round(statistics.median(times), 4),
+        "peak_rss_mib": round(peak - baseline, 1) if can_reset and peak is not None else None,
+        "tables": len(tables),
+        "expected_tables": len(truth),
+        "cells_found": found,
+        "cells_expected": expected,
+        "recall": round(found / expected, 4) if expected else None,
+    }
+
+
+def run_case(pdf_path, truth_path, backend, repeat):
+    missing = REQUIRED_BINARIES.get(backend)
+    if missing and shutil.which(missing) is None:
+        return {"status": "unavailable", "reason": f"{missing} not found"}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-m", "benchmarks.extraction_suite", "--measure",
+         pdf_path, truth_path, backend, "--repeat", str(repeat)],
+        cwd=root, capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        reason = (out.stderr.strip().splitlines() or ["no output"])[-1]
+        status = "unavailable" if "ModuleNotFoundError" in reason or "ImportError" in reason else "error"
+        return {"status": status, "reason": reason}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def git_commit(root):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, slowdown):
+    """Print the pairs that got worse than the baseline file, return how many did"""
+    with open(baseline_path) as f:
+        previous = {(r["variant"], r["backend"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for row in results:
+        before = previous.get((row["variant"], row["backend"]))
+        if not before or before["status"] != "ok":
+            continue
+        problems = []
+        if row["status"] != "ok":
+            problems.append(f"now {row['status']}")
+        else:
+            if (row["recall"] or 0) < (before["recall"] or 0):
+                problems.append(f"recall {before['recall']:.1%} -> {row['recall']:.1%}")
+            if row["seconds"] > before["seconds"] * slowdown:
+                problems.append(f"{before['seconds'] * 1000:.0f} -> {row['seconds'] * 1000:.0f} ms")
+        if problems:
+            regressions += 1
+            print(f"REGRESSION {row['variant']}/{row['backend']}: {', '.join(problems)}")
+    print(f"{regressions} regression(s) against {baseline_path}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare against")
+    parser.add_argument("--slowdown", type=float, default=1.5, help="time ratio counted as a regression")
+    parser.add_argument("--measure", nargs=3, metavar=("PDF", "TRUTH", "BACKEND"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure, args.repeat)))
+        return
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    workdir = tempfile.mkdtemp(prefix="extraction-suite-")
+    results = []
+    try:
+        for variant in args.variants.split(","):
+            pdf_path = os.path.join(workdir, f"{variant}.pdf")
+            truth_path = os.path.join(workdir, f"{variant}.json")
+            with open(truth_path, "w") as f:
+                json.dump(VARIANTS[variant](pdf_path), f, ensure_ascii=False)
+            for backend in args.backends.split(","):
+                row = {"variant": variant, "backend": backend, **run_case(pdf_path, truth_path, backend, args.repeat)}
+                results.append(row)
+                if row["status"] != "ok":
+                    print(f"{variant:11s} {backend:10s} {row['status']}: {row['reason']}")
+                    continue
+                rss = f"{row['peak_rss_mib']:6.1f} MiB" if row["peak_rss_mib"] is not None else "     - MiB"
+                print(f"{variant:11s} {backend:10s} {row['seconds'] * 1000:7.0f} ms  {rss}  "
+                      f"tables {row['tables']}/{row['expected_tables']}  recall {row['recall']:6.1%}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(root),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+    if args.baseline and compare(results, args.baseline, args.slowdown):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
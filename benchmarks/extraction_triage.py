@@ -0,0 +1,43 @@
+"""Whole-document fallback chain vs per-page triage: time, tables found and which backend handled each page.
+
+Usage:
+    python -m benchmarks.extraction_triage path/to/a.pdf [path/to/b.pdf ...] [--backends camelot,tabula,pdfplumber,ocr]
+"""
+import argparse
+import logging
+import time
+
+from api.utils.formate_data_for_ai import PDFTableExtractor
+
+
+def run(path, backends, triage):
+    extractor = PDFTableExtractor(path, backends=backends, triage=triage)
+    start = time.perf_counter()
+    tables = extractor.extract_all_tables()
+    return time.perf_counter() - start, tables, extractor.page_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--backends", default=",".join(PDFTableExtractor.DEFAULT_BACKENDS))
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    backends = args.backends.split(",")
+    for path in args.pdfs:
+        chain_time, chain_tables, _ = run(path, backends, triage=False)
+        triage_time, triage_tables, report = run(path, backends, triage=True)
+        print(f"{path}")
+        print(f"  chain:  {chain_time * 1000:8.0f} ms, {len(chain_tables)} tables "
+              f"({', '.join(sorted({t['extraction_method'] for t in chain_tables})) or '-'})")
+        print(f"  triage: {triage_time * 1000:8.0f} ms, {len(triage_tables)} tables, "
+              f"saved {(chain_time - triage_time) * 1000:.0f} ms ({1 - triage_time / chain_time:.0%})")
+        for page in report:
+            tried = " -> ".join(f"{t['backend']} {t['seconds'] * 1000:.0f}ms" for t in page["tried"])
+            print(f"    page {page['page']:3d}: {str(page['handled_by']):10s} "
+                  f"text {page['text_chars']:5d} chars, {page['ruling_lines']:4d} lines; tried {tried or '-'}")
+
+
+if __name__ == "__main__":
+    main()
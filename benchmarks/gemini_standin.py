@@ -0,0 +1,265 @@
+"""Local stand-in for the Gemini API, for load tests that must not spend real quota.
+
+Replays recorded generateContent responses after a latency drawn from a distribution, and
+answers a configurable share of calls with errors. Point the server at it with
+GEMINI_BASE_URL=http://127.0.0.1:<port>/v1beta. Serves:
+
+  POST .../models/<model>:generateContent              the recorded response as one JSON body
+  POST .../models/<model>:streamGenerateContent?alt=sse the recorded text as --chunks SSE events,
+                                                        spread over the drawn latency
+  GET  /stats                                           calls per outcome, in flight, peak in flight
+  POST /stats/reset
+
+Recordings (--recordings) are JSONL, one line per response: either a full generateContent body
+({"candidates": [...]}) or {"items": [...]}, a schedule that gets wrapped like the model would.
+Without recordings a small built-in schedule is served.
+
+Latency (--latency, seconds): fixed:S | uniform:LOW,HIGH | normal:MEAN,SD | lognormal:MEDIAN,SIGMA
+Errors (--errors): comma separated KIND:SHARE where KIND is an HTTP status (429, 500, 503...),
+"reset" (connection closed without an answer) or "hang" (no answer for --hang seconds, to trip
+the client's read timeout), e.g. --errors 429:0.05,503:0.02,reset:0.01
+
+Usage:
+    python -m benchmarks.gemini_standin [--port 8090] [--recordings responses.jsonl]
+        [--latency lognormal:1.5,0.4] [--errors 429:0.02,503:0.01] [--chunks 8] [--seed 1]
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_ITEMS = [
+    {"title": "Math Class", "start_time": "08:00", "end_time": "10:00", "event_type": "class",
+     "event_day": "Monday", "priority": "3", "color": "#60A5FA", "user_id": None, "module_id": None},
+    {"title": "Study Physics", "start_time": "17:00", "end_time": "18:30", "event_type": "study",
+     "event_day": "Monday", "priority": "4", "color": "#F87171", "user_id": None, "module_id": None},
+]
+
+
+def parse_latency(spec):
+    """"kind:params" -> function returning one latency in seconds"""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+def parse_errors(spec):
+    """"429:0.02,reset:0.01" -> [("429", 0.02), ("reset", 0.01)]"""
+    errors = []
+    for entry in filter(None, (spec or "").split(",")):
+        kind, _, share = entry.partition(":")
+        if not (kind.isdigit() or kind in ("reset", "hang")):
+            raise ValueError(f"Unknown error kind {kind!r}")
+        errors.append((kind, float(share)))
+    if sum(share for _, share in errors) > 1:
+        raise ValueError("Error shares add up to more than 1")
+    return errors
+
+
+def load_recordings(path):
+    """Response texts (the model output) from a recordings file"""
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "items" in record:
+                texts.append(_model_text(record["items"]))
+            else:
+                texts.append("".join(part.get("text", "") for part in record["candidates"][0]["content"]["parts"]))
+    return texts
+
+
+def _model_text(items):
+    return "```json\n" + json.dumps(items, indent=2) + "\n```"
+
+
+def _body(text, usage=None):
+    body = {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}]}
+    if usage:
+        body["usageMetadata"] = usage
+    return body
+
+
+def _usage(prompt_bytes, text):
+    """Token counts the way the API reports them, estimated at 4 bytes per token"""
+    prompt, candidates = prompt_bytes // 4, len(text.encode("utf-8")) // 4
+    return {"promptTokenCount": prompt, "candidatesTokenCount": candidates, "totalTokenCount": prompt + candidates}
+
+
+class GeminiStandIn:
+    """The stand-in server, also usable from other benchmarks: start(), stats(), reset_stats(), stop()"""
+
+    def __init__(self, texts=None, latency="fixed:0.5", errors="", chunks=8, hang=120.0, seed=None):
+        self.texts = texts or [_model_text(DEFAULT_ITEMS)]
+        self.latency = parse_latency(latency)
+        self.errors = parse_errors(errors)
+        self.chunks = chunks
+        self.hang = hang
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.outcomes = Counter()
+            self.in_flight = 0
+            self.peak = 0
+
+    def stats(self):
+        with self._lock:
+            return {"calls": sum(self.outcomes.values()), "outcomes": dict(self.outcomes),
+                    "in_flight": self.in_flight, "peak_in_flight": self.peak}
+
+    def _draw(self):
+        """(outcome, latency, text) of the next call"""
+        with self._lock:
+            roll = self._rng.random()
+            outcome = "ok"
+            for kind, share in self.errors:
+                if roll < share:
+                    outcome = kind
+                    break
+                roll -= share
+            return outcome, self.latency(self._rng), self._rng.choice(self.texts)
+
+    def _enter(self, outcome):
+        with self._lock:
+            self.outcomes[outcome] += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serve from daemon threads, returns the port"""
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server.server_port
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def _make_handler(standin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                self._json(200, standin.stats())
+            else:
+                self._json(404, {"error": {"code": 404, "message": "Not found"}})
+
+        def do_POST(self):
+            request_bytes = len(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+            if self.path.rstrip("/") == "/stats/reset":
+                standin.reset_stats()
+                self._json(200, standin.stats())
+                return
+            if ":generateContent" not in self.path and ":streamGenerateContent" not in self.path:
+                self._json(404, {"error": {"code": 404, "message": "Not found"}})
+                return
+
+            outcome, latency, text = standin._draw()
+            standin._enter(outcome)
+            try:
+                if outcome == "reset":
+                    time.sleep(latency)
+                    self.close_connection = True
+                    return
+                if outcome == "hang":
+                    time.sleep(standin.hang)
+                    self.close_connection = True
+                    return
+                if outcome != "ok":
+                    time.sleep(latency)
+                    self._json(int(outcome), {"error": {"code": int(outcome), "message": "Stand-in error"}})
+                elif ":streamGenerateContent" in self.path:
+                    self._stream(text, latency, _usage(request_bytes, text))
+                else:
+                    time.sleep(latency)
+                    self._json(200, _body(text, _usage(request_bytes, text)))
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+            finally:
+                standin._leave()
+
+        def _json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, text, latency, usage):
+            """Server-sent events, one chunk of the text per event, the latency spread between them;
+            the last event carries the token usage like the real stream"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            size = max(1, -(-len(text) // standin.chunks))
+            for start in range(0, len(text), size):
+                time.sleep(latency / standin.chunks)
+                event = json.dumps(_body(text[start:start + size], usage if start + size >= len(text) else None))
+                self.wfile.write(f"data: {event}\r\n\r\n".encode())
+                self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--recordings", help="JSONL file of recorded responses")
+    parser.add_argument("--latency", default="lognormal:1.5,0.4")
+    parser.add_argument("--errors", default="")
+    parser.add_argument("--chunks", type=int, default=8, help="SSE events per streamed response")
+    parser.add_argument("--hang", type=float, default=120.0, help="seconds a \"hang\" error holds the call")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    standin = GeminiStandIn(
+        texts=load_recordings(args.recordings) if args.recordings else None,
+        latency=args.latency, errors=args.errors, chunks=args.chunks, hang=args.hang, seed=args.seed,
+    )
+    port = standin.start(args.host, args.port)
+    print(f"Gemini stand-in on http://{args.host}:{port}/v1beta ({len(standin.texts)} recorded responses, "
+          f"latency {args.latency}, errors {args.errors or 'none'})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(json.dumps(standin.stats()))
+    finally:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Cost of one edit-and-retry round: re-upload (extract + full schedule) vs incremental regeneration.
+
+The student changes one task (and adds one) after a first schedule. The re-upload path extracts
+the PDF again and asks for the whole week; the incremental path starts from the stored tables and
+the previous schedule and asks only for the changed tasks. The local scheduler stands in for the
+model to size the output: the full week vs only the new items, as JSON, ~4 characters per token.
+
+Usage:
+    python -m benchmarks.incremental_regeneration [path/to/timetable.pdf] [--class "Class B"] [--repeat 3]
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+from api.model.incremental import keptItems, taskChanges
+from api.model.local_scheduler import generateLocalSchedule, placeLocalTasks
+from api.model.prompt import createIncrementalPrompt, createSystemPrompt, estimateTokens
+from api.utils.formate_data_for_ai import PDFTableExtractor
+from benchmarks.synthetic_pdfs import multi_page
+
+TASKS = [
+    {"title": "Physics project", "hours": 2, "sessions": 3},
+    {"title": "Gym", "minutes": 60, "preferredTime": "evening"},
+    {"title": "Essay", "hours": 1.5, "sessions": 2},
+    {"title": "Reading", "minutes": 45, "sessions": 4},
+]
+EDITED_TASKS = TASKS[:2] + [{"title": "Essay", "hours": 1, "sessions": 3}, TASKS[3], {"title": "Piano", "minutes": 45, "sessions": 2}]
+PREFERENCES = "Reading in the evening"
+PRIORITIES = '{"physics project": 1, "gym": 2}'
+
+
+def best_of(repeat, fn):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", help="defaults to a synthetic 4 page timetable")
+    parser.add_argument("--class", dest="user_class", default="Class B")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    pdf = args.pdf
+    if pdf is None:
+        pdf = os.path.join(tempfile.mkdtemp(prefix="incremental-"), "timetable.pdf")
+        multi_page(pdf)
+
+    tables = PDFTableExtractor(pdf).extract_all_tables()
+    base_items = generateLocalSchedule(tables, args.user_class, json.dumps(TASKS), PREFERENCES, PRIORITIES)
+    base_inputs = dict(userClass=args.user_class, userTasks=json.dumps(TASKS), preferences=PREFERENCES,
+                       modelsAndTasksPriorities=PRIORITIES)
+    edited = json.dumps(EDITED_TASKS)
+
+    # Re-upload: extraction again, the whole prompt, the whole week as output
+    extract_seconds, tables = best_of(args.repeat, lambda: PDFTableExtractor(pdf).extract_all_tables())
+    full_prompt = createSystemPrompt(tables, args.user_class, edited, PREFERENCES, PRIORITIES, "compact")
+    full_items = generateLocalSchedule(tables, args.user_class, edited, PREFERENCES, PRIORITIES)
+
+    # Incremental: diff the tasks, keep the rest, place the changed ones
+    def incremental():
+        changed, removed = taskChanges(base_inputs, dict(userTasks=edited, preferences=PREFERENCES,
+                                                         modelsAndTasksPriorities=PRIORITIES))
+        kept = keptItems(base_items, [task["title"] for task in changed] + removed)
+        return changed, kept, placeLocalTasks(kept, changed)
+
+    diff_seconds, (changed, kept, new_items) = best_of(args.repeat, incremental)
+    incremental_prompt = createIncrementalPrompt(kept, changed, PREFERENCES, PRIORITIES)
+
+    full_out = estimateTokens(json.dumps(full_items))
+    incremental_out = estimateTokens(json.dumps(new_items))
+    print(f"timetable: {len(tables)} tables, first schedule {len(base_items)} items; "
+          f"changed {[task['title'] for task in changed]}, kept {len(kept)} items")
+    print(f"{'':14s} {'extract':>9s} {'prompt tok':>11s} {'output items':>13s} {'output tok':>11s}")
+    print(f"{'re-upload':14s} {extract_seconds * 1000:7.0f}ms {estimateTokens(full_prompt):11d} "
+          f"{len(full_items):13d} {full_out:11d}")
+    print(f"{'incremental':14s} {diff_seconds * 1000:7.1f}ms {estimateTokens(incremental_prompt):11d} "
+          f"{len(new_items):13d} {incremental_out:11d}")
+    print(f"output tokens saved {1 - incremental_out / full_out:.0%}, "
+          f"prompt tokens {estimateTokens(incremental_prompt) / estimateTokens(full_prompt) - 1:+.0%}")
+
+
+if __name__ == "__main__":
+    main()
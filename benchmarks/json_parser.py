@@ -0,0 +1,80 @@
+"""Compare the regex extraction of the schedule array with the incremental stream parser.
+
+Usage:
+    python -m benchmarks.json_parser [--items 2000] [--chunk 64] [--repeat 5]
+"""
+import argparse
+import json
+import time
+
+from api.utils.formate_json import JsonArrayStreamParser, extract_json_array_with_regex
+
+
+def synthetic_response(count):
+    days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    items = [
+        {
+            "title": f"Task {i} (revise chapter {i % 12})",
+            "start_time": f"{8 + i % 12:02d}:00",
+            "end_time": f"{9 + i % 12:02d}:00",
+            "event_type": "study",
+            "event_day": days[i % 7],
+            "priority": str(1 + i % 5),
+            "color": "#3B82F6",
+            "user_id": None,
+            "module_id": None,
+        }
+        for i in range(count)
+    ]
+    return "Here is your weekly schedule:\n```json\n" + json.dumps(items, indent=2) + "\n```\n", items
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def parse_whole(text):
+    parser = JsonArrayStreamParser()
+    return parser.feed(text) + parser.finish()
+
+
+def parse_chunked(text, size):
+    parser = JsonArrayStreamParser()
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return items + parser.finish()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--chunk", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text, expected = synthetic_response(args.items)
+    print(f"response: {len(text) / 1024:.0f} KiB, {args.items} items")
+
+    for name, fn in (
+        ("regex (whole text)", lambda: extract_json_array_with_regex(text)),
+        ("stream parser (whole text)", lambda: parse_whole(text)),
+        (f"stream parser ({args.chunk} char chunks)", lambda: parse_chunked(text, args.chunk)),
+    ):
+        elapsed, result = best_of(args.repeat, fn)
+        print(f"{name:34} {elapsed * 1000:8.1f} ms  correct={result == expected}")
+
+    # Truncated output: the regex finds nothing, the stream parser keeps every complete item
+    truncated = text[: len(text) * 2 // 3]
+    print(f"truncated at 2/3: regex {len(extract_json_array_with_regex(truncated))} items, "
+          f"stream parser {len(parse_whole(truncated))} items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Open-loop load driver: replays a request mix against a running server at a target rate.
+
+Requests are sent on schedule whether or not earlier ones have answered (fixed spacing, or
+Poisson arrivals with --poisson), so a slow server shows up as latency and not as a lower offered
+rate. The mix is JSONL, one request kind per line (see benchmarks/load_mix.jsonl):
+
+  {"endpoint": "upload/async/", "pdf": "synthetic:bordered", "fields": {"userClass": "A", ...}, "weight": 3}
+
+"pdf" is a file path or "synthetic:<variant>" (benchmarks.synthetic_pdfs); "fields" are the form
+fields, non string values are sent JSON encoded; "weight" is the share of the mix (default 1).
+
+Per stage latencies come from the Server-Timing header the server adds to every response:
+upload, extract (and inside it triage, camelot, tabula, pdfplumber, ocr, clean), llm (prompt,
+gemini, parse), fallback, local and total. Reported: offered and achieved rate, total latency
+p50/p95/p99 as seen by the client, the same per stage, errors per status and exception, and the
+LLM failure rate (requests that fell back to local generation / requests that called the LLM).
+
+Against the Gemini stand-in:
+    python -m benchmarks.gemini_standin --port 8090 --latency lognormal:1.5,0.4 --errors 503:0.05 &
+    GEMINI_BASE_URL=http://127.0.0.1:8090/v1beta GEMINI_MAX_RETRIES=0 LLM_CACHE_ENABLED=false \\
+        uvicorn backend.asgi:application --port 8000 &
+    python -m benchmarks.load_driver --url http://127.0.0.1:8000/api --rps 5 --duration 60
+
+Usage:
+    python -m benchmarks.load_driver [--url http://127.0.0.1:8000/api] [--mix benchmarks/load_mix.jsonl]
+        [--rps 5] [--duration 60 | --requests 300] [--poisson] [--timeout 120] [--seed 1] [--output report.json]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.synthetic_pdfs import VARIANTS
+
+DEFAULT_MIX = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_mix.jsonl")
+
+
+def percentile(values, q):
+    """Nearest rank percentile, q in [0, 100]"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def parse_server_timing(header):
+    """"extract;dur=812.4, llm;dur=1503.0" -> {"extract": 0.8124, "llm": 1.503} (seconds, repeats summed)"""
+    stages = defaultdict(float)
+    for entry in filter(None, (e.strip() for e in (header or "").split(","))):
+        name, *params = entry.split(";")
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                stages[name.strip()] += float(value) / 1000
+    return dict(stages)
+
+
+def load_mix(path, workdir):
+    """Mix entries with the PDF read into memory, synthetic PDFs generated once into workdir"""
+    mix, pdfs = [], {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            source = entry["pdf"]
+            if source not in pdfs:
+                if source.startswith("synthetic:"):
+                    pdf_path = os.path.join(workdir, source.split(":", 1)[1] + ".pdf")
+                    VARIANTS[source.split(":", 1)[1]](pdf_path)
+                else:
+                    pdf_path = source
+                with open(pdf_path, "rb") as pdf:
+                    pdfs[source] = pdf.read()
+            fields = {name: value if isinstance(value, str) else json.dumps(value)
+                      for name, value in entry.get("fields", {}).items()}
+            mix.append({
+                "name": entry.get("name") or f"{entry['endpoint']} {source}",
+                "endpoint": entry["endpoint"],
+                "pdf": pdfs[source],
+                "fields": fields,
+                "weight": float(entry.get("weight", 1)),
+            })
+    return mix
+
+
+def arrivals(rps, count, poisson, rng):
+    """Send offsets in seconds from the start"""
+    offset = 0.0
+    for _ in range(count):
+        yield offset
+        offset += rng.expovariate(rps) if poisson else 1 / rps
+
+
+def send(session, url, entry, api_key, timeout):
+    start = time.perf_counter()
+    result = {"kind": entry["name"]}
+    try:
+        response = session.post(
+            url.rstrip("/") + "/" + entry["endpoint"].lstrip("/"),
+            data=entry["fields"],
+            files={"file": ("timetable.pdf", entry["pdf"], "application/pdf")},
+            headers={"x-api-key": api_key},
+            timeout=timeout,
+        )
+        response.content
+        result["status"] = response.status_code
+        result["stages"] = parse_server_timing(response.headers.get("Server-Timing"))
+    except requests.RequestException as e:
+        result["exception"] = type(e).__name__
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def summarize(results, elapsed, offered):
+    def latencies(values):
+        if not values:
+            return None
+        return {
+            "n": len(values),
+            "p50": round(percentile(values, 50), 4),
+            "p95": round(percentile(values, 95), 4),
+            "p99": round(percentile(values, 99), 4),
+            "mean": round(statistics.fmean(values), 4),
+        }
+
+    ok = [r for r in results if r.get("status") == 200]
+    stages = defaultdict(list)
+    for r in results:
+        for name, seconds in r.get("stages", {}).items():
+            stages[name].append(seconds)
+    errors = Counter(str(r["status"]) for r in results if r.get("status") not in (None, 200))
+    errors.update(r["exception"] for r in results if "exception" in r)
+    llm_calls = sum(1 for r in results if "llm" in r.get("stages", {}))
+    fallbacks = sum(1 for r in results if "fallback" in r.get("stages", {}))
+    return {
+        "requests": len(results),
+        "offered_rps": round(offered, 2),
+        "achieved_rps": round(len(ok) / elapsed, 2) if elapsed else None,
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else None,
+        "errors": dict(errors),
+        "llm_failure_rate": round(fallbacks / llm_calls, 4) if llm_calls else None,
+        "latency": latencies([r["seconds"] for r in ok]),
+        "stages": {name: latencies(values) for name, values in sorted(stages.items())},
+        "per_kind": {
+            kind: latencies([r["seconds"] for r in ok if r["kind"] == kind])
+            for kind in sorted({r["kind"] for r in results})
+        },
+    }
+
+
+def print_report(report):
+    print(f"{report['requests']} requests, offered {report['offered_rps']} rps, "
+          f"achieved {report['achieved_rps']} rps (successful)")
+    print(f"errors {report['error_rate']:.1%} {json.dumps(report['errors'])}, LLM failure rate "
+          + (f"{report['llm_failure_rate']:.1%}" if report["llm_failure_rate"] is not None else "-"))
+    print(f"{'':22s} {'n':>5s} {'p50':>8s} {'p95':>8s} {'p99':>8s}")
+    rows = [("client total", report["latency"])]
+    rows += [(f"stage {name}", values) for name, values in report["stages"].items()]
+    rows += [(kind, values) for kind, values in report["per_kind"].items()]
+    for label, values in rows:
+        if values:
+            print(f"{label[:22]:22s} {values['n']:5d} {values['p50'] * 1000:6.0f}ms "
+                  f"{values['p95'] * 1000:6.0f}ms {values['p99'] * 1000:6.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--rps", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of arrivals")
+    parser.add_argument("--requests", type=int, help="number of requests, instead of --duration")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival times")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--max-in-flight", type=int, default=512, help="client threads")
+    parser.add_argument("--api-key", default=os.getenv("API_SECRET_KEY", "benchmark"))
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="load-driver-")
+    try:
+        mix = load_mix(args.mix, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    count = args.requests or max(1, round(args.rps * args.duration))
+    plan = [(offset, rng.choices(mix, weights=[e["weight"] for e in mix])[0])
+            for offset in arrivals(args.rps, count, args.poisson, rng)]
+
+    local = threading.local()
+
+    def task(entry):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return send(local.session, args.url, entry, args.api_key, args.timeout)
+
+    futures = []
+    late = 0
+    with ThreadPoolExecutor(max_workers=args.max_in_flight) as pool:
+        start = time.perf_counter()
+        for offset, entry in plan:
+            delay = start + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -0.05:
+                late += 1
+            futures.append(pool.submit(task, entry))
+        results = [f.result() for f in futures]
+        elapsed = time.perf_counter() - start
+
+    report = summarize(results, elapsed, count / (plan[-1][0] + 1 / args.rps))
+    print_report(report)
+    if late:
+        print(f"warning: {late} requests left more than 50ms late, the driver itself is saturated")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per page time and peak memory of the OCR path, against rasterizing the whole document up front.
+
+"whole document" holds every page bitmap at once, like the previous convert_from_bytes call did.
+"per page" is the extractor's OCR backend: only pages without a text layer are rasterized,
+one at a time. The OCR step itself needs the tesseract binary; without it pages report an error
+but the rasterization and table detection timings are still measured.
+
+Usage:
+    python -m benchmarks.ocr_pages path/to/scanned.pdf [--dpi 200] [--workers 1]
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+
+from api.utils.extraction_backends import load_backend
+from api.utils.formate_data_for_ai import PDFTableExtractor
+
+
+def whole_document(path, dpi):
+    ocr = load_backend("ocr")
+    tracemalloc.start()
+    start = time.perf_counter()
+    with ocr.pymupdf.open(path) as doc:
+        images = []
+        for page in doc:
+            pixmap = page.get_pixmap(dpi=dpi, alpha=False)
+            images.append(ocr.np.frombuffer(pixmap.samples, dtype=ocr.np.uint8).reshape(pixmap.h, pixmap.w, pixmap.n))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return len(images), elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    pages, elapsed, peak = whole_document(args.pdf, args.dpi)
+    print(f"whole document: {pages} pages rasterized in {elapsed * 1000:.0f} ms, peak {peak / 2**20:.1f} MiB")
+
+    extractor = PDFTableExtractor(args.pdf, workers=args.workers, backends=["ocr"], ocr_dpi=args.dpi,
+                                  ocr_trace_memory=True)
+    start = time.perf_counter()
+    extractor.extract_all_tables()
+    elapsed = time.perf_counter() - start
+    print(f"per page: {len(extractor.ocr_report)} pages without text layer, {elapsed * 1000:.0f} ms total")
+    for row in extractor.ocr_report:
+        status = f"  error: {row['error'][:60]}" if row["error"] else ""
+        print(f"  page {row['page']:3d}: {row['seconds'] * 1000:7.0f} ms, peak {row['peak_mib']:6.1f} MiB, "
+              f"{row['tables']} tables, {row['cells']} cells ({row['blank_cells']} blank), "
+              f"{row['ocr_calls']} tesseract calls{status}")
+    if extractor.ocr_report:
+        print(f"  max peak {max(row['peak_mib'] for row in extractor.ocr_report):.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
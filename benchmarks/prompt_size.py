@@ -0,0 +1,31 @@
+"""Report prompt size and estimated input tokens for the repr vs compact table encodings.
+
+Usage:
+    python -m benchmarks.prompt_size path/to/timetable.pdf [more.pdf ...]
+"""
+import argparse
+import logging
+
+from api.model.prompt import promptSizeReport
+from api.utils.formate_data_for_ai import PDFTableExtractor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    print(f"{'document':40} {'repr tok':>9} {'compact tok':>12} {'tables repr':>12} {'tables compact':>15} {'saved':>7}")
+    for path in args.pdfs:
+        tables = PDFTableExtractor(path).extract_all_tables()
+        report = promptSizeReport(tables, "A", "study math 5h/week", "gym in the evening", "math=1, gym=2")
+        print(
+            f"{path[-40:]:40} {report['repr']['prompt_tokens_estimate']:>9} "
+            f"{report['compact']['prompt_tokens_estimate']:>12} {report['repr']['table_tokens_estimate']:>12} "
+            f"{report['compact']['table_tokens_estimate']:>15} {report['token_reduction']:>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
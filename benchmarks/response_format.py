@@ -0,0 +1,114 @@
+"""Upload response size and client parse time per schedule format and content encoding.
+
+legacy is the old response, Data holding the Python text of the list: a client has to parse the
+JSON, then that text (ast.literal_eval here, the closest safe equivalent of what the web client
+does). json is Data as an array of items, one parse. compact is one array per item plus the
+field names once, rebuilt into objects on the client. Schedules come from the local scheduler
+on a synthetic timetable, from a light week to a busy one.
+
+Usage:
+    python -m benchmarks.response_format [path/to/timetable.pdf] [--class "Class B"] [--repeat 200]
+"""
+import argparse
+import ast
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+
+import django
+from django.conf import settings
+
+from api.model.local_scheduler import generateLocalSchedule
+from api.utils.formate_data_for_ai import PDFTableExtractor
+from api.utils.response_format import FORMAT_COMPACT, FORMAT_JSON, FORMAT_LEGACY, schedule_data
+from benchmarks.synthetic_pdfs import multi_page
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WEEKS = {
+    "light": [{"title": "Reading", "minutes": 45, "sessions": 3}],
+    "typical": [
+        {"title": "Physics project", "hours": 2, "sessions": 3},
+        {"title": "Gym", "minutes": 60, "preferredTime": "evening"},
+        {"title": "Essay", "hours": 1.5, "sessions": 2},
+        {"title": "Reading", "minutes": 45, "sessions": 4},
+    ],
+    "busy": [{"title": f"Revision {n + 1}", "minutes": 50, "sessions": 5} for n in range(8)],
+}
+
+
+def encode(items, fmt):
+    # Same encoding as the views (DRF renderer / json_response)
+    body = {**schedule_data(items, fmt), "timetableId": "0" * 36, "scheduleId": "0" * 36}
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def parse_legacy(body):
+    return ast.literal_eval(json.loads(body)["Data"].strip())
+
+
+def parse_json(body):
+    return json.loads(body)["Data"]
+
+
+def parse_compact(body):
+    data = json.loads(body)
+    fields = data["fields"]
+    return [dict(zip(fields, row)) for row in data["Data"]]
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", help="defaults to a synthetic 4 page timetable")
+    parser.add_argument("--class", dest="user_class", default="Class B")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    django.setup()
+
+    logging.disable(logging.INFO)
+    pdf = args.pdf
+    if pdf is None:
+        pdf = os.path.join(tempfile.mkdtemp(prefix="response-format-"), "timetable.pdf")
+        multi_page(pdf)
+    tables = PDFTableExtractor(pdf).extract_all_tables()
+
+    parsers = {FORMAT_LEGACY: parse_legacy, FORMAT_JSON: parse_json, FORMAT_COMPACT: parse_compact}
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    print(f"{'week':8s} {'items':>5s} {'format':8s} {'bytes':>7s} "
+          + " ".join(f"{name:>6s}" for name in encodings) + f" {'parse':>9s} {'vs legacy':>9s}")
+    for week, tasks in WEEKS.items():
+        items = generateLocalSchedule(tables, args.user_class, json.dumps(tasks), "", "")
+        legacy_parse = None
+        for fmt, parse in parsers.items():
+            body = encode(items, fmt)
+            assert parse(body) == items
+            sizes = [len(gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL))]
+            if brotli is not None:
+                sizes.append(len(brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)))
+            seconds = best_of(args.repeat, parse, body)
+            legacy_parse = legacy_parse or seconds
+            print(f"{week:8s} {len(items):5d} {fmt:8s} {len(body):7d} " + " ".join(f"{size:6d}" for size in sizes)
+                  + f" {seconds * 1e6:7.0f}us {legacy_parse / seconds:8.1f}x")
+    if brotli is None:
+        print("(brotli not installed, pip install Brotli for the br column)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Local validation and repair of flawed schedules vs a new generation per flawed answer.
+
+Schedules from the local scheduler stand in for model answers. Each one gets 1 to 3 of the
+mistakes models make: overlapping sessions, a class outside the school window, "8:00" / "4 PM"
+times, an end before the start, a lowercase day, a repeated item, or a day (or the whole week)
+packed with more sessions than it can hold. Every flawed schedule used to cost a whole new
+generation; now only those with items local repair could not place need a (small) re-prompt.
+
+Usage:
+    python -m benchmarks.schedule_repair [path/to/timetable.pdf] [--schedules 500] [--seed 1]
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+from api.model.local_scheduler import generateLocalSchedule, scheduleItem
+from api.model.schedule_repair import repairSchedule, validateSchedule
+from api.utils.formate_data_for_ai import PDFTableExtractor
+from benchmarks.incremental_regeneration import PREFERENCES, PRIORITIES, TASKS
+from benchmarks.synthetic_pdfs import multi_page
+
+
+def _pick(rng, items, event_types):
+    choices = [item for item in items if item["event_type"] in event_types]
+    return rng.choice(choices) if choices else None
+
+
+def overlap(rng, items):
+    item = _pick(rng, items, {"study", "task", "personal"})
+    other = _pick(rng, items, {"school", "class", "study", "task"})
+    if item and other and item is not other:
+        item.update(event_day=other["event_day"], start_time=other["start_time"])
+
+
+def school_window(rng, items):
+    item = _pick(rng, items, {"school", "class"})
+    if item:
+        item.update(start_time="07:00")
+
+
+def loose_time(rng, items):
+    item = rng.choice(items)
+    hours, minutes = item["end_time"].split(":")
+    hour = int(hours)
+    item["end_time"] = f"{hour - 12 if hour > 12 else hour} PM" if hour >= 12 else f"{hour}:{minutes}"
+
+
+def order(rng, items):
+    item = rng.choice(items)
+    item["start_time"], item["end_time"] = item["end_time"], item["start_time"]
+
+
+def day(rng, items):
+    item = rng.choice(items)
+    item["event_day"] = item["event_day"].lower()
+
+
+def duplicate(rng, items):
+    items.append(dict(rng.choice(items)))
+
+
+def packed_day(rng, items):
+    day = rng.choice(sorted({item["event_day"] for item in items}))
+    for n in range(rng.randint(4, 8)):
+        items.append(scheduleItem(f"Revision {n + 1}", 17 * 60, 19 * 60, "study", day, 2, "#4A90E2"))
+
+
+def packed_week(rng, items):
+    days = sorted({item["event_day"] for item in items})
+    for n in range(rng.randint(20, 40)):
+        items.append(scheduleItem(f"Project {n + 1}", 18 * 60, 21 * 60, "study", rng.choice(days), 3, "#10B981"))
+
+
+FAULTS = [overlap, school_window, loose_time, order, day, duplicate, packed_day, packed_week]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", nargs="?", help="defaults to a synthetic 4 page timetable")
+    parser.add_argument("--class", dest="user_class", default="Class B")
+    parser.add_argument("--schedules", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    pdf = args.pdf
+    if pdf is None:
+        pdf = os.path.join(tempfile.mkdtemp(prefix="repair-"), "timetable.pdf")
+        multi_page(pdf)
+    tables = PDFTableExtractor(pdf).extract_all_tables()
+    base = generateLocalSchedule(tables, args.user_class, json.dumps(TASKS), PREFERENCES, PRIORITIES)
+    if validateSchedule(base):
+        raise SystemExit(f"The local schedule itself does not validate: {validateSchedule(base)}")
+
+    rng = random.Random(args.seed)
+    flawed = valid = reprompts = 0
+    validate_seconds = repair_seconds = 0.0
+    per_fault = {fault.__name__: [0, 0] for fault in FAULTS}
+    repairs_total = {}
+    for _ in range(args.schedules):
+        items = copy.deepcopy(base)
+        faults = rng.sample(FAULTS, rng.randint(1, 3))
+        for fault in faults:
+            fault(rng, items)
+
+        start = time.perf_counter()
+        problems = validateSchedule(items)
+        validate_seconds += time.perf_counter() - start
+        if not problems:
+            continue
+        flawed += 1
+        start = time.perf_counter()
+        repaired, unresolved, repairs = repairSchedule(items)
+        repair_seconds += time.perf_counter() - start
+        for kind, count in repairs.items():
+            repairs_total[kind] = repairs_total.get(kind, 0) + count
+        if validateSchedule(repaired):
+            raise SystemExit(f"Repair left problems {validateSchedule(repaired)} after {[f.__name__ for f in faults]}")
+        valid += 1
+        reprompts += bool(unresolved)
+        for fault in faults:
+            per_fault[fault.__name__][0] += 1
+            per_fault[fault.__name__][1] += bool(unresolved)
+
+    print(f"base schedule {len(base)} items, {args.schedules} schedules with faults injected, {flawed} flagged")
+    print(f"valid after repair {valid / flawed:.0%}, need a re-prompt {reprompts / flawed:.1%}, "
+          f"retries avoided {flawed - reprompts}/{flawed} ({(flawed - reprompts) / flawed:.0%})")
+    print(f"validate {validate_seconds / args.schedules * 1e6:.0f}us/schedule, "
+          f"repair {repair_seconds / flawed * 1e6:.0f}us/flawed schedule")
+    print(f"repairs: {dict(sorted(repairs_total.items()))}")
+    print(f"{'fault':14s} {'schedules':>9s} {'re-prompt':>9s}")
+    for name, (count, reprompted) in per_fault.items():
+        print(f"{name:14s} {count:9d} {reprompted:9d}")
+
+
+if __name__ == "__main__":
+    main()
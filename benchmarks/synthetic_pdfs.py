@@ -0,0 +1,132 @@
+"""Synthetic timetable PDFs with known content, drawn with PyMuPDF.
+
+Every generator writes the PDF to `path` and returns the ground truth: one grid of cells per
+table (header row first, "" for a free slot). Used by benchmarks.extraction_suite, and runnable
+on its own to look at the files:
+
+    python -m benchmarks.synthetic_pdfs out_dir/
+"""
+import argparse
+import os
+
+from api.utils.arabic_text_reshaper import fix_arabic_text
+from api.utils.extraction_backends import load_backend
+
+DAYS = ["Time", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+SUBJECTS = ["Math", "Physics", "Chemistry", "English", "History", "Biology", "French", "Sport"]
+ARABIC_DAYS = ["الوقت", "الاثنين", "الثلاثاء", "الأربعاء", "الخميس", "الجمعة"]
+ARABIC_SUBJECTS = ["رياضيات", "فيزياء", "كيمياء", "إنجليزية", "تاريخ", "علوم", "فرنسية", "رياضة"]
+
+LEFT, TOP, ROW_HEIGHT = 40, 80, 26
+
+
+def timetable(rows=8, offset=0, days=DAYS, subjects=SUBJECTS):
+    """Header row, then one row per hourly slot; every 5th cell is a free slot"""
+    cells = [list(days)]
+    for r in range(rows):
+        row = [f"{8 + r:02d}:00"]
+        for c in range(1, len(days)):
+            row.append("" if (r + c + offset) % 5 == 0 else subjects[(r * 3 + c + offset) % len(subjects)])
+        cells.append(row)
+    return cells
+
+
+def _draw_table(page, cells, ruled=True, arabic=False, title=None):
+    pymupdf = load_backend("pymupdf").pymupdf
+    fontname = "helv"
+    if arabic:
+        # MuPDF's bundled Noto Naskh; the text is written shaped and in visual order like most Arabic PDFs
+        fontname = "naskh"
+        page.insert_font(fontname=fontname, fontbuffer=pymupdf.Font(script=pymupdf.UCDN_SCRIPT_ARABIC).buffer)
+    width = (page.rect.width - 2 * LEFT) / len(cells[0])
+    if title:
+        page.insert_text((LEFT, TOP - 20), title, fontsize=12)
+    for r, row in enumerate(cells):
+        for c, text in enumerate(row):
+            rect = pymupdf.Rect(LEFT + c * width, TOP + r * ROW_HEIGHT, LEFT + (c + 1) * width, TOP + (r + 1) * ROW_HEIGHT)
+            if ruled:
+                page.draw_rect(rect, color=(0, 0, 0), width=0.8)
+            if text:
+                page.insert_text(rect.bl + (4, -9), fix_arabic_text(text) if arabic else text,
+                                 fontsize=10, fontname=fontname)
+
+
+def bordered(path, rows=8):
+    """One ruled timetable on an A4 page"""
+    pymupdf = load_backend("pymupdf").pymupdf
+    truth = [timetable(rows)]
+    with pymupdf.open() as doc:
+        _draw_table(doc.new_page(width=595, height=842), truth[0])
+        doc.save(path)
+    return truth
+
+
+def borderless(path, rows=8):
+    """The same timetable laid out in columns with no ruling lines"""
+    pymupdf = load_backend("pymupdf").pymupdf
+    truth = [timetable(rows)]
+    with pymupdf.open() as doc:
+        _draw_table(doc.new_page(width=595, height=842), truth[0], ruled=False)
+        doc.save(path)
+    return truth
+
+
+def multi_page(path, pages=4, rows=8):
+    """One ruled timetable per class, one class per page"""
+    pymupdf = load_backend("pymupdf").pymupdf
+    truth = []
+    with pymupdf.open() as doc:
+        for p in range(pages):
+            cells = timetable(rows, offset=p)
+            _draw_table(doc.new_page(width=595, height=842), cells, title=f"Class {chr(ord('A') + p)}")
+            truth.append(cells)
+        doc.save(path)
+    return truth
+
+
+def arabic(path, rows=8):
+    """Ruled timetable with Arabic day names and subjects"""
+    pymupdf = load_backend("pymupdf").pymupdf
+    truth = [timetable(rows, days=ARABIC_DAYS, subjects=ARABIC_SUBJECTS)]
+    with pymupdf.open() as doc:
+        _draw_table(doc.new_page(width=595, height=842), truth[0], arabic=True)
+        doc.save(path)
+    return truth
+
+
+def scanned(path, rows=8, dpi=200):
+    """The bordered timetable rasterized into an image-only page, like a scan (no text layer)"""
+    pymupdf = load_backend("pymupdf").pymupdf
+    truth = [timetable(rows)]
+    with pymupdf.open() as source, pymupdf.open() as doc:
+        page = source.new_page(width=595, height=842)
+        _draw_table(page, truth[0])
+        pixmap = page.get_pixmap(dpi=dpi, alpha=False)
+        doc.new_page(width=595, height=842).insert_image(page.rect, pixmap=pixmap)
+        doc.save(path)
+    return truth
+
+
+VARIANTS = {
+    "bordered": bordered,
+    "borderless": borderless,
+    "multi_page": multi_page,
+    "arabic": arabic,
+    "scanned": scanned,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir")
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for name, generate in VARIANTS.items():
+        path = os.path.join(args.out_dir, f"{name}.pdf")
+        truth = generate(path)
+        print(f"{path}: {len(truth)} table(s), {sum(len(t) for t in truth)} rows")
+
+
+if __name__ == "__main__":
+    main()
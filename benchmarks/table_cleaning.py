@@ -0,0 +1,82 @@
+"""Table cleaning + conversion: DataFrame cleaning and per-row dicts vs the vectorized columnar path.
+
+"records" is the previous post-extraction step (_clean_dataframe, then df.to_dict(orient='records')).
+"columnar" is table_format.clean_table returning headers + a 2D list of cells. Both are checked
+to produce the same cells, and the size of what gets cached / passed to the prompt is compared.
+
+Usage:
+    python -m benchmarks.table_cleaning [--rows 400] [--cols 10 40 120] [--repeat 5]
+"""
+import argparse
+import json
+import pickle
+import random
+import time
+
+from api.utils.extraction_backends import load_backend
+from api.utils.formate_data_for_ai import PDFTableExtractor
+from api.utils.table_format import clean_table, table_cells
+
+WORDS = ["Math", "Physics", "Arabic", "English", "History", "Lab B2", "Room 104", "08:00 - 10:00"]
+
+
+def wide_table(rows, cols, seed=0):
+    """Camelot-like object DataFrame: padded strings, blank strings, a few missing cells and an empty column"""
+    pd = load_backend("pandas").pd
+    rng = random.Random(seed)
+    data = []
+    for _ in range(rows):
+        row = []
+        for c in range(cols):
+            roll = rng.random()
+            if c == cols // 2:
+                row.append(None)
+            elif roll < 0.3:
+                row.append("")
+            elif roll < 0.35:
+                row.append("   ")
+            elif roll < 0.4:
+                row.append(None)
+            else:
+                row.append(f"  {rng.choice(WORDS)}\n")
+        data.append(row)
+    return pd.DataFrame(data, dtype=object)
+
+
+def best_of(repeat, fn):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=400)
+    parser.add_argument("--cols", type=int, nargs="+", default=[10, 40, 120])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    extractor = PDFTableExtractor(b"%PDF")
+    for cols in args.cols:
+        df = wide_table(args.rows, cols)
+
+        def records():
+            cleaned = extractor._clean_dataframe(df)
+            return cleaned.columns.tolist(), cleaned.to_dict(orient='records')
+
+        records_time, (headers, data) = best_of(args.repeat, records)
+        columnar_time, (columnar_headers, cells) = best_of(args.repeat, lambda: clean_table(df))
+        same = headers == columnar_headers and table_cells({"headers": headers, "data": data}) == cells
+
+        print(f"{args.rows} x {cols}: records {records_time * 1000:7.1f} ms, columnar {columnar_time * 1000:7.1f} ms "
+              f"({records_time / columnar_time:4.1f}x), identical cells: {same}")
+        print(f"  pickled {len(pickle.dumps(data)) / 1024:7.1f} KiB -> {len(pickle.dumps(cells)) / 1024:7.1f} KiB, "
+              f"json {len(json.dumps(data)) / 1024:7.1f} KiB -> {len(json.dumps(cells)) / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
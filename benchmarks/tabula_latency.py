@@ -0,0 +1,55 @@
+"""Per page latency of the Tabula fallback: a fresh java process per call vs the persistent worker.
+
+Needs Java on the PATH (and JPype1 for the in-worker JVM).
+
+Usage:
+    python -m benchmarks.tabula_latency path/to/timetable.pdf [--repeat 3]
+"""
+import argparse
+import logging
+import time
+
+from pypdf import PdfReader
+
+from api.utils.tabula_worker import TabulaWorker
+
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    import tabula
+
+    pages = len(PdfReader(args.pdf).pages)
+    before = best_of(args.repeat, lambda: tabula.read_pdf(
+        args.pdf, pages="all", multiple_tables=True, force_subprocess=True
+    ))
+
+    worker = TabulaWorker()
+    start = time.perf_counter()
+    worker.healthy()  # starts the worker and its JVM
+    startup = time.perf_counter() - start
+    after = best_of(args.repeat, lambda: worker.read_pdf(args.pdf, pages="all", multiple_tables=True))
+    worker.close()
+
+    print(f"pages: {pages}")
+    print(f"java subprocess per call: {before * 1000:8.1f} ms total, {before * 1000 / pages:7.1f} ms/page")
+    print(f"persistent worker:        {after * 1000:8.1f} ms total, {after * 1000 / pages:7.1f} ms/page")
+    print(f"one-off worker startup:   {startup * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Peak RSS of a server process under concurrent large uploads.
+
+Starts `manage.py runserver` (threaded, local scheduling mode so no LLM call) from --root, warms
+it up with one upload, then posts --concurrency copies of the PDF at once. The warm-up fills the
+extraction cache, so the burst measures the upload path itself (receiving, hashing, handing the
+PDF around); --cold disables the cache to measure whole requests, extraction included. The request
+bodies are streamed from disk so the client does not affect the numbers. Reports the server's
+resident memory before the burst, its high-water mark after, and the growth per concurrent request.
+Point --root at a checkout of another revision to compare upload paths.
+
+Usage:
+    python -m benchmarks.upload_memory path/to/large.pdf [--concurrency 4] [--root .] [--port 8765] [--cold]
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def proc_status(pid, field):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def multipart_body(pdf_path):
+    """Write the multipart form to a temp file so it can be streamed, returns (path, content type)"""
+    boundary = uuid.uuid4().hex
+    fields = {"userClass": "A", "userTasks": "[]", "preferences": "{}", "modelsAndTasksPriorities": "{}", "mode": "local"}
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".body") as body:
+        for name, value in fields.items():
+            body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="timetable.pdf"\r\n'
+                   f'Content-Type: application/pdf\r\n\r\n'.encode())
+        with open(pdf_path, "rb") as f:
+            while chunk := f.read(1024 * 1024):
+                body.write(chunk)
+        body.write(f'\r\n--{boundary}--\r\n'.encode())
+    return body.name, f"multipart/form-data; boundary={boundary}"
+
+
+def post(url, body_path, content_type):
+    with open(body_path, "rb") as body:
+        response = requests.post(url, data=body, headers={
+            "Content-Type": content_type,
+            "Content-Length": str(os.path.getsize(body_path)),
+            "x-api-key": "benchmark",
+        })
+    return response.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--root", default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cold", action="store_true", help="disable the extraction cache")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="upload-benchmark-")
+    env = dict(
+        os.environ, SECRET_KEY="benchmark", API_SECRET_KEY="benchmark", PYTHONWARNINGS="ignore",
+        EXTRACTION_CACHE_ENABLED="false" if args.cold else "true", EXTRACTION_CACHE_DIR=cache_dir,
+        EXTRACTION_WORKERS="1", UPLOAD_MAX_BYTES=str(1024 ** 3), UPLOAD_MAX_PAGES="1000",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "manage.py", "runserver", "--noreload", f"127.0.0.1:{args.port}"],
+        cwd=args.root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{args.port}/api/upload/"
+    body_path, content_type = multipart_body(args.pdf)
+    try:
+        for _ in range(100):
+            try:
+                requests.get(url, timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        # Warm up: imports, first extraction
+        post(url, body_path, content_type)
+        before = proc_status(server.pid, "VmRSS")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            codes = list(pool.map(lambda _: post(url, body_path, content_type), range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        peak = proc_status(server.pid, "VmHWM")
+    finally:
+        server.terminate()
+        server.wait()
+        os.remove(body_path)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    size = os.path.getsize(args.pdf) / 2**20
+    print(f"{args.concurrency} concurrent uploads of {size:.1f} MiB from {args.root}: status {sorted(set(codes))}, "
+          f"{elapsed:.1f}s")
+    print(f"  RSS before {before:.0f} MiB, peak {peak:.0f} MiB, "
+          f"+{(peak - before) / args.concurrency:.1f} MiB per request ({(peak - before) / args.concurrency / size:.1f}x the file)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+# Gunicorn settings (picked up automatically when gunicorn runs from the project root)
+import os
+
+# Load Django in the master so workers are forked with the app already imported
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# "sync" serves backend.wsgi:application one request per worker; with "uvicorn.workers.UvicornWorker"
+# (and backend.asgi:application) api/upload/async/ keeps many requests in flight per worker
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "sync")
+
+
+def when_ready(server):
+    """Import the configured extraction backends once in the master, before any worker is forked,
+    so every worker shares those pages copy-on-write instead of importing them on its first upload
+    (EXTRACTION_PRELOAD_BACKENDS, "camelot" by default, empty to disable)"""
+    if not preload_app:
+        return
+    from django.conf import settings
+    from api.utils.extraction_backends import preload_backends
+
+    if settings.EXTRACTION_PRELOAD_BACKENDS:
+        preload_backends(settings.EXTRACTION_PRELOAD_BACKENDS)
+        server.log.info(f"Preloaded extraction backends: {', '.join(settings.EXTRACTION_PRELOAD_BACKENDS)}")